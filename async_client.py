@@ -0,0 +1,432 @@
+"""Client API Netatmo asynchrone (asyncio + aiohttp)."""
+import asyncio
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from config import Config
+from netatmo_client import (
+    NetatmoClient, OAUTH_HEADERS, _parse_json, api_error_message, auth_error_message, refresh_error_message
+)
+from resilience import (
+    CircuitBreaker, NetatmoAPIError, RetryPolicy, TokenExpiredError, TransientAPIError, classify_error
+)
+from singleflight import AsyncSingleFlight, request_key
+from timeseries import TimeSeries
+from token_store import TokenStore
+from topology import HomeTopology, TopologyCache
+
+
+class AsyncNetatmoClient:
+    """
+    Version asyncio de NetatmoClient, avec les mêmes méthodes en coroutines.
+
+    Le nombre de requêtes simultanées est borné par un sémaphore et le
+    rafraîchissement du token est mutualisé : des coroutines concurrentes qui
+    trouvent le token expiré ne déclenchent qu'un seul appel OAuth.
+
+    Exemple:
+        async with AsyncNetatmoClient(Config()) as client:
+            statuses = await client.get_homes_status()
+    """
+
+    BASE_URL = NetatmoClient.BASE_URL
+
+    # Gestion des tokens identique au client synchrone (même cache disque)
+    _load_cached_token = NetatmoClient._load_cached_token
+    _apply_token_response = NetatmoClient._apply_token_response
+
+    def __init__(self, config: Config, max_concurrency: Optional[int] = None,
+                 pool_size: Optional[int] = None, timeout: Optional[Tuple[float, float]] = None):
+        """
+        Initialise le client avec la configuration.
+
+        Args:
+            config: Configuration Netatmo
+            max_concurrency: Nombre maximal de requêtes API simultanées (défaut: config.max_concurrency)
+            pool_size: Nombre de connexions conservées (défaut: config.pool_size)
+            timeout: Timeouts (connexion, lecture) en secondes (défaut: ceux de la config)
+        """
+        self.config = config
+        self.config.validate()
+        self.base_url = config.api_url or self.BASE_URL
+        self.oauth_url = f"{self.base_url}/oauth2/token"
+        self.max_concurrency = max_concurrency or config.max_concurrency
+        self.pool_size = pool_size or config.pool_size
+        self.timeout = timeout or (config.connect_timeout, config.read_timeout)
+        self.access_token = None
+        self.refresh_token = config.refresh_token
+        self.token_expires_at = 0
+        self.scope = None
+        self.token_store = TokenStore(config.token_cache_path, config.client_id)
+        self.topology_cache = TopologyCache(config.topology_cache_path, config.topology_ttl, config.client_id)
+        self.rate_limiter = NetatmoClient._create_rate_limiter(config)
+        self.retry_policy = RetryPolicy(config.max_retries, max_delay=config.retry_max_delay)
+        self.circuit_breaker = CircuitBreaker(config.circuit_threshold, config.circuit_reset)
+        # Lectures identiques simultanées : un seul appel à l'API
+        self.singleflight = AsyncSingleFlight()
+        self._load_cached_token()
+
+        # Créés à la demande, dans la boucle d'événements qui utilise le client
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Retourne la session HTTP partagée (pool de connexions keep-alive)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout, headers={'User-Agent': 'NetatmoCLI/1.0'}
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._token_lock = asyncio.Lock()
+        return self._session
+
+    async def close(self) -> None:
+        """Ferme les connexions du pool."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncNetatmoClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    def _has_valid_token(self) -> bool:
+        return bool(self.access_token) and time.time() < self.token_expires_at
+
+    async def _post_token(self, data: Dict[str, str]) -> Tuple[int, str, str]:
+        """Appelle /oauth2/token, retourne (status, content-type, corps)."""
+        session = self._get_session()
+        async with session.post(self.oauth_url, data=data, headers=OAUTH_HEADERS) as response:
+            return response.status, response.headers.get('Content-Type', ''), await response.text()
+
+    async def _authenticate(self) -> str:
+        """Authentifie le client (refresh token puis username/password) et retourne le token d'accès."""
+        refresh_candidates = []
+        for candidate in (self.refresh_token, self.config.refresh_token):
+            if candidate and candidate not in refresh_candidates:
+                refresh_candidates.append(candidate)
+
+        for candidate in refresh_candidates:
+            self.refresh_token = candidate
+            try:
+                return await self._refresh_access_token()
+            except Exception:
+                pass
+
+        data = {
+            'grant_type': 'password',
+            'client_id': self.config.client_id,
+            'client_secret': self.config.client_secret,
+            'username': self.config.username,
+            'password': self.config.password,
+        }
+        status, content_type, text = await self._post_token(data)
+        if status != 200:
+            for scope in ('read_thermostat write_thermostat', 'read_thermostat', 'write_thermostat'):
+                status, content_type, text = await self._post_token(dict(data, scope=scope))
+                if status == 200:
+                    break
+
+        if status != 200:
+            raise ValueError(auth_error_message(status, content_type, text))
+
+        self._apply_token_response(json.loads(text))
+        return self.access_token
+
+    async def _refresh_access_token(self) -> str:
+        """Rafraîchit le token d'accès sous le verrou inter-processus du cache."""
+        lock = self.token_store.lock()
+        # flock est bloquant : l'attente du verrou se fait hors de la boucle d'événements
+        await asyncio.to_thread(lock.__enter__)
+        try:
+            cached = self.token_store.load()
+            if cached:
+                if (cached.get('access_token') != self.access_token
+                        and time.time() < cached.get('expires_at', 0)):
+                    self._load_cached_token()
+                    return self.access_token
+                if cached.get('refresh_token') and self.refresh_token != self.config.refresh_token:
+                    self.refresh_token = cached['refresh_token']
+
+            if not self.refresh_token:
+                raise ValueError("Aucun refresh token disponible pour rafraîchir l'authentification")
+
+            status, content_type, text = await self._post_token({
+                'grant_type': 'refresh_token',
+                'refresh_token': self.refresh_token,
+                'client_id': self.config.client_id,
+                'client_secret': self.config.client_secret,
+            })
+            if status != 200:
+                raise ValueError(refresh_error_message(status, content_type, text))
+
+            self._apply_token_response(json.loads(text))
+            return self.access_token
+        finally:
+            lock.__exit__(None, None, None)
+
+    async def _get_access_token(self) -> str:
+        """Récupère un token d'accès valide (un seul rafraîchissement pour toutes les coroutines)."""
+        if self._has_valid_token():
+            return self.access_token
+
+        self._get_session()
+        async with self._token_lock:
+            # Une autre coroutine a pu rafraîchir le token pendant l'attente du verrou
+            if not self._has_valid_token():
+                await self._authenticate()
+        return self.access_token
+
+    async def _request(self, method: str, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                       json_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Effectue une requête authentifiée à l'API Netatmo.
+
+        Mêmes règles que le client synchrone : nouvelles tentatives avec backoff
+        pour les erreurs temporaires, un rafraîchissement transparent du token,
+        et un seul appel pour des GET identiques simultanés.
+        """
+        if method == 'GET' and json_data is None:
+            return await self.singleflight.do(
+                request_key(method, endpoint, params), lambda: self._perform_request(method, endpoint, params)
+            )
+        return await self._perform_request(method, endpoint, params, json_data)
+
+    async def _perform_request(self, method: str, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                               json_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Envoie une requête authentifiée à l'API Netatmo (nouvelles tentatives comprises)."""
+        session = self._get_session()
+        token_refreshed = False
+        retry = 0
+
+        # L'appel d'essai du disjoncteur semi-ouvert garde la main jusqu'à sa fin
+        trial = False
+        try:
+            while True:
+                if not trial:
+                    trial = self.circuit_breaker.before_call()
+                token = await self._get_access_token()
+                headers = {
+                    'Authorization': f'Bearer {token}',
+                    'Content-Type': 'application/json'
+                }
+
+                async with self._semaphore:
+                    # Réservation sous verrou fichier dans un thread, attente sans bloquer la boucle
+                    wait = await asyncio.to_thread(self.rate_limiter.reserve)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self.rate_limiter.record(wait)
+                    NetatmoClient._report_rate_limit_wait(wait)
+                    try:
+                        async with session.request(method, f"{self.base_url}{endpoint}", headers=headers,
+                                                   params=params, json=json_data) as response:
+                            text = await response.text()
+                            status, response_headers = response.status, response.headers
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        error: NetatmoAPIError = TransientAPIError(f"Erreur réseau ({endpoint}): {e}")
+                    else:
+                        if status == 200:
+                            self.circuit_breaker.record_success()
+                            return json.loads(text)
+                        error = classify_error(status, api_error_message(status, text),
+                                               _parse_json(text), response_headers)
+
+                if isinstance(error, TokenExpiredError) and not token_refreshed:
+                    token_refreshed = True
+                    if self.access_token == token:
+                        self.token_expires_at = 0
+                    continue
+                if not isinstance(error, TransientAPIError):
+                    self.circuit_breaker.record_success()
+                    raise error
+
+                self.circuit_breaker.record_failure()
+                delay = self.retry_policy.delay(retry, error)
+                if delay is None:
+                    raise error
+                retry += 1
+                await asyncio.sleep(delay)
+        finally:
+            if trial:
+                self.circuit_breaker.end_trial()
+
+    async def get_homes_data(self) -> Dict[str, Any]:
+        """Récupère la liste des maisons et leurs données."""
+        return await self._request('GET', '/api/homesdata')
+
+    async def get_topology(self, refresh: bool = False) -> HomeTopology:
+        """Retourne la topologie indexée des maisons (cache partagé avec le client synchrone)."""
+        if refresh:
+            self.topology_cache.invalidate()
+        else:
+            topology = self.topology_cache.get()
+            if topology is not None:
+                return topology
+
+        topology = HomeTopology(await self.get_homes_data())
+        self.topology_cache.put(topology)
+        return topology
+
+    async def get_home_status(self, home_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Récupère le statut de la maison et des thermostats.
+
+        Args:
+            home_id: ID de la maison (optionnel, si non fourni, utilise la première maison)
+        """
+        if not home_id:
+            topology = await self.get_topology()
+            if not topology.homes:
+                raise ValueError("Aucune maison trouvée dans votre compte Netatmo")
+            home_id = next(iter(topology.homes))
+
+        return await self._request('GET', '/api/homestatus', params={'home_id': home_id})
+
+    async def get_homes_status(self, home_ids: Optional[Iterable[str]] = None,
+                               return_exceptions: bool = False) -> Dict[str, Any]:
+        """
+        Récupère en parallèle le statut de plusieurs maisons.
+
+        Args:
+            home_ids: IDs des maisons (défaut: toutes les maisons du compte)
+            return_exceptions: Retourner l'exception d'une maison en échec au lieu de la lever
+
+        Returns:
+            Dictionnaire home_id -> réponse /api/homestatus (ou exception)
+        """
+        if home_ids is None:
+            home_ids = list((await self.get_topology()).homes)
+        home_ids = list(home_ids)
+
+        results = await asyncio.gather(
+            *(self.get_home_status(home_id) for home_id in home_ids),
+            return_exceptions=return_exceptions
+        )
+        return dict(zip(home_ids, results))
+
+    async def get_thermostat_location(self) -> Dict[str, Any]:
+        """Résout maison, pièce, module et bridge du thermostat."""
+        topology = await self.get_topology()
+        if not topology.homes:
+            raise ValueError("Aucune maison trouvée dans votre compte Netatmo")
+
+        location = topology.find_thermostat()
+        if not location:
+            raise ValueError("Aucun thermostat trouvé dans vos maisons Netatmo")
+        return location
+
+    async def get_thermostat_status(self) -> Dict[str, Any]:
+        """Récupère le statut du thermostat (statuts des maisons interrogés en parallèle)."""
+        topology = await self.get_topology()
+        if not topology.homes:
+            raise ValueError("Aucune maison trouvée dans votre compte Netatmo")
+
+        home_ids = [home_id for home_id in topology.homes if topology.heating_modules(home_id)]
+        statuses = await self.get_homes_status(home_ids, return_exceptions=True)
+
+        # Même ordre de priorité que le client synchrone : première maison avec un thermostat
+        for home_id in home_ids:
+            home_status = statuses[home_id]
+            if isinstance(home_status, BaseException):
+                continue
+            status = topology.thermostat_status(home_id, home_status)
+            if status:
+                return status
+
+        raise ValueError("Aucun thermostat trouvé dans vos maisons Netatmo")
+
+    async def set_thermpoint(self, home_id: str, room_id: str, mode: str,
+                             temperature: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Définit le point de consigne du thermostat.
+
+        Args:
+            home_id: ID de la maison
+            room_id: ID de la pièce
+            mode: Mode ('manual', 'away', 'hg' pour hors gel, 'program', 'off')
+            temperature: Température cible (requis pour mode 'manual')
+        """
+        data = {
+            'home_id': home_id,
+            'room_id': room_id,
+            'mode': mode
+        }
+
+        if mode == 'manual' and temperature is not None:
+            data['temp'] = temperature
+
+        return await self._request('POST', '/api/setthermpoint', json_data=data)
+
+    async def set_temperature(self, temperature: float) -> Dict[str, Any]:
+        """Définit la température cible en mode manuel."""
+        location = await self.get_thermostat_location()
+        return await self.set_thermpoint(location['home_id'], location['room_id'], 'manual', temperature)
+
+    async def set_frost_guard(self, enabled: bool) -> Dict[str, Any]:
+        """Active ou désactive le mode hors gel."""
+        location = await self.get_thermostat_location()
+        mode = 'hg' if enabled else 'program'
+        return await self.set_thermpoint(location['home_id'], location['room_id'], mode)
+
+    async def get_measure(self, device_id: str, module_id: str, scale: str = '1day',
+                          types: List[str] = None, start_date: Optional[int] = None,
+                          end_date: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Récupère les mesures historiques.
+
+        Args:
+            device_id: ID du device
+            module_id: ID du module
+            scale: Échelle de temps ('max', '30min', '1hour', '3hours', '1day', '1week', '1month')
+            types: Types de mesures (ex: ['Temperature'])
+            start_date: Timestamp de début (optionnel)
+            end_date: Timestamp de fin (optionnel)
+        """
+        if types is None:
+            types = ['Temperature']
+
+        params = {
+            'device_id': device_id,
+            'module_id': module_id,
+            'scale': scale,
+            'type': ','.join(types)
+        }
+
+        if start_date:
+            params['date_begin'] = start_date
+        if end_date:
+            params['date_end'] = end_date
+
+        return await self._request('GET', '/api/getmeasure', params=params)
+
+    async def get_thermostat_history(self, days: int = 7) -> TimeSeries:
+        """Récupère l'historique des températures sous forme de TimeSeries compacte."""
+        location = await self.get_thermostat_location()
+        if not location['bridge_id']:
+            raise ValueError("Bridge ID non trouvé pour le thermostat")
+
+        end_date = int(time.time())
+        start_date = end_date - (days * 24 * 3600)
+        result = await self.get_measure(
+            location['bridge_id'],
+            location['module_id'],
+            scale='1hour',
+            types=['Temperature'],
+            start_date=start_date,
+            end_date=end_date
+        )
+        return TimeSeries.from_body(result.get('body'))
+
+    async def get_statistics(self, days: int = 7) -> Dict[str, Any]:
+        """Calcule les statistiques de température."""
+        history = await self.get_thermostat_history(days)
+        return NetatmoClient.compute_statistics(history)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Benchmarks du CLI Netatmo (temps de démarrage, commandes contre l'API simulée)."""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+CLI = str(Path(__file__).parent / 'netatmo_cli.py')
+
+# Modules qui ne doivent pas être importés tant qu'aucune commande n'a besoin du réseau
+HEAVY_MODULES = ('requests', 'urllib3', 'dotenv', 'numpy', 'aiohttp', 'sqlite3', 'netatmo_client')
+
+# Invocations mesurées au démarrage : (nom, arguments)
+STARTUP_CASES = [
+    ('--version', ['--version']),
+    ('--help', ['--help']),
+    ('status --help', ['status', '--help']),
+    ('erreur d\'argument', ['set', 'abc']),
+]
+
+# Commandes mesurées contre l'API simulée : (nom, arguments)
+COMMAND_CASES = [
+    ('status', ['status']),
+    ('status --all', ['status', '--all']),
+    ('set', ['set', '20.5']),
+    ('set-many', ['set-many', 'room-0-1=18', 'room-0-2=schedule']),
+    ('frost-guard', ['frost-guard', 'on']),
+    ('history', ['history', '--days', '7']),
+    ('history --no-store', ['history', '--days', '7', '--no-store']),
+    ('history 365j', ['history', '--days', '365', '--scale', '1hour']),
+    ('stats', ['stats', '--days', '30']),
+    ('stats --metrics all', ['stats', '--days', '365', '--scale', '1hour', '--metrics', 'all']),
+]
+
+# Métriques comparées par --compare (une hausse au-delà de la tolérance est une régression)
+COMPARED_METRICS = ('cold_ms', 'warm_ms', 'cold_requests', 'warm_requests', 'peak_rss_mb')
+
+
+def time_command(command: List[str], runs: int) -> List[float]:
+    """Exécute une commande `runs` fois et retourne les durées en millisecondes."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def imported_modules(args: List[str]) -> List[str]:
+    """Liste les modules importés par une invocation du CLI (via -X importtime)."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', CLI] + args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.append(line.rsplit('|', 1)[1].strip())
+    return modules
+
+
+def bench_startup(args: argparse.Namespace) -> int:
+    """Mesure le démarrage à froid du CLI et le compare au budget."""
+    baseline = statistics.median(time_command([sys.executable, '-c', 'pass'], args.runs))
+    print(f"Interpréteur seul (python -c pass): {baseline:.1f} ms (médiane sur {args.runs})")
+    print()
+
+    rows: List[Dict[str, float]] = []
+    over_budget = False
+    for name, cli_args in STARTUP_CASES:
+        durations = time_command([sys.executable, CLI] + cli_args, args.runs)
+        median = statistics.median(durations)
+        over = median > args.budget
+        over_budget = over_budget or over
+        rows.append({'name': name, 'median': median, 'min': min(durations), 'cli': median - baseline})
+        print(f"{name:<20} médiane {median:7.1f} ms   min {min(durations):7.1f} ms   "
+              f"CLI {median - baseline:6.1f} ms   {'✗ hors budget' if over else '✓'}")
+
+    heavy = sorted(
+        {module.split('.')[0] for module in imported_modules(['--help'])} & set(HEAVY_MODULES)
+    )
+    print()
+    if heavy:
+        print(f"✗ Modules lourds importés par --help: {', '.join(heavy)}")
+    else:
+        print("✓ Aucun module lourd importé par --help")
+
+    print(f"Budget: {args.budget:.0f} ms par invocation (médiane)")
+    return 1 if over_budget or heavy else 0
+
+
+def run_measured(command: List[str], env: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Exécute une commande et mesure sa durée et sa mémoire résidente maximale.
+
+    Returns:
+        {'ms', 'rss_mb', 'returncode', 'stderr'}
+    """
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=stderr, env=env)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = (time.perf_counter() - start) * 1000
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stderr.seek(0)
+        message = stderr.read().decode('utf-8', 'replace').strip()
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return {'ms': elapsed, 'rss_mb': rss, 'returncode': process.returncode, 'stderr': message}
+
+
+def bench_env(server_url: str, cache_dir: str) -> Dict[str, str]:
+    """Environnement du CLI pointant vers l'API simulée, avec un cache dédié."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith('NETATMO_')}
+    env.update({
+        'NETATMO_API_URL': server_url,
+        'NETATMO_CLIENT_ID': 'benchmark',
+        'NETATMO_CLIENT_SECRET': 'benchmark',
+        'NETATMO_REFRESH_TOKEN': 'benchmark',
+        'NETATMO_CACHE_DIR': cache_dir,
+        # Le limiteur de débit fausserait les mesures de latence
+        'NETATMO_RATE_LIMIT_10S': '0',
+        'NETATMO_RATE_LIMIT_HOUR': '0',
+    })
+    return env
+
+
+def bench_case(server: Any, cli_args: List[str], runs: int) -> Dict[str, Any]:
+    """
+    Mesure une commande : une exécution à froid (cache vide) puis `runs`
+    exécutions à chaud (token, topologie et caches déjà présents).
+    """
+    command = [sys.executable, CLI] + cli_args + ['--no-daemon']
+    with tempfile.TemporaryDirectory(prefix='netatmo-bench-') as cache_dir:
+        env = bench_env(server.url, cache_dir)
+
+        server.reset_stats()
+        cold = run_measured(command, env)
+        cold_requests = server.stats()['requests']
+
+        warm_runs = []
+        server.reset_stats()
+        for _ in range(runs):
+            warm_runs.append(run_measured(command, env))
+        warm_requests = server.stats()['requests'] / runs if runs else 0
+
+    failed = next((run for run in [cold] + warm_runs if run['returncode'] != 0), None)
+    return {
+        'cold_ms': cold['ms'],
+        'warm_ms': statistics.median(run['ms'] for run in warm_runs) if warm_runs else cold['ms'],
+        'cold_requests': cold_requests,
+        'warm_requests': warm_requests,
+        'peak_rss_mb': max(run['rss_mb'] for run in [cold] + warm_runs),
+        'error': (failed['stderr'].splitlines() or [f"code {failed['returncode']}"])[-1] if failed else None,
+    }
+
+
+def compare_results(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                    tolerance: float) -> List[str]:
+    """Liste les régressions par rapport à une référence enregistrée avec --save."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = reference.get(metric), result.get(metric)
+            if before is None or after is None:
+                continue
+            # Les nombres de requêtes ne doivent pas augmenter du tout
+            limit = before if metric.endswith('requests') else before * (1 + tolerance)
+            if after > limit:
+                regressions.append(f"{name}: {metric} {before:.1f} → {after:.1f}")
+    return regressions
+
+
+def bench_commands(args: argparse.Namespace) -> int:
+    """Mesure chaque commande du CLI contre l'API Netatmo simulée."""
+    from mock_server import create_server
+
+    server = create_server(args)
+    server.start()
+    try:
+        print(f"API simulée: {server.url} ({args.homes} maison(s), {args.rooms} pièce(s), "
+              f"{args.history_days} jours, latence {args.latency * 1000:.0f} ms, "
+              f"erreurs {args.error_rate:.0%})")
+        print()
+        header = f"{'commande':<22} {'froid':>9} {'chaud':>9} {'req. froid':>10} {'req. chaud':>10} {'RSS max':>9}"
+        if not args.json:
+            print(header)
+            print('-' * len(header))
+
+        results: Dict[str, Dict[str, Any]] = {}
+        selected = [case for case in COMMAND_CASES if not args.only or case[0] in args.only]
+        for name, cli_args in selected:
+            result = bench_case(server, cli_args, args.runs)
+            results[name] = result
+            if not args.json:
+                print(f"{name:<22} {result['cold_ms']:7.1f}ms {result['warm_ms']:7.1f}ms "
+                      f"{result['cold_requests']:>10} {result['warm_requests']:>10.1f} "
+                      f"{result['peak_rss_mb']:6.1f} Mo"
+                      + (f"   ✗ {result['error']}" if result['error'] else ''))
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n✓ Résultats enregistrés dans {args.save}")
+
+    failed = [name for name, result in results.items() if result['error']]
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        print()
+        if regressions:
+            print(f"✗ Régressions par rapport à {args.compare} (tolérance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+        else:
+            print(f"✓ Aucune régression par rapport à {args.compare}")
+
+    if failed:
+        print(f"✗ Commandes en échec: {', '.join(failed)}")
+    return 1 if failed or regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks du CLI Netatmo')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    parser_startup = subparsers.add_parser('startup', help='Temps de démarrage à froid du CLI')
+    parser_startup.add_argument('--runs', type=int, default=10, help='Nombre d\'exécutions par cas (défaut: 10)')
+    parser_startup.add_argument('--budget', type=float, default=150,
+                                help='Budget en millisecondes par invocation (défaut: 150)')
+    parser_startup.set_defaults(func=bench_startup)
+
+    from mock_server import add_account_arguments
+
+    parser_commands = subparsers.add_parser('commands', help='Latence, requêtes et mémoire de chaque commande '
+                                                             '(API simulée locale)')
+    parser_commands.add_argument('--runs', type=int, default=3,
+                                 help='Exécutions à chaud par commande (défaut: 3)')
+    parser_commands.add_argument('--only', nargs='+', metavar='COMMANDE',
+                                 help='Ne mesurer que ces cas (ex: status "stats --metrics all")')
+    parser_commands.add_argument('--json', action='store_true', help='Résultats en JSON')
+    parser_commands.add_argument('--save', metavar='FICHIER', help='Enregistrer les résultats (référence)')
+    parser_commands.add_argument('--compare', metavar='FICHIER', help='Comparer à une référence enregistrée')
+    parser_commands.add_argument('--tolerance', type=float, default=0.25,
+                                 help='Hausse de latence/mémoire tolérée par --compare (défaut: 0.25)')
+    add_account_arguments(parser_commands)
+    parser_commands.set_defaults(func=bench_commands)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
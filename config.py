@@ -1,7 +1,9 @@
 """Gestion de la configuration et des identifiants API Netatmo."""
 import os
 from pathlib import Path
-from dotenv import load_dotenv
+
+# Version du CLI (affichée par --version et envoyée dans le User-Agent)
+__version__ = '1.0.0'
 
 def _should_load_dotenv():
     """
@@ -28,22 +30,86 @@ def _should_load_dotenv():
     # Sinon, on peut charger le .env
     return True
 
-# Charger les variables d'environnement depuis .env si nécessaire
-if _should_load_dotenv():
-    env_path = Path(__file__).parent / '.env'
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path, override=False)
+
+# .env chargé au plus une fois par processus
+_dotenv_loaded = False
+
+
+def load_env() -> None:
+    """
+    Charge les variables d'environnement depuis .env si nécessaire.
+    
+    Appelé à la création de la configuration plutôt qu'à l'import du module :
+    `--help`, `--version` et les erreurs d'arguments n'importent pas python-dotenv.
+    """
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    if _should_load_dotenv():
+        env_path = Path(__file__).parent / '.env'
+        if env_path.exists():
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=env_path, override=False)
 
 
 class Config:
     """Configuration pour l'API Netatmo."""
     
     def __init__(self):
+        load_env()
         self.client_id = os.getenv('NETATMO_CLIENT_ID')
         self.client_secret = os.getenv('NETATMO_CLIENT_SECRET')
         self.username = os.getenv('NETATMO_USERNAME')
         self.password = os.getenv('NETATMO_PASSWORD')
         self.refresh_token = os.getenv('NETATMO_REFRESH_TOKEN')
+        # URL de l'API (un serveur local, voir mock_server.py, pour les tests et benchmarks)
+        self.api_url = os.getenv('NETATMO_API_URL', 'https://api.netatmo.com').rstrip('/')
+        # Répertoire des caches locaux (tokens, ...) partagés entre les invocations
+        # Chemin absolu : les caches ouverts à la demande ne dépendent pas du répertoire courant
+        self.cache_dir = Path(
+            os.getenv('NETATMO_CACHE_DIR')
+            or Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache') / 'netatmo-cli'
+        ).expanduser().absolute()
+        self.token_cache_path = Path(
+            os.getenv('NETATMO_TOKEN_CACHE') or self.cache_dir / 'token.json'
+        )
+        # Topologie des maisons (/api/homesdata) mise en cache, durée de validité en secondes
+        self.topology_cache_path = self.cache_dir / 'topology.json'
+        self.topology_ttl = float(os.getenv('NETATMO_TOPOLOGY_TTL', '3600'))
+        # Stockage local (SQLite) des mesures historiques, synchronisé de façon incrémentale
+        self.measure_store_path = Path(
+            os.getenv('NETATMO_MEASURE_STORE') or self.cache_dir / 'measures.sqlite'
+        )
+        # Pool de connexions HTTP (keep-alive) et timeouts en secondes
+        self.pool_size = int(os.getenv('NETATMO_POOL_SIZE', '10'))
+        self.connect_timeout = float(os.getenv('NETATMO_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = float(os.getenv('NETATMO_READ_TIMEOUT', '30'))
+        # Nombre maximal de requêtes API simultanées (client asyncio, appels parallèles)
+        self.max_concurrency = int(os.getenv('NETATMO_MAX_CONCURRENCY', '8'))
+        # Quotas de l'API Netatmo (requêtes par 10 secondes et par heure, 0 = pas de limite),
+        # partagés entre tous les processus qui utilisent le même répertoire de cache
+        self.rate_limit_10s = int(os.getenv('NETATMO_RATE_LIMIT_10S', '50'))
+        self.rate_limit_hour = int(os.getenv('NETATMO_RATE_LIMIT_HOUR', '500'))
+        self.rate_limit_path = self.cache_dir / 'ratelimit.json'
+        # Nouvelles tentatives (erreurs 5xx, 429, réseau) et disjoncteur
+        self.max_retries = int(os.getenv('NETATMO_MAX_RETRIES', '3'))
+        self.retry_max_delay = float(os.getenv('NETATMO_RETRY_MAX_DELAY', '30'))
+        self.circuit_threshold = int(os.getenv('NETATMO_CIRCUIT_THRESHOLD', '5'))
+        self.circuit_reset = float(os.getenv('NETATMO_CIRCUIT_RESET', '30'))
+        # Statut des maisons en cache, mis à jour par les consignes envoyées (write-through),
+        # et durée de réconciliation avec l'API en secondes (0 = pas de cache)
+        self.status_cache_path = self.cache_dir / 'status.json'
+        self.status_ttl = float(os.getenv('NETATMO_STATUS_TTL', '60'))
+        # Réponses GET de l'API en cache disque (TTL par endpoint, LRU au-delà de la taille en Mo, 0 = désactivé)
+        self.response_cache_path = Path(
+            os.getenv('NETATMO_RESPONSE_CACHE') or self.cache_dir / 'responses.sqlite'
+        )
+        self.response_cache_size = int(float(os.getenv('NETATMO_RESPONSE_CACHE_MB', '50')) * 1024 * 1024)
+        # Démon : socket Unix locale
+        self.daemon_socket_path = Path(
+            os.getenv('NETATMO_DAEMON_SOCKET') or self.cache_dir / 'daemon.sock'
+        )
         
     def validate(self):
         """Valide que toutes les variables requises sont présentes."""
@@ -0,0 +1,211 @@
+"""Mode démon : un NetatmoClient chaud servi aux commandes du CLI via une socket Unix locale."""
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from contextlib import nullcontext, redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from instrumentation import timings_report
+from profiling import profile_command
+
+# Commandes que le CLI transmet au démon lorsqu'il tourne
+FORWARDED_COMMANDS = ('status', 'set', 'set-many', 'frost-guard', 'history', 'stats')
+
+
+def account_identity(config: Any) -> Dict[str, Optional[str]]:
+    """Compte servi par une configuration : application, API et répertoire de cache (absolu)."""
+    return {
+        'client_id': config.client_id,
+        'api_url': config.api_url,
+        'cache_dir': str(Path(config.cache_dir).expanduser().resolve()),
+    }
+
+
+def forward(socket_path: Path, argv: List[str],
+            account: Optional[Dict[str, Optional[str]]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Transmet une ligne de commande au démon.
+
+    Args:
+        socket_path: Chemin de la socket Unix
+        argv: Arguments de la ligne de commande (sans le nom du programme), chemins absolus :
+            le démon garde son propre répertoire courant
+        account: Compte de l'appelant (voir account_identity) ; le démon refuse un autre compte
+
+    Returns:
+        Réponse du démon ({'stdout', 'stderr', 'exit_code'}), ou None si aucun
+        démon n'écoute sur la socket ou s'il sert un autre compte (la commande
+        doit alors être exécutée localement). Une fois la requête envoyée, le
+        démon a pu exécuter la commande : une réponse illisible devient une
+        erreur, jamais une nouvelle exécution locale (un `set` serait appliqué
+        deux fois).
+    """
+    if not os.path.exists(socket_path):
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps({'argv': argv, 'account': account}).encode('utf-8') + b'\n')
+        except OSError:
+            return None
+        try:
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            response = json.loads(b''.join(chunks).decode('utf-8'))
+        except (OSError, ValueError) as e:
+            return {'stdout': '', 'exit_code': 1,
+                    'stderr': f"Erreur: réponse du démon illisible ({e}), la commande a pu être exécutée\n"}
+    return None if response.get('refused') else response
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Lit une requête JSON (une ligne) et renvoie la sortie de la commande."""
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            argv = [str(arg) for arg in request['argv']]
+            account = request.get('account')
+        except (ValueError, KeyError, TypeError, AttributeError):
+            response = {'stdout': '', 'stderr': 'Erreur: requête invalide\n', 'exit_code': 2}
+        else:
+            if self.server.account is not None and account != self.server.account:
+                # Autre application, autre API ou autres caches : la commande est exécutée localement
+                response = {'stdout': '', 'stderr': 'Erreur: le démon sert un autre compte\n',
+                            'exit_code': 2, 'refused': True}
+            else:
+                response = self.server.execute(argv)
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serveur Unix qui exécute les commandes du CLI avec un client partagé.
+
+    Le client garde son token, sa topologie, sa session HTTP et son cache de
+    statut entre les commandes. Les commandes sont exécutées l'une après
+    l'autre : la capture de stdout/stderr est globale au processus.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, client: Any, parser: Any,
+                 account: Optional[Dict[str, Optional[str]]] = None):
+        """
+        Args:
+            socket_path: Chemin de la socket Unix
+            client: NetatmoClient partagé par toutes les commandes
+            parser: Parser argparse du CLI
+            account: Compte servi (voir account_identity) ; les requêtes d'un autre compte
+                sont refusées (None : pas de vérification)
+        """
+        self.client = client
+        self.parser = parser
+        self.account = account
+        self.command_lock = threading.Lock()
+        super().__init__(str(socket_path), DaemonRequestHandler)
+
+    def execute(self, argv: List[str]) -> Dict[str, Any]:
+        """
+        Exécute une ligne de commande du CLI et capture sa sortie.
+
+        Le répertoire courant du démon ne change pas (il est partagé par ses
+        threads et ses caches ouverts à la demande) : le CLI transmet des chemins absolus.
+        """
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        exit_code = 0
+
+        with self.command_lock, redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                args = self.parser.parse_args(argv)
+                if args.command not in FORWARDED_COMMANDS or getattr(args, 'watch', False):
+                    print(f"Erreur: commande non disponible via le démon: {args.command}", file=sys.stderr)
+                    exit_code = 2
+                else:
+                    profile = getattr(args, 'profile', False) or bool(getattr(args, 'profile_output', None))
+                    no_cache = getattr(args, 'no_cache', False)
+                    max_age = getattr(args, 'max_age', None)
+                    # La politique de cache ne vaut que pour cette commande (client partagé)
+                    cache_policy = (self.client.cache_policy(no_cache, max_age)
+                                    if no_cache or max_age is not None else nullcontext())
+                    with cache_policy, timings_report(self.client, getattr(args, 'timings', False)), \
+                            profile_command(profile, getattr(args, 'profile_output', None)):
+                        args.func(self.client, args)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception as e:
+                print(f"Erreur: {e}", file=sys.stderr)
+                exit_code = 1
+
+        return {'stdout': stdout.getvalue(), 'stderr': stderr.getvalue(), 'exit_code': exit_code}
+
+
+def _check_stale_socket(socket_path: Path) -> None:
+    """Supprime une socket laissée par un démon arrêté, refuse si un démon répond encore."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise ValueError(f"Un démon écoute déjà sur {socket_path}")
+
+
+def serve(config: Any, socket_path: Path, status_ttl: float, parser: Any) -> None:
+    """
+    Lance le démon au premier plan jusqu'à SIGTERM ou Ctrl+C.
+
+    Args:
+        config: Configuration Netatmo
+        socket_path: Chemin de la socket Unix
+        status_ttl: Durée de validité du cache de /api/homestatus en secondes
+        parser: Parser argparse du CLI
+    """
+    from netatmo_client import NetatmoClient
+
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    _check_stale_socket(socket_path)
+
+    client = NetatmoClient(config, status_ttl=status_ttl)
+    # Préchauffage : token et topologie prêts avant la première commande
+    client.get_topology()
+
+    # Socket accessible au seul utilisateur : le démon agit avec ses identifiants
+    previous_umask = os.umask(0o177)
+    try:
+        server = DaemonServer(socket_path, client, parser, account_identity(config))
+    finally:
+        os.umask(previous_umask)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"✓ Démon Netatmo à l'écoute sur {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        client.close()
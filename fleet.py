@@ -0,0 +1,200 @@
+"""Mode flotte : une commande exécutée sur plusieurs comptes Netatmo en parallèle (un processus par compte)."""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Commandes disponibles en mode flotte
+FLEET_ACTIONS = ('status', 'stats', 'set')
+
+# Nombre maximal de processus par défaut (un compte par processus)
+MAX_WORKERS = 32
+
+# Champs d'un compte et variable d'environnement correspondante
+ACCOUNT_FIELDS = {
+    'client_id': 'NETATMO_CLIENT_ID',
+    'client_secret': 'NETATMO_CLIENT_SECRET',
+    'username': 'NETATMO_USERNAME',
+    'password': 'NETATMO_PASSWORD',
+    'refresh_token': 'NETATMO_REFRESH_TOKEN',
+    'api_url': 'NETATMO_API_URL',
+    'cache_dir': 'NETATMO_CACHE_DIR',
+}
+
+# Variables propres à un compte : jamais héritées de l'environnement du processus parent
+# (identifiants du .env, caches d'un autre compte)
+ACCOUNT_VARIABLES = tuple(ACCOUNT_FIELDS.values()) + (
+    'NETATMO_TOKEN_CACHE', 'NETATMO_MEASURE_STORE', 'NETATMO_RESPONSE_CACHE', 'NETATMO_DAEMON_SOCKET',
+)
+
+
+def load_accounts(path: str) -> List[Dict[str, Any]]:
+    """
+    Lit le fichier de flotte.
+
+    Format : {"env": {...}, "accounts": [{"name", "client_id", "client_secret",
+    "refresh_token" (ou "username" et "password"), "api_url", "cache_dir", "env"}]}
+    ou directement la liste des comptes. "env" fixe des variables NETATMO_*
+    (quotas, timeouts, ...) pour tous les comptes ou pour un seul.
+
+    Raises:
+        ValueError: Fichier illisible ou compte incomplet
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Fichier de flotte illisible ({path}): {e}")
+
+    defaults: Dict[str, Any] = {}
+    if isinstance(data, dict):
+        defaults = data.get('env') or {}
+        data = data.get('accounts')
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"Aucun compte dans le fichier de flotte {path}")
+
+    accounts = []
+    names = set()
+    for index, account in enumerate(data, 1):
+        if not isinstance(account, dict):
+            raise ValueError(f"Compte n°{index}: un objet JSON est attendu")
+        name = str(account.get('name') or '')
+        if not name:
+            raise ValueError(f"Compte n°{index}: nom manquant")
+        if name in ('.', '..') or Path(name).name != name:
+            raise ValueError(f"Compte {name}: le nom sert de répertoire de cache, sans '/'")
+        if name in names:
+            raise ValueError(f"Compte {name}: nom en double")
+        names.add(name)
+        if not account.get('client_id') or not account.get('client_secret'):
+            raise ValueError(f"Compte {name}: client_id et client_secret sont requis")
+        if not account.get('refresh_token') and not (account.get('username') and account.get('password')):
+            raise ValueError(f"Compte {name}: refresh_token (ou username et password) requis")
+        unknown = [key for key in account if key not in ACCOUNT_FIELDS and key not in ('name', 'env')]
+        if unknown:
+            raise ValueError(f"Compte {name}: champs inconnus: {', '.join(unknown)}")
+        accounts.append(dict(account, env=dict(defaults, **(account.get('env') or {}))))
+    return accounts
+
+
+def account_environment(account: Dict[str, Any], base_env: Dict[str, str], cache_root: Path) -> Dict[str, str]:
+    """
+    Variables d'environnement d'un compte.
+
+    Les réglages du parent (quotas, timeouts, ...) sont conservés, ses
+    identifiants et ses caches non : chaque compte a son propre répertoire de
+    cache (token, topologie, statut, quotas), par défaut `cache_root/<nom>`.
+    """
+    env = {key: value for key, value in base_env.items() if key not in ACCOUNT_VARIABLES}
+    env['NETATMO_CACHE_DIR'] = str(cache_root / account['name'])
+    env.update({key: str(value) for key, value in account['env'].items()})
+    # Les champs du compte priment sur les variables "env" communes
+    for field, variable in ACCOUNT_FIELDS.items():
+        if account.get(field):
+            env[variable] = str(Path(account[field]).expanduser()) if field == 'cache_dir' else str(account[field])
+    return env
+
+
+def _json_default(value: Any) -> Any:
+    """Valeurs NumPy et autres objets non sérialisables des statistiques avancées."""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def run_account(name: str, env: Dict[str, str], action: str, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Exécute une commande pour un compte (dans un processus du pool).
+
+    Returns:
+        Lignes JSONL du compte ; une erreur donne une ligne {'account', 'command', 'error'}
+        sans interrompre les autres comptes
+    """
+    started = time.perf_counter()
+    base = {'account': name, 'command': action}
+    # Le processus sert plusieurs comptes à la suite : l'environnement est remplacé en entier
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        from config import Config
+        from netatmo_client import NetatmoClient
+
+        # stdout est réservé au flux JSONL : les messages du client (authentification) vont sur stderr
+        with redirect_stdout(sys.stderr), NetatmoClient(Config()) as client, \
+                client.cache_policy(options.get('no_cache', False), options.get('max_age')):
+            if action == 'status':
+                rows = [dict(base, **row) for row in client.get_all_status()]
+            elif action == 'stats':
+                stats = client.get_statistics(options.get('days', 7), scale=options.get('scale', '1hour'),
+                                              metrics=options.get('metrics'))
+                rows = [dict(base, period_days=options.get('days', 7), **stats)]
+            elif action == 'set':
+                response = client.set_temperature(options['temperature'], force=options.get('force', False))
+                rows = [dict(base, temperature=options['temperature'],
+                             status='unchanged' if response.get('unchanged') else 'success')]
+            else:
+                raise ValueError(f"Commande inconnue: {action} (valeurs possibles: {', '.join(FLEET_ACTIONS)})")
+    except Exception as e:
+        rows = [dict(base, error=str(e) or e.__class__.__name__)]
+    elapsed = round((time.perf_counter() - started) * 1000, 1)
+    return [dict(row, duration_ms=elapsed) for row in rows]
+
+
+def run_fleet(accounts: List[Dict[str, Any]], action: str, options: Optional[Dict[str, Any]] = None,
+              cache_root: Optional[Path] = None, max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Exécute une commande sur tous les comptes, un processus par compte.
+
+    Les lignes sont produites dès qu'un compte a terminé : la durée totale est
+    celle du compte le plus lent (tant qu'il y a un processus par compte), et
+    un compte en échec ou bloqué jusqu'à son timeout ne retarde pas la sortie
+    des autres.
+
+    Args:
+        accounts: Comptes (voir load_accounts)
+        action: 'status', 'stats' ou 'set'
+        options: Options de la commande (days, scale, metrics, temperature, force, no_cache, max_age)
+        cache_root: Répertoire parent des caches des comptes
+        max_workers: Nombre de processus (défaut: un par compte, au plus MAX_WORKERS)
+    """
+    if action not in FLEET_ACTIONS:
+        raise ValueError(f"Commande inconnue: {action} (valeurs possibles: {', '.join(FLEET_ACTIONS)})")
+    if cache_root is None:
+        from config import Config
+        cache_root = Config().cache_dir / 'fleet'
+    options = options or {}
+    base_env = dict(os.environ)
+    workers = max(1, min(max_workers or MAX_WORKERS, len(accounts)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_account, account['name'], account_environment(account, base_env, cache_root),
+                            action, options): account['name']
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            try:
+                rows = future.result()
+            except Exception as e:
+                # Processus du pool interrompu (mémoire, signal) : seul ce compte est en erreur
+                rows = [{'account': futures[future], 'command': action, 'error': str(e) or e.__class__.__name__}]
+            yield from rows
+
+
+def print_fleet(rows: Iterator[Dict[str, Any]], stream: Optional[Any] = None) -> Dict[str, int]:
+    """Écrit les lignes au format JSONL au fil de l'eau et compte les comptes en erreur."""
+    stream = stream or sys.stdout
+    accounts = set()
+    failed = set()
+    for row in rows:
+        accounts.add(row['account'])
+        if 'error' in row and 'home_id' not in row:
+            failed.add(row['account'])
+        stream.write(json.dumps(row, ensure_ascii=False, default=_json_default) + '\n')
+        stream.flush()
+    return {'accounts': len(accounts), 'failed': len(failed)}
@@ -0,0 +1,197 @@
+"""Instrumentation des appels HTTP : événements par requête, observateurs et rapport --timings."""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+# Phases de connexion mesurées par timed_adapter, par thread (la connexion est
+# ouverte dans le thread qui envoie la requête)
+_connection_timings = threading.local()
+
+
+def reset_connection_timings() -> None:
+    """Remet à zéro les phases de connexion du thread courant (avant une requête)."""
+    _connection_timings.phases = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+    _connection_timings.new_connection = False
+
+
+def record_connection_timings(dns: float, connect: float, tls: float) -> None:
+    """Enregistre les phases d'ouverture d'une nouvelle connexion (appelé par timed_adapter)."""
+    if not hasattr(_connection_timings, 'phases'):
+        reset_connection_timings()
+    _connection_timings.phases['dns'] += dns
+    _connection_timings.phases['connect'] += connect
+    _connection_timings.phases['tls'] += tls
+    _connection_timings.new_connection = True
+
+
+def connection_timings() -> Dict[str, Any]:
+    """Phases de connexion mesurées depuis le dernier reset (0 si la connexion a été réutilisée)."""
+    if not hasattr(_connection_timings, 'phases'):
+        reset_connection_timings()
+    return dict(_connection_timings.phases, new_connection=_connection_timings.new_connection)
+
+
+class RequestEvent:
+    """
+    Mesures d'un appel HTTP à l'API (une tentative).
+
+    Les durées sont en secondes : `dns`, `connect` et `tls` ne sont non nulles
+    que si une nouvelle connexion a été ouverte ; `wait` est l'attente de la
+    réponse (envoi compris) et `transfer` la lecture du corps.
+    """
+
+    def __init__(self, method: str, endpoint: str, status: Optional[int] = None, size: int = 0,
+                 dns: float = 0.0, connect: float = 0.0, tls: float = 0.0, wait: float = 0.0,
+                 transfer: float = 0.0, total: float = 0.0, attempt: int = 0, rate_limit_wait: float = 0.0,
+                 new_connection: bool = False, error: Optional[str] = None):
+        self.method = method
+        self.endpoint = endpoint
+        self.status = status
+        self.size = size
+        self.dns = dns
+        self.connect = connect
+        self.tls = tls
+        self.wait = wait
+        self.transfer = transfer
+        self.total = total
+        self.attempt = attempt
+        self.rate_limit_wait = rate_limit_wait
+        self.new_connection = new_connection
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return (f"RequestEvent({self.method} {self.endpoint} {self.status}, "
+                f"{self.total * 1000:.1f}ms, tentative {self.attempt})")
+
+
+class RequestObserver:
+    """
+    Observateur des appels HTTP du client (NetatmoClient.add_observer).
+
+    `on_request` est appelé après chaque tentative, succès ou échec, dans le
+    thread qui a fait l'appel. Une exception levée par un observateur est
+    ignorée : l'instrumentation ne doit pas faire échouer une commande.
+    """
+
+    def on_request(self, event: RequestEvent) -> None:
+        pass
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+class TimingsReport(RequestObserver):
+    """Collecte les appels d'une commande et produit le rapport de --timings."""
+
+    def __init__(self):
+        self.events: List[RequestEvent] = []
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def on_request(self, event: RequestEvent) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def stop(self) -> None:
+        """Fige la durée de la commande."""
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def by_endpoint(self) -> List[Dict[str, Any]]:
+        """Agrégats par endpoint, du plus coûteux au moins coûteux."""
+        endpoints: Dict[str, Dict[str, Any]] = {}
+        for event in self.events:
+            entry = endpoints.setdefault(event.endpoint, {
+                'endpoint': event.endpoint, 'calls': 0, 'errors': 0, 'retries': 0, 'bytes': 0, 'total': 0.0,
+            })
+            entry['calls'] += 1
+            entry['errors'] += 0 if event.ok else 1
+            entry['retries'] += 1 if event.attempt else 0
+            entry['bytes'] += event.size
+            entry['total'] += event.total
+        return sorted(endpoints.values(), key=lambda entry: entry['total'], reverse=True)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totaux de la commande (format JSON)."""
+        api_time = sum(event.total for event in self.events)
+        return {
+            'command_ms': round(self.elapsed * 1000, 1),
+            'api_calls': len(self.events),
+            'api_ms': round(api_time * 1000, 1),
+            'retries': sum(1 for event in self.events if event.attempt),
+            'errors': sum(1 for event in self.events if not event.ok),
+            'bytes': sum(event.size for event in self.events),
+            'rate_limit_wait_ms': round(sum(event.rate_limit_wait for event in self.events) * 1000, 1),
+            'new_connections': sum(1 for event in self.events if event.new_connection),
+        }
+
+    def format(self) -> str:
+        """Rapport lisible : un appel par ligne, puis les totaux et la répartition par endpoint."""
+        if not self.events:
+            return f"\nAucun appel API (réponse en cache) : commande {self.elapsed * 1000:.1f} ms"
+        lines = ['', 'Appels API (durées en ms) :']
+        header = (f"{'#':>3}  {'requête':<26} {'statut':>6} {'octets':>8} {'DNS':>6} {'connex.':>7} "
+                  f"{'TLS':>6} {'attente':>8} {'transfert':>9} {'total':>8} {'essai':>5} {'quota':>6}")
+        lines.append(header)
+        lines.append('-' * len(header))
+        for index, event in enumerate(self.events, 1):
+            lines.append(
+                f"{index:>3}  {event.method + ' ' + event.endpoint:<26} {event.status or '-':>6} {event.size:>8} "
+                f"{_ms(event.dns):>6} {_ms(event.connect):>7} {_ms(event.tls):>6} {_ms(event.wait):>8} "
+                f"{_ms(event.transfer):>9} {_ms(event.total):>8} {event.attempt + 1:>5} {_ms(event.rate_limit_wait):>6}"
+                + (f"  {event.error}" if event.error else '')
+            )
+
+        summary = self.summary()
+        share = summary['api_ms'] / summary['command_ms'] if summary['command_ms'] else 0
+        lines.append('')
+        lines.append(
+            f"Total : {summary['api_calls']} appel(s) API, {summary['retries']} nouvelle(s) tentative(s), "
+            f"{summary['errors']} erreur(s), {summary['new_connections']} connexion(s) ouverte(s), "
+            f"{summary['bytes']} octets"
+        )
+        lines.append(
+            f"Commande : {summary['command_ms']:.1f} ms dont {summary['api_ms']:.1f} ms d'API ({share:.0%}), "
+            f"attente quota {summary['rate_limit_wait_ms']:.1f} ms"
+        )
+        for entry in self.by_endpoint():
+            part = entry['total'] / self.elapsed if self.elapsed else 0
+            lines.append(f"  {entry['endpoint']:<24} {entry['calls']:>3} appel(s) {_ms(entry['total']):>9} ms ({part:.0%})")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def timings_report(client: Any, enabled: bool = True, stream: Optional[TextIO] = None) -> Iterator[Optional[TimingsReport]]:
+    """
+    Observe les appels d'un client pendant une commande et affiche le rapport à la fin.
+
+    Args:
+        client: Client exposant add_observer/remove_observer
+        enabled: False pour exécuter la commande sans instrumentation
+        stream: Flux du rapport (défaut: sys.stderr au moment de l'affichage)
+    """
+    if not enabled:
+        yield None
+        return
+    report = TimingsReport()
+    client.add_observer(report)
+    try:
+        yield report
+    finally:
+        report.stop()
+        client.remove_observer(report)
+        print(report.format(), file=stream or sys.stderr)
@@ -0,0 +1,214 @@
+"""Stockage local (SQLite) des mesures historiques avec synchronisation incrémentale."""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from measures import SCALE_SECONDS, iter_points, encode_runs
+from timeseries import TimeSeries
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS measures (
+    home_id TEXT NOT NULL,
+    module_id TEXT NOT NULL,
+    measure_type TEXT NOT NULL,
+    scale TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (home_id, module_id, measure_type, scale, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    home_id TEXT NOT NULL,
+    module_id TEXT NOT NULL,
+    measure_type TEXT NOT NULL,
+    scale TEXT NOT NULL,
+    covered_begin INTEGER NOT NULL,
+    covered_end INTEGER NOT NULL,
+    PRIMARY KEY (home_id, module_id, measure_type, scale, covered_begin)
+) WITHOUT ROWID;
+"""
+
+# Plage synchronisée : (début, fin), bornes incluses
+Interval = Tuple[int, int]
+
+# Signature d'une fonction de récupération : (types, date_begin, date_end) -> réponse getmeasure
+Fetcher = Callable[[List[str], int, int], Dict[str, Any]]
+
+
+def intersect_intervals(first: List[Interval], second: List[Interval]) -> List[Interval]:
+    """Intersection de deux listes triées de plages disjointes."""
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        begin = max(first[i][0], second[j][0])
+        end = min(first[i][1], second[j][1])
+        if begin <= end:
+            result.append((begin, end))
+        if first[i][1] < second[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class MeasureStore:
+    """
+    Série temporelle locale indexée par maison, module, type de mesure et échelle.
+
+    Pour chaque série, les plages déjà synchronisées sont mémorisées (disjointes,
+    fusionnées quand elles se chevauchent ou se touchent) : une synchronisation
+    ne télécharge que les trous entre ces plages. Le dernier point de chaque
+    plage est re-téléchargé car l'agrégat en cours n'était pas encore définitif.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Fichier de la base SQLite
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Connexion partageable entre threads (démon) : les appels restent séquentiels
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        # WAL : plusieurs processus peuvent lire pendant qu'un autre synchronise
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate(self) -> None:
+        """
+        Remplace l'ancien sync_state (une seule plage par série).
+
+        Cette plage a pu être élargie par-dessus des trous jamais téléchargés :
+        elle est abandonnée, les mesures restent et seront complétées à la
+        prochaine synchronisation.
+        """
+        columns = {row[1]: row[5] for row in self.conn.execute('PRAGMA table_info(sync_state)')}
+        if columns and not columns.get('covered_begin'):
+            with self.conn:
+                self.conn.execute('DROP TABLE sync_state')
+
+    def close(self) -> None:
+        """Ferme la base."""
+        self.conn.close()
+
+    def coverage(self, home_id: str, module_id: str, measure_type: str, scale: str) -> List[Interval]:
+        """Retourne les plages (début, fin) déjà synchronisées pour une série, triées (liste vide si aucune)."""
+        return [tuple(row) for row in self.conn.execute(
+            'SELECT covered_begin, covered_end FROM sync_state '
+            'WHERE home_id = ? AND module_id = ? AND measure_type = ? AND scale = ? ORDER BY covered_begin',
+            (home_id, module_id, measure_type, scale)
+        )]
+
+    def missing_ranges(self, home_id: str, module_id: str, types: List[str], scale: str,
+                       start_date: int, end_date: int) -> List[Interval]:
+        """Calcule les plages à télécharger pour couvrir [start_date, end_date] : tous les trous de la couverture."""
+        covered = self.coverage(home_id, module_id, types[0], scale)
+        for measure_type in types[1:]:
+            covered = intersect_intervals(covered, self.coverage(home_id, module_id, measure_type, scale))
+
+        step = SCALE_SECONDS[scale]
+        ranges = []
+        cursor = start_date
+        for begin, end in covered:
+            if begin > end_date:
+                break
+            if begin > cursor:
+                ranges.append((cursor, begin - 1))
+            # Le dernier pas couvert est re-téléchargé : l'agrégat en cours a pu évoluer
+            cursor = max(cursor, end - step)
+        if cursor <= end_date:
+            ranges.append((cursor, end_date))
+        return ranges
+
+    def insert(self, home_id: str, module_id: str, types: List[str], scale: str,
+               response: Dict[str, Any], start_date: int, end_date: int) -> int:
+        """
+        Enregistre une réponse getmeasure et ajoute [start_date, end_date] aux plages synchronisées.
+
+        La plage n'est fusionnée qu'avec celles qu'elle chevauche ou touche : un
+        trou entre deux synchronisations reste à télécharger.
+
+        Returns:
+            Nombre de points enregistrés
+        """
+        rows = []
+        for timestamp, values in iter_points(response.get('body')):
+            for index, measure_type in enumerate(types):
+                if index < len(values):
+                    rows.append((home_id, module_id, measure_type, scale, timestamp, values[index]))
+
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO measures (home_id, module_id, measure_type, scale, ts, value) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            for measure_type in types:
+                series = (home_id, module_id, measure_type, scale)
+                touching = 'WHERE home_id = ? AND module_id = ? AND measure_type = ? AND scale = ? ' \
+                           'AND covered_end >= ? AND covered_begin <= ?'
+                bounds = (start_date - 1, end_date + 1)
+                merged_begin, merged_end = self.conn.execute(
+                    f'SELECT MIN(covered_begin), MAX(covered_end) FROM sync_state {touching}', series + bounds
+                ).fetchone()
+                self.conn.execute(f'DELETE FROM sync_state {touching}', series + bounds)
+                self.conn.execute(
+                    'INSERT INTO sync_state (home_id, module_id, measure_type, scale, covered_begin, covered_end) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    series + (min(start_date, merged_begin if merged_begin is not None else start_date),
+                              max(end_date, merged_end if merged_end is not None else end_date))
+                )
+        return len(rows)
+
+    def sync(self, home_id: str, module_id: str, types: List[str], scale: str,
+             start_date: int, end_date: int, fetch: Fetcher) -> int:
+        """
+        Télécharge uniquement les plages manquantes de [start_date, end_date].
+
+        Args:
+            fetch: Fonction (types, date_begin, date_end) -> réponse getmeasure
+
+        Returns:
+            Nombre de points téléchargés
+        """
+        count = 0
+        for begin, end in self.missing_ranges(home_id, module_id, types, scale, start_date, end_date):
+            response = fetch(types, begin, end)
+            count += self.insert(home_id, module_id, types, scale, response, begin, end)
+        return count
+
+    def read(self, home_id: str, module_id: str, types: List[str], scale: str,
+             start_date: int, end_date: Optional[int] = None) -> Dict[str, Any]:
+        """Relit une plage au format d'une réponse getmeasure (une valeur par type et par point)."""
+        end_date = end_date if end_date is not None else int(time.time())
+        placeholders = ','.join('?' for _ in types)
+        cursor = self.conn.execute(
+            f'SELECT ts, measure_type, value FROM measures '
+            f'WHERE home_id = ? AND module_id = ? AND scale = ? AND measure_type IN ({placeholders}) '
+            f'AND ts BETWEEN ? AND ? ORDER BY ts',
+            (home_id, module_id, scale, *types, start_date, end_date)
+        )
+
+        index = {measure_type: i for i, measure_type in enumerate(types)}
+        points: List[Tuple[int, List[Any]]] = []
+        for timestamp, measure_type, value in cursor:
+            if not points or points[-1][0] != timestamp:
+                points.append((timestamp, [None] * len(types)))
+            points[-1][1][index[measure_type]] = value
+
+        return {'status': 'ok', 'body': encode_runs(points)}
+
+    def read_series(self, home_id: str, module_id: str, measure_type: str, scale: str,
+                    start_date: int, end_date: Optional[int] = None) -> TimeSeries:
+        """Relit une plage d'un type de mesure sous forme de TimeSeries compacte."""
+        end_date = end_date if end_date is not None else int(time.time())
+        cursor = self.conn.execute(
+            'SELECT ts, value FROM measures '
+            'WHERE home_id = ? AND module_id = ? AND measure_type = ? AND scale = ? '
+            'AND ts BETWEEN ? AND ? ORDER BY ts',
+            (home_id, module_id, measure_type, scale, start_date, end_date)
+        )
+        return TimeSeries.from_points(cursor)
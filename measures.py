@@ -0,0 +1,152 @@
+"""Outils pour les réponses de /api/getmeasure (parsing, découpage des plages, fusion des réponses)."""
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Durée d'un point (en secondes) pour chaque échelle de getmeasure
+SCALE_SECONDS = {
+    'max': 300,
+    '30min': 1800,
+    '1hour': 3600,
+    '3hours': 10800,
+    '1day': 86400,
+    '1week': 604800,
+    '1month': 2678400,
+}
+
+# Netatmo limite chaque réponse de getmeasure à 1024 points
+MEASURE_POINT_LIMIT = 1024
+
+# Types de mesures d'un thermostat : température, consigne et durées de chauffe (secondes par point,
+# boileron/boileroff à l'échelle max, sum_boiler_on/sum_boiler_off aux autres échelles)
+THERMOSTAT_TYPES = ('Temperature', 'sp_temperature', 'boileron', 'boileroff', 'sum_boiler_on', 'sum_boiler_off')
+
+
+def boiler_types(scale: str) -> List[str]:
+    """Types (chauffe, arrêt) des durées de fonctionnement de la chaudière disponibles à une échelle."""
+    return ['boileron', 'boileroff'] if scale == 'max' else ['sum_boiler_on', 'sum_boiler_off']
+
+
+def parse_types(value: str, scale: str = '1hour') -> List[str]:
+    """
+    Parse une liste de types séparés par des virgules (casse libre).
+
+    'boiler' est remplacé par les types de durées de chauffe de l'échelle (voir boiler_types).
+
+    Raises:
+        ValueError: Type inconnu
+    """
+    known = {measure_type.lower(): measure_type for measure_type in THERMOSTAT_TYPES}
+    types: List[str] = []
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        if name.lower() == 'boiler':
+            candidates = boiler_types(scale)
+        elif name.lower() in known:
+            candidates = [known[name.lower()]]
+        else:
+            raise ValueError(f"Type de mesure inconnu: {name} (valeurs possibles: {', '.join(THERMOSTAT_TYPES)}, boiler)")
+        types.extend(candidate for candidate in candidates if candidate not in types)
+    if not types:
+        raise ValueError("Aucun type de mesure")
+    return types
+
+
+def split_time_range(start_date: int, end_date: int, scale: str,
+                     limit: int = MEASURE_POINT_LIMIT) -> List[Tuple[int, int]]:
+    """
+    Découpe [start_date, end_date] en fenêtres d'au plus `limit` points à l'échelle donnée.
+
+    Les fenêtres sont contiguës et disjointes (bornes incluses).
+    """
+    if scale not in SCALE_SECONDS:
+        raise ValueError(f"Échelle inconnue: {scale} (valeurs possibles: {', '.join(SCALE_SECONDS)})")
+
+    span = SCALE_SECONDS[scale] * limit
+    windows = []
+    begin = start_date
+    while begin <= end_date:
+        end = min(begin + span - 1, end_date)
+        windows.append((begin, end))
+        begin = end + 1
+    return windows
+
+
+def iter_points(body: Any) -> Iterator[Tuple[int, List[Any]]]:
+    """Parcourt un body getmeasure (liste de séries ou dict timestamp -> valeurs)."""
+    if isinstance(body, list):
+        for entry in body:
+            if not isinstance(entry, dict) or not entry.get('value'):
+                continue
+            beg_time = entry.get('beg_time', 0)
+            step_time = entry.get('step_time', 0)
+            for index, value_set in enumerate(entry['value']):
+                if isinstance(value_set, list):
+                    yield beg_time + index * step_time, value_set
+    elif isinstance(body, dict):
+        for key, entry in body.items():
+            if isinstance(entry, dict) and 'value' in entry:
+                # Structure alternative : une série par clé
+                yield from iter_points([entry])
+            elif isinstance(entry, list):
+                # Structure optimize=false : {timestamp: [valeurs]}
+                try:
+                    yield int(key), entry
+                except ValueError:
+                    continue
+
+
+def iter_measures(body: Any, types_count: int = 1,
+                  skip_empty: bool = True) -> Iterator[Tuple[Any, ...]]:
+    """
+    Parse un body getmeasure en tuples (timestamp, valeur_type1, valeur_type2, ...).
+
+    Générateur : les points sont produits un par un, sans construire de liste,
+    quelle que soit la structure du body (liste de séries ou dict).
+
+    Args:
+        body: Champ 'body' d'une réponse getmeasure
+        types_count: Nombre de types de mesures demandés (colonnes par point)
+        skip_empty: Ignorer les points dont toutes les valeurs sont None
+    """
+    for timestamp, value_set in iter_points(body):
+        values = tuple(value_set[:types_count])
+        if len(values) < types_count:
+            values += (None,) * (types_count - len(values))
+        if skip_empty and all(value is None for value in values):
+            continue
+        yield (timestamp,) + values
+
+
+def encode_runs(points: List[Tuple[int, List[Any]]]) -> List[Dict[str, Any]]:
+    """Ré-encode des points triés en séries (beg_time, step_time, value) de pas constant."""
+    runs: List[Dict[str, Any]] = []
+    previous = None
+    for timestamp, values in points:
+        run = runs[-1] if runs else None
+        if run is not None and len(run['value']) == 1 and timestamp > previous:
+            run['step_time'] = timestamp - previous
+            run['value'].append(values)
+        elif run is not None and timestamp - previous == run['step_time']:
+            run['value'].append(values)
+        else:
+            runs.append({'beg_time': timestamp, 'step_time': 0, 'value': [values]})
+        previous = timestamp
+    return runs
+
+
+def merge_measure_responses(responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fusionne plusieurs réponses getmeasure en une seule, triée et dédoublonnée.
+
+    Un timestamp présent dans plusieurs fenêtres n'est conservé qu'une fois
+    (la dernière valeur reçue l'emporte).
+    """
+    points: Dict[int, List[Any]] = {}
+    for response in responses:
+        for timestamp, values in iter_points(response.get('body')):
+            points[timestamp] = values
+
+    return {
+        'status': 'ok',
+        'body': encode_runs(sorted(points.items())),
+    }
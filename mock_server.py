@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Serveur local simulant l'API Netatmo, pour les tests et les benchmarks hors ligne.
+
+Usage :
+    python mock_server.py --port 8765 --homes 2 --rooms 6 --history-days 365
+    NETATMO_API_URL=http://127.0.0.1:8765 python netatmo_cli.py status
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from measures import MEASURE_POINT_LIMIT, SCALE_SECONDS
+
+ROOM_NAMES = ('Salon', 'Chambre', 'Cuisine', 'Bureau', 'Salle de bain', 'Entrée', 'Chambre amis', 'Salle à manger')
+
+# Températures de consigne des modes sans température explicite
+MODE_TEMPERATURES = {'hg': 7.0, 'away': 16.0, 'max': 30.0, 'off': None}
+
+# Réponse : (code HTTP, corps JSON, en-têtes supplémentaires)
+Response = Tuple[int, Dict[str, Any], Dict[str, str]]
+
+
+def api_error(status: int, code: int, message: str) -> Response:
+    """Réponse d'erreur au format de l'API Netatmo."""
+    return status, {'error': {'code': code, 'message': message}}, {}
+
+
+class MockAccount:
+    """
+    Compte Netatmo synthétique de taille configurable.
+
+    Chaque maison a un relais (NAPlug), un thermostat (NATherm1) dans la
+    première pièce et une vanne (NRV) dans chacune des autres pièces.
+    L'historique n'est pas stocké : les mesures sont calculées à la demande
+    (cycle journalier déterministe), quelle que soit la durée simulée.
+    """
+
+    def __init__(self, homes: int = 1, rooms: int = 3, history_days: int = 365, seed: int = 0):
+        """
+        Args:
+            homes: Nombre de maisons
+            rooms: Nombre de pièces par maison
+            history_days: Profondeur de l'historique de mesures en jours
+            seed: Graine des valeurs générées
+        """
+        self.history_days = history_days
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.access_tokens: set = set()
+        self.homes: List[Dict[str, Any]] = []
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        self.room_states: Dict[str, Dict[str, Any]] = {}
+
+        for h in range(homes):
+            home_id = f'home-{h}'
+            bridge_id = f'70:ee:50:00:{h // 256:02x}:{h % 256:02x}'
+            home = {'id': home_id, 'name': f'Maison {h + 1}', 'rooms': [], 'modules': []}
+            home['modules'].append({'id': bridge_id, 'type': 'NAPlug', 'name': 'Relais', 'modules_bridged': []})
+            for r in range(rooms):
+                room_id = f'room-{h}-{r}'
+                name = ROOM_NAMES[r % len(ROOM_NAMES)] + (f' {r // len(ROOM_NAMES) + 1}' if r >= len(ROOM_NAMES) else '')
+                if homes > 1:
+                    name += f' ({home["name"]})'
+                module_type = 'NATherm1' if r == 0 else 'NRV'
+                module_id = f'09:00:00:{h // 256:02x}:{h % 256:02x}:{r:02x}' if r == 0 else f'04:00:00:{h % 256:02x}:{r // 256:02x}:{r % 256:02x}'
+                module = {
+                    'id': module_id, 'type': module_type, 'name': 'Thermostat' if r == 0 else f'Vanne {name}',
+                    'bridge': bridge_id, 'room_id': room_id,
+                }
+                room = {'id': room_id, 'name': name, 'type': 'livingroom' if r == 0 else 'bedroom',
+                        'module_ids': [module_id]}
+                home['rooms'].append(room)
+                home['modules'].append(module)
+                home['modules'][0]['modules_bridged'].append(module_id)
+                self.rooms[room_id] = dict(room, home_id=home_id)
+                self.modules[module_id] = dict(module, home_id=home_id, index=h * 1000 + r)
+                self.room_states[room_id] = {'therm_setpoint_mode': 'schedule', 'therm_setpoint_temperature': None}
+            self.homes.append(home)
+
+    @property
+    def history_start(self) -> int:
+        return int(time.time()) - self.history_days * 86400
+
+    # --- Mesures synthétiques ---
+
+    def schedule_setpoint(self, timestamp: float) -> float:
+        """Consigne du planning : 19°C en journée, 17°C la nuit."""
+        hour = (timestamp % 86400) / 3600
+        return 19.0 if 6 <= hour < 22 else 17.0
+
+    def temperature(self, module_index: int, timestamp: float) -> float:
+        """Température mesurée : cycle journalier plus un bruit déterministe."""
+        phase = 2 * math.pi * (timestamp % 86400) / 86400
+        noise = ((int(timestamp) * 2654435761 + module_index * 40503 + self.seed) % 1000) / 1000 - 0.5
+        return round(18.5 + 1.5 * math.sin(phase - math.pi / 2) + 0.4 * noise - module_index % 7 * 0.2, 1)
+
+    def measure_value(self, measure_type: str, module_index: int, timestamp: int, step: int) -> Any:
+        """Valeur d'un type de mesure pour un point."""
+        measure_type = measure_type.lower()
+        if measure_type in ('sp_temperature', 'min_sp_temperature', 'max_sp_temperature'):
+            return self.schedule_setpoint(timestamp)
+        if measure_type in ('boileron', 'boileroff', 'sum_boiler_on', 'sum_boiler_off'):
+            gap = self.schedule_setpoint(timestamp) - self.temperature(module_index, timestamp)
+            duty = min(1.0, max(0.0, 0.3 + gap / 2))
+            on = int(round(step * duty))
+            return on if measure_type in ('boileron', 'sum_boiler_on') else step - on
+        return self.temperature(module_index, timestamp)
+
+    # --- Endpoints ---
+
+    def oauth_token(self, form: Dict[str, str]) -> Response:
+        if not form.get('client_id') or not form.get('client_secret'):
+            return 400, {'error': 'invalid_client'}, {}
+        grant_type = form.get('grant_type')
+        if grant_type == 'refresh_token' and not form.get('refresh_token'):
+            return 400, {'error': 'invalid_grant'}, {}
+        if grant_type not in ('refresh_token', 'password'):
+            return 400, {'error': 'unsupported_grant_type'}, {}
+        with self.lock:
+            token = f'mock-access-{len(self.access_tokens) + 1}'
+            self.access_tokens.add(token)
+        return 200, {
+            'access_token': token,
+            'refresh_token': 'mock-refresh',
+            'expires_in': 10800,
+            'scope': ['read_thermostat', 'write_thermostat'],
+        }, {}
+
+    def homesdata(self, params: Dict[str, Any]) -> Response:
+        homes = [home for home in self.homes if params.get('home_id') in (None, home['id'])]
+        return 200, {'status': 'ok', 'time_server': int(time.time()), 'body': {'homes': homes}}, {}
+
+    def homestatus(self, params: Dict[str, Any]) -> Response:
+        home = next((home for home in self.homes if home['id'] == params.get('home_id')), None)
+        if home is None:
+            return api_error(400, 21, 'Invalid home_id')
+
+        now = int(time.time())
+        rooms = []
+        modules = [{'id': home['modules'][0]['id'], 'type': 'NAPlug', 'wifi_strength': 60}]
+        for room in home['rooms']:
+            module = self.modules[room['module_ids'][0]]
+            state = self.room_states[room['id']]
+            setpoint = state['therm_setpoint_temperature']
+            if state['therm_setpoint_mode'] == 'schedule':
+                setpoint = self.schedule_setpoint(now)
+            current = self.temperature(module['index'], now)
+            rooms.append({
+                'id': room['id'],
+                'reachable': True,
+                'therm_measured_temperature': current,
+                'therm_setpoint_temperature': setpoint,
+                'therm_setpoint_mode': state['therm_setpoint_mode'],
+                'heating_power_request': 100 if setpoint is not None and setpoint > current else 0,
+            })
+            entry = {'id': module['id'], 'type': module['type'], 'reachable': True,
+                     'battery_state': 'full', 'bridge': module['bridge']}
+            if module['type'] == 'NATherm1':
+                entry['boiler_status'] = any(r['heating_power_request'] for r in rooms)
+            modules.append(entry)
+
+        return 200, {'status': 'ok', 'time_server': now,
+                     'body': {'home': {'id': home['id'], 'rooms': rooms, 'modules': modules}}}, {}
+
+    def getmeasure(self, params: Dict[str, Any]) -> Response:
+        module = self.modules.get(params.get('module_id') or params.get('device_id'))
+        if module is None:
+            return api_error(400, 9, 'Device not found')
+        return self._measure_response(module['index'], params)
+
+    def getroommeasure(self, params: Dict[str, Any]) -> Response:
+        room = self.rooms.get(params.get('room_id'))
+        if room is None or room['home_id'] != params.get('home_id'):
+            return api_error(400, 21, 'Invalid room_id')
+        # Mesures de la pièce : celles de son premier module
+        return self._measure_response(self.modules[room['module_ids'][0]]['index'], params)
+
+    def _measure_response(self, module_index: int, params: Dict[str, Any]) -> Response:
+        """Réponse getmeasure / getroommeasure : séries de mesures d'un module sur la plage demandée."""
+        scale = params.get('scale')
+        if scale not in SCALE_SECONDS:
+            return api_error(400, 21, 'Invalid scale')
+        types = [t for t in str(params.get('type', '')).split(',') if t]
+        if not types:
+            return api_error(400, 21, 'Missing type')
+
+        step = SCALE_SECONDS[scale]
+        limit = min(int(params.get('limit') or MEASURE_POINT_LIMIT), MEASURE_POINT_LIMIT)
+        now = int(time.time())
+        end = min(int(params.get('date_end') or now), now)
+        begin = int(params.get('date_begin') or end - limit * step)
+        begin = max(begin, self.history_start)
+        first = -(-begin // step) * step
+
+        timestamps = range(first, end + 1, step)[:limit]
+        rows = [[self.measure_value(t, module_index, ts, step) for t in types] for ts in timestamps]
+
+        if str(params.get('optimize', 'true')).lower() == 'false':
+            body: Any = {str(ts): row for ts, row in zip(timestamps, rows)}
+        else:
+            body = [{'beg_time': first, 'step_time': step, 'value': rows}] if rows else []
+        return 200, {'status': 'ok', 'time_server': now, 'body': body}, {}
+
+    def _apply_room_state(self, room_id: str, mode: str, temperature: Optional[float]) -> Optional[str]:
+        """Applique une consigne de pièce, retourne un message d'erreur ou None."""
+        if mode in ('program', 'home', 'schedule'):
+            state = {'therm_setpoint_mode': 'schedule', 'therm_setpoint_temperature': None}
+        elif mode == 'manual':
+            if temperature is None:
+                return 'Missing temperature'
+            state = {'therm_setpoint_mode': 'manual', 'therm_setpoint_temperature': float(temperature)}
+        elif mode in MODE_TEMPERATURES:
+            state = {'therm_setpoint_mode': mode, 'therm_setpoint_temperature': MODE_TEMPERATURES[mode]}
+        else:
+            return f'Invalid mode: {mode}'
+        with self.lock:
+            self.room_states[room_id] = state
+        return None
+
+    def setthermpoint(self, params: Dict[str, Any]) -> Response:
+        room = self.rooms.get(params.get('room_id'))
+        if room is None or room['home_id'] != params.get('home_id'):
+            return api_error(400, 21, 'Invalid room_id')
+        temperature = params.get('temp')
+        error = self._apply_room_state(room['id'], params.get('mode'),
+                                       float(temperature) if temperature is not None else None)
+        if error:
+            return api_error(400, 21, error)
+        return 200, {'status': 'ok', 'time_server': int(time.time())}, {}
+
+    def setstate(self, params: Dict[str, Any]) -> Response:
+        home = params.get('home') if isinstance(params.get('home'), dict) else {}
+        if not any(h['id'] == home.get('id') for h in self.homes):
+            return api_error(400, 21, 'Invalid home id')
+
+        errors = []
+        for room_state in home.get('rooms', []):
+            room = self.rooms.get(room_state.get('id'))
+            error = 'Invalid room id' if room is None or room['home_id'] != home['id'] else self._apply_room_state(
+                room['id'], room_state.get('therm_setpoint_mode'), room_state.get('therm_setpoint_temperature')
+            )
+            if error:
+                errors.append({'code': 21, 'id': room_state.get('id')})
+
+        response: Dict[str, Any] = {'status': 'ok', 'time_server': int(time.time())}
+        if errors:
+            response['body'] = {'errors': errors}
+        return 200, response, {}
+
+
+# Routes de l'API simulée : chemin -> méthode de MockAccount
+ROUTES = {
+    '/oauth2/token': 'oauth_token',
+    '/api/homesdata': 'homesdata',
+    '/api/homestatus': 'homestatus',
+    '/api/getmeasure': 'getmeasure',
+    '/api/getroommeasure': 'getroommeasure',
+    '/api/setthermpoint': 'setthermpoint',
+    '/api/setstate': 'setstate',
+}
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Traite une requête HTTP de l'API simulée (keep-alive, JSON)."""
+
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, l'ACK retardé ajoute ~40 ms
+    disable_nagle_algorithm = True
+    server: 'MockHTTPServer'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def _read_params(self, query: str) -> Dict[str, Any]:
+        """Paramètres de la requête : query string, formulaire ou corps JSON."""
+        params: Dict[str, Any] = {key: values[-1] for key, values in parse_qs(query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            raw = self.rfile.read(length).decode('utf-8')
+            if 'json' in (self.headers.get('Content-Type') or ''):
+                data = json.loads(raw or '{}')
+                if isinstance(data, dict):
+                    params.update(data)
+            else:
+                params.update({key: values[-1] for key, values in parse_qs(raw).items()})
+        return params
+
+    def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        # Compté avant l'envoi : le client peut lire /__stats dès la réponse reçue
+        self.server.record(self.path, status, len(data))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self) -> None:
+        url = urlparse(self.path)
+        try:
+            params = self._read_params(url.query)
+        except ValueError:
+            self._send(400, {'error': 'invalid_request'})
+            return
+
+        # Endpoints de pilotage (hors API)
+        if url.path == '/__stats':
+            self._send(200, self.server.stats())
+            return
+        if url.path == '/__reset':
+            self.server.reset_stats()
+            self._send(200, {'status': 'ok'})
+            return
+
+        route = ROUTES.get(url.path)
+        if route is None:
+            self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+            return
+
+        injected = self.server.inject()
+        if injected is not None:
+            self._send(*injected)
+            return
+
+        if url.path.startswith('/api/'):
+            token = (self.headers.get('Authorization') or '').replace('Bearer ', '', 1)
+            if token not in self.server.account.access_tokens:
+                self._send(*api_error(403, 2, 'Invalid access token'))
+                return
+
+        status, payload, headers = getattr(self.server.account, route)(params)
+        self._send(status, payload, headers)
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    """Serveur HTTP de l'API simulée, avec compteurs de requêtes et injection de pannes."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], account: MockAccount, latency: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, seed: int = 0):
+        super().__init__(address, MockRequestHandler)
+        self.account = account
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.forced_errors = 0
+        self._random = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def inject(self) -> Optional[Response]:
+        """Applique la latence simulée et, selon le taux configuré, une erreur."""
+        if self.latency > 0:
+            time.sleep(self.latency * self._random.uniform(0.8, 1.2))
+        with self._stats_lock:
+            forced = self.forced_errors > 0
+            self.forced_errors -= 1 if forced else 0
+        if forced or (self.error_rate > 0 and self._random.random() < self.error_rate):
+            if self.error_status == 429:
+                status, payload, _ = api_error(429, 26, 'User usage reached')
+                return status, payload, {'Retry-After': '1'}
+            return self.error_status, {'error': {'code': self.error_status, 'message': 'Injected error'}}, {}
+        return None
+
+    def record(self, path: str, status: int, size: int) -> None:
+        endpoint = urlparse(path).path
+        if endpoint.startswith('/__'):
+            return
+        with self._stats_lock:
+            self.requests += 1
+            self.bytes_sent += size
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+            if status != 200:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {'requests': self.requests, 'errors': self.errors, 'bytes_sent': self.bytes_sent,
+                    'by_endpoint': dict(self.by_endpoint)}
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self.requests = 0
+            self.errors = 0
+            self.bytes_sent = 0
+            self.by_endpoint: Dict[str, int] = {}
+
+
+class MockNetatmoServer:
+    """
+    API Netatmo simulée lancée dans un thread.
+
+    Exemple :
+        with MockNetatmoServer(MockAccount(homes=2)) as server:
+            os.environ['NETATMO_API_URL'] = server.url
+    """
+
+    def __init__(self, account: Optional[MockAccount] = None, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, error_rate: float = 0.0, error_status: int = 503):
+        """
+        Args:
+            account: Compte simulé (défaut: 1 maison, 3 pièces)
+            host: Adresse d'écoute
+            port: Port d'écoute (0 = port libre choisi par le système)
+            latency: Latence ajoutée à chaque requête en secondes
+            error_rate: Proportion de requêtes en erreur (0 à 1)
+            error_status: Code HTTP des erreurs injectées (503, 500, 429...)
+        """
+        self.httpd = MockHTTPServer((host, port), account or MockAccount(), latency, error_rate, error_status)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def account(self) -> MockAccount:
+        return self.httpd.account
+
+    def start(self) -> str:
+        """Démarre le serveur dans un thread et retourne son URL."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.httpd.stats()
+
+    def fail_next(self, count: int = 1) -> None:
+        """Fait échouer les `count` prochaines requêtes avec le code d'erreur configuré."""
+        with self.httpd._stats_lock:
+            self.httpd.forced_errors = count
+
+    def reset_stats(self) -> None:
+        self.httpd.reset_stats()
+
+    def __enter__(self) -> 'MockNetatmoServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+def add_account_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options de taille du compte et d'injection de pannes (partagées avec benchmark.py)."""
+    parser.add_argument('--homes', type=int, default=1, help='Nombre de maisons (défaut: 1)')
+    parser.add_argument('--rooms', type=int, default=3, help='Nombre de pièces par maison (défaut: 3)')
+    parser.add_argument('--history-days', type=int, default=365, help='Profondeur de l\'historique en jours (défaut: 365)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latence ajoutée par requête en secondes')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Proportion de requêtes en erreur (0 à 1)')
+    parser.add_argument('--error-status', type=int, default=503, help='Code HTTP des erreurs injectées (défaut: 503)')
+
+
+def create_server(args: argparse.Namespace, port: int = 0) -> MockNetatmoServer:
+    """Crée le serveur simulé à partir des options de add_account_arguments."""
+    account = MockAccount(homes=args.homes, rooms=args.rooms, history_days=args.history_days)
+    return MockNetatmoServer(account, port=port, latency=args.latency,
+                             error_rate=args.error_rate, error_status=args.error_status)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='API Netatmo simulée pour les tests et benchmarks')
+    parser.add_argument('--port', type=int, default=8765, help='Port d\'écoute (défaut: 8765)')
+    add_account_arguments(parser)
+    args = parser.parse_args()
+
+    server = create_server(args, port=args.port)
+    print(f"✓ API Netatmo simulée sur {server.url} "
+          f"({args.homes} maison(s), {args.rooms} pièce(s), {args.history_days} jours d'historique)")
+    print(f"  NETATMO_API_URL={server.url} NETATMO_CLIENT_ID=mock NETATMO_CLIENT_SECRET=mock "
+          f"NETATMO_REFRESH_TOKEN=mock python netatmo_cli.py status")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,17 @@
 """Application CLI pour piloter le thermostat Netatmo."""
 import argparse
 import json
+import os
 import sys
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, TextIO, Tuple, Union
 
-from config import Config
-from netatmo_client import NetatmoClient
+from config import Config, __version__
+from measures import SCALE_SECONDS, parse_types
+
+# Le client (et requests) n'est importé que pour exécuter une commande localement
+if TYPE_CHECKING:
+    from netatmo_client import NetatmoClient
+    from timeseries import TimeSeries
 
 
 def format_output(data: Any, json_output: bool = False) -> str:
@@ -35,9 +41,65 @@ def format_text_output(data: Any) -> str:
     return str(data)
 
 
-def cmd_status(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any]:
-    """Affiche le statut du thermostat."""
+def format_table(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    """Formate une liste de lignes en tableau texte aligné."""
+    cells = [['' if row.get(col) is None else str(row.get(col)) for col in columns] for row in rows]
+    widths = [max([len(col)] + [len(line[i]) for line in cells]) for i, col in enumerate(columns)]
+    lines = ['  '.join(col.ljust(widths[i]) for i, col in enumerate(columns)).rstrip()]
+    lines.append('  '.join('-' * width for width in widths))
+    for line in cells:
+        lines.append('  '.join(cell.ljust(widths[i]) for i, cell in enumerate(line)).rstrip())
+    return "\n".join(lines)
+
+
+STATUS_ALL_COLUMNS = [
+    'home_name', 'room_name', 'module_name', 'module_type', 'current_temp', 'target_temp',
+    'setpoint_mode', 'heating_power_request', 'boiler_status',
+]
+
+
+def cmd_status_all(client: 'NetatmoClient', args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Affiche le statut de toutes les pièces et de tous les modules de chauffage du compte."""
+    rows = client.get_all_status(max_workers=args.workers)
+    
+    if args.json:
+        # Un objet JSON par ligne (JSONL), directement exploitable par un outil de supervision
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return rows
+    
+    print(format_table([row for row in rows if 'error' not in row], STATUS_ALL_COLUMNS))
+    for row in rows:
+        if 'error' in row:
+            print(f"Erreur pour la maison {row.get('home_name') or row['home_id']}: {row['error']}", file=sys.stderr)
+    return rows
+
+
+def cmd_status_watch(client: 'NetatmoClient', args: argparse.Namespace) -> int:
+    """
+    Surveille le statut de toutes les pièces et n'affiche que les changements.
+    
+    Returns:
+        Code de sortie : 1 si au moins une interrogation a échoué, 0 sinon
+    """
+    from watch import AdaptiveInterval, StatusWatcher, event_printer
+    
+    watcher = StatusWatcher(client, AdaptiveInterval(args.min_interval, args.max_interval), args.workers)
     try:
+        watcher.run(event_printer(args.json), count=args.count)
+    except KeyboardInterrupt:
+        pass
+    return 1 if watcher.failed_polls else 0
+
+
+def cmd_status(client: 'NetatmoClient', args: argparse.Namespace) -> Union[Dict[str, Any], int]:
+    """Affiche le statut du thermostat (avec --watch : code de sortie de la surveillance)."""
+    try:
+        if args.watch:
+            return cmd_status_watch(client, args)
+        if args.all:
+            return cmd_status_all(client, args)
+        
         status = client.get_thermostat_status(debug=args.debug)
         
         current_temp = status.get('current_temp')
@@ -59,16 +121,23 @@ def cmd_status(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any
         sys.exit(1)
 
 
-def cmd_set(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any]:
+def cmd_set(client: 'NetatmoClient', args: argparse.Namespace) -> Dict[str, Any]:
     """Définit la température cible."""
     try:
-        result = client.set_temperature(args.temperature)
+        result = client.set_temperature(args.temperature, force=args.force)
         
-        output = {
-            'status': 'success',
-            'temperature_set': args.temperature,
-            'message': f"Température réglée à {args.temperature}°C"
-        }
+        if result.get('unchanged'):
+            output = {
+                'status': 'unchanged',
+                'temperature_set': args.temperature,
+                'message': f"Température déjà réglée à {args.temperature}°C (aucun appel, --force pour renvoyer)"
+            }
+        else:
+            output = {
+                'status': 'success',
+                'temperature_set': args.temperature,
+                'message': f"Température réglée à {args.temperature}°C"
+            }
         
         print(format_output(output, args.json))
         return output
@@ -77,17 +146,19 @@ def cmd_set(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any]:
         sys.exit(1)
 
 
-def cmd_frost_guard(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any]:
+def cmd_frost_guard(client: 'NetatmoClient', args: argparse.Namespace) -> Dict[str, Any]:
     """Active ou désactive le mode hors gel."""
     try:
         enabled = args.state.lower() == 'on'
-        result = client.set_frost_guard(enabled)
+        result = client.set_frost_guard(enabled, force=args.force)
         
         output = {
-            'status': 'success',
+            'status': 'unchanged' if result.get('unchanged') else 'success',
             'frost_guard': 'enabled' if enabled else 'disabled',
             'message': f"Mode hors gel {'activé' if enabled else 'désactivé'}"
         }
+        if result.get('unchanged'):
+            output['message'] = f"Mode hors gel déjà {'activé' if enabled else 'désactivé'} (aucun appel, --force pour renvoyer)"
         
         print(format_output(output, args.json))
         return output
@@ -96,69 +167,218 @@ def cmd_frost_guard(client: NetatmoClient, args: argparse.Namespace) -> Dict[str
         sys.exit(1)
 
 
-def cmd_history(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any]:
+def parse_room_setpoints(assignments: List[str], scene_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Construit les consignes {pièce: valeur} depuis un fichier de scène JSON et des `pièce=valeur`.
+    
+    Le fichier de scène est un objet JSON {"Salon": 19, "Chambre": "schedule"}, éventuellement
+    sous une clé "rooms". Les affectations de la ligne de commande l'emportent sur le fichier.
+    """
+    setpoints: Dict[str, Any] = {}
+    if scene_path:
+        try:
+            with open(scene_path, 'r', encoding='utf-8') as f:
+                scene = json.load(f)
+        except OSError as e:
+            raise ValueError(f"Impossible de lire la scène {scene_path}: {e}")
+        except ValueError as e:
+            raise ValueError(f"Scène {scene_path} invalide (JSON attendu): {e}")
+        if isinstance(scene, dict) and isinstance(scene.get('rooms'), dict):
+            scene = scene['rooms']
+        if not isinstance(scene, dict):
+            raise ValueError(f"Scène {scene_path} invalide: objet {{\"pièce\": consigne}} attendu")
+        setpoints.update(scene)
+    
+    for assignment in assignments:
+        room, separator, value = assignment.rpartition('=')
+        if not separator or not room.strip() or not value.strip():
+            raise ValueError(f"Consigne invalide: {assignment} (format attendu: pièce=température ou pièce=mode)")
+        setpoints[room.strip()] = value.strip()
+    
+    if not setpoints:
+        raise ValueError("Aucune consigne fournie (pièce=valeur ou --scene fichier.json)")
+    return setpoints
+
+
+def cmd_set_many(client: 'NetatmoClient', args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Applique des consignes à plusieurs pièces (un appel /api/setstate par maison)."""
+    try:
+        setpoints = parse_room_setpoints(args.setpoints, args.scene)
+        results = client.set_room_setpoints(setpoints, force=args.force)
+        
+        if args.json:
+            print(format_output(results, True))
+        else:
+            rows = []
+            for result in results:
+                temperature = result.get('therm_setpoint_temperature')
+                # Mode de l'API ramené au vocabulaire du CLI ('home' = suivre le planning)
+                mode = 'schedule' if result['therm_setpoint_mode'] == 'home' else result['therm_setpoint_mode']
+                rows.append({
+                    'room_name': result['room_name'],
+                    'home_name': result['home_name'],
+                    'setpoint': f"{temperature:.1f}°C" if temperature is not None else mode,
+                    'status': {'success': 'OK', 'unchanged': 'INCHANGÉ'}.get(result['status'], f"ERREUR: {result['error']}"),
+                })
+            print(format_table(rows, ['room_name', 'home_name', 'setpoint', 'status']))
+        
+        if any(result['status'] == 'error' for result in results):
+            sys.exit(1)
+        return results
+    except Exception as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def write_history_text(rows: Iterable[Tuple[Any, ...]], out: TextIO, batch_size: int = 1000) -> int:
+    """
+    Écrit les points (timestamp, température) par lots de `batch_size` lignes.
+    
+    Returns:
+        Nombre de lignes écrites
+    """
+    from datetime import datetime
+    
+    count = 0
+    batch = []
+    for timestamp, temp in rows:
+        batch.append(f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')}: {temp:.1f}°C\n")
+        if len(batch) >= batch_size:
+            out.write(''.join(batch))
+            count += len(batch)
+            batch.clear()
+    if batch:
+        out.write(''.join(batch))
+        count += len(batch)
+    return count
+
+
+def format_measure(measure_type: str, value: Optional[float]) -> str:
+    """Formate une mesure selon son type : °C pour les températures, minutes pour les durées de chauffe."""
+    if value is None:
+        return 'N/A'
+    if measure_type in ('Temperature', 'sp_temperature'):
+        return f"{value:.1f}°C"
+    return f"{value / 60:.0f} min"
+
+
+def write_columns_text(types: List[str], rows: Iterable[Tuple[int, List[Optional[float]]]], out: TextIO,
+                       headers: Optional[List[str]] = None) -> int:
+    """
+    Écrit les points à plusieurs types de mesures, une colonne par type.
+    
+    Args:
+        types: Type de mesure de chaque colonne (format des valeurs)
+        headers: En-têtes des colonnes (défaut: les types)
+    
+    Returns:
+        Nombre de lignes écrites
+    """
+    from datetime import datetime
+    
+    headers = headers or types
+    widths = [max(len(header), 9) for header in headers]
+    out.write(' ' * 18 + '  '.join(h.rjust(w) for h, w in zip(headers, widths)) + '\n')
+    count = 0
+    batch = []
+    for timestamp, values in rows:
+        cells = '  '.join(format_measure(t, v).rjust(w) for t, v, w in zip(types, values, widths))
+        batch.append(f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')}:  {cells}\n")
+        if len(batch) >= 1000:
+            out.write(''.join(batch))
+            count += len(batch)
+            batch.clear()
+    out.write(''.join(batch))
+    return count + len(batch)
+
+
+def cmd_history_columns(client: 'NetatmoClient', args: argparse.Namespace, types: List[str]) -> Dict[str, 'TimeSeries']:
+    """Affiche l'historique de plusieurs types de mesures (un seul appel getmeasure par fenêtre)."""
+    from measures import encode_runs
+    from timeseries import align_columns
+    
+    columns = client.get_thermostat_measures(types, args.days, debug=args.debug, scale=args.scale,
+                                             use_store=not args.no_store, offline=args.offline)
+    rows = align_columns(columns)
+    if args.json:
+        print(format_output({'status': 'ok', 'types': types, 'body': encode_runs(rows)}, True))
+        return columns
+    
+    print(f"Historique des mesures (derniers {args.days} jours):")
+    print("-" * 50)
+    if not rows:
+        print("Aucune donnée disponible")
+    else:
+        write_columns_text(types, rows, sys.stdout)
+    return columns
+
+
+def cmd_history_rooms(client: 'NetatmoClient', args: argparse.Namespace,
+                      types: List[str]) -> Dict[str, 'TimeSeries']:
+    """Affiche l'historique de plusieurs pièces (getroommeasure), une colonne par pièce."""
+    from measures import encode_runs
+    from timeseries import align_columns
+    
+    if len(types) != 1 or types[0] not in ('Temperature', 'sp_temperature'):
+        raise ValueError("Avec --rooms, --types accepte un seul type : Temperature ou sp_temperature")
+    rooms = client.resolve_rooms(args.rooms.split(','), args.home)
+    series, errors = client.get_rooms_history(rooms, args.days, scale=args.scale, measure_type=types[0].lower(),
+                                              use_store=not args.no_store, offline=args.offline,
+                                              max_workers=args.workers)
+    for room in rooms:
+        if room['room_id'] in errors:
+            print(f"⚠ {room['room_name'] or room['room_id']}: {errors[room['room_id']]}", file=sys.stderr)
+    
+    # Grille commune au pas de l'échelle : une ligne par instant, une colonne par pièce
+    rows = align_columns(series, SCALE_SECONDS[args.scale])
+    names = [room['room_name'] or room['room_id'] for room in rooms]
+    if args.json:
+        print(format_output({
+            'status': 'ok',
+            'home_id': rooms[0]['home_id'],
+            'rooms': [{'id': room['room_id'], 'name': room['room_name']} for room in rooms],
+            'type': types[0].lower(),
+            'errors': errors,
+            'body': encode_runs(rows),
+        }, True))
+    else:
+        print(f"Historique par pièce - {rooms[0]['home_name'] or rooms[0]['home_id']} (derniers {args.days} jours):")
+        print("-" * 50)
+        if not rows:
+            print("Aucune donnée disponible")
+        else:
+            write_columns_text(types * len(rooms), rows, sys.stdout, headers=names)
+    if errors and len(errors) == len(rooms):
+        sys.exit(1)
+    return series
+
+
+def cmd_history(client: 'NetatmoClient', args: argparse.Namespace) -> 'TimeSeries':
     """Affiche l'historique des températures."""
     try:
-        history = client.get_thermostat_history(args.days, debug=args.debug)
+        types = parse_types(args.types, args.scale) if args.types else ['Temperature']
+        if args.rooms:
+            return cmd_history_rooms(client, args, types)
+        if types != ['Temperature']:
+            return cmd_history_columns(client, args, types)
+        
+        history = client.get_thermostat_history(args.days, debug=args.debug, scale=args.scale,
+                                                use_store=not args.no_store, offline=args.offline)
         
         if args.json:
-            print(format_output(history, True))
+            print(format_output(history.to_dict(), True))
             return history
         
         # Format texte pour l'historique
         print(f"Historique des températures (derniers {args.days} jours):")
         print("-" * 50)
+        sys.stdout.flush()
         
-        from datetime import datetime
-        
-        # Parser les données selon différentes structures possibles
-        data_found = False
-        
-        if 'body' in history:
-            body = history['body']
-            
-            # Structure 1: body est une liste
-            if isinstance(body, list):
-                for entry in body:
-                    if 'value' in entry and entry['value']:
-                        data_found = True
-                        beg_time = entry.get('beg_time', 0)
-                        step_time = entry.get('step_time', 3600)  # Par défaut 1 heure
-                        
-                        # Les valeurs sont dans value = [[temp1], [temp2], ...]
-                        for index, value_set in enumerate(entry['value']):
-                            if isinstance(value_set, list) and len(value_set) > 0:
-                                temp = value_set[0]  # La température est le premier élément
-                                if temp is not None:
-                                    # Calculer le timestamp pour cette valeur
-                                    timestamp = beg_time + (index * step_time)
-                                    dt = datetime.fromtimestamp(timestamp)
-                                    print(f"{dt.strftime('%Y-%m-%d %H:%M')}: {temp:.1f}°C")
-            
-            # Structure 2: body est un dict (structure alternative)
-            elif isinstance(body, dict):
-                for key, entry in body.items():
-                    if isinstance(entry, dict) and 'value' in entry:
-                        data_found = True
-                        beg_time = entry.get('beg_time', 0)
-                        step_time = entry.get('step_time', 3600)
-                        
-                        values = entry['value']
-                        if isinstance(values, list):
-                            for index, value_set in enumerate(values):
-                                if isinstance(value_set, list) and len(value_set) > 0:
-                                    temp = value_set[0]
-                                    if temp is not None:
-                                        timestamp = beg_time + (index * step_time)
-                                        dt = datetime.fromtimestamp(timestamp)
-                                        print(f"{dt.strftime('%Y-%m-%d %H:%M')}: {temp:.1f}°C")
-        
-        if not data_found:
+        if not write_history_text(history, sys.stdout):
             print("Aucune donnée disponible")
             if args.debug:
-                import json
                 print("\nDEBUG - Structure de la réponse:", file=sys.stderr)
-                print(json.dumps(history, indent=2)[:2000], file=sys.stderr)
+                print(json.dumps(history.to_dict(), indent=2)[:2000], file=sys.stderr)
         
         return history
     except Exception as e:
@@ -169,18 +389,85 @@ def cmd_history(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, An
         sys.exit(1)
 
 
-def cmd_stats(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any]:
+def format_temperature(value: Any, digits: int = 1) -> str:
+    """Formate une température en °C, 'N/A' si absente."""
+    return f"{value:.{digits}f}°C" if value is not None else 'N/A'
+
+
+def format_advanced_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Formate les métriques avancées du moteur de statistiques (--metrics)."""
+    output: Dict[str, Any] = {}
+    if 'std' in stats:
+        output['std_deviation'] = format_temperature(stats['std'], 2)
+    for key in ('p5', 'p25', 'p50', 'p75', 'p95'):
+        if key in stats:
+            output[f'{key}_temperature'] = format_temperature(stats[key])
+    if 'time_weighted_average' in stats:
+        output['time_weighted_average'] = format_temperature(stats['time_weighted_average'])
+    if 'heating_degree_days' in stats:
+        output['heating_degree_days'] = f"{stats['heating_degree_days']:.1f} (base {stats['degree_days_base']:g}°C)"
+    if 'rolling_mean' in stats:
+        rolling = stats['rolling_mean']
+        output[f"rolling_mean_{rolling['window_hours']:g}h"] = {
+            'last': format_temperature(rolling['last']),
+            'min': format_temperature(rolling['min']),
+            'max': format_temperature(rolling['max']),
+        }
+    if 'hourly_profile' in stats:
+        output['hourly_profile'] = {
+            hour: format_temperature(value) for hour, value in stats['hourly_profile'].items()
+        }
+    if 'setpoint_error' in stats:
+        error = stats['setpoint_error']
+        output['setpoint_error'] = 'N/A' if error is None else {
+            'mean': f"{error['mean']:+.2f}°C",
+            'mean_abs': f"{error['mean_abs']:.2f}°C",
+            'rmse': f"{error['rmse']:.2f}°C",
+            f"below_setpoint_{error['tolerance']:g}C": f"{error['below_share']:.0%}",
+        }
+    if 'boiler_runtime_hours' in stats:
+        if stats['boiler_runtime_hours'] is None:
+            output['boiler_runtime'] = 'N/A'
+        else:
+            output['boiler_runtime'] = f"{stats['boiler_runtime_hours']:.1f} h"
+            output['boiler_duty_cycle'] = f"{stats['boiler_duty_cycle']:.0%}" if stats['boiler_duty_cycle'] is not None else 'N/A'
+            output['boiler_average_per_day'] = f"{stats['boiler_average_hours_per_day']:.1f} h"
+            output['boiler_runtime_per_day'] = {
+                day: f"{hours:.1f} h" for day, hours in stats['boiler_runtime_per_day'].items()
+            }
+    return output
+
+
+def parse_metrics(value: str) -> List[str]:
+    """Parse la liste de métriques de --metrics ('all' pour toutes)."""
+    from stats_engine import METRICS
+    
+    metrics = [metric.strip() for metric in value.split(',') if metric.strip()]
+    if metrics == ['all']:
+        return list(METRICS)
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"métriques inconnues: {', '.join(unknown)} (valeurs possibles: {', '.join(METRICS)}, all)"
+        )
+    return metrics
+
+
+def cmd_stats(client: 'NetatmoClient', args: argparse.Namespace) -> Dict[str, Any]:
     """Affiche les statistiques."""
     try:
-        stats = client.get_statistics(args.days, debug=args.debug)
+        stats = client.get_statistics(args.days, debug=args.debug, scale=args.scale,
+                                      use_store=not args.no_store, offline=args.offline,
+                                      metrics=args.metrics)
         
         output = {
             'period_days': args.days,
-            'average_temperature': f"{stats.get('average', 0):.1f}°C" if stats.get('average') else 'N/A',
-            'min_temperature': f"{stats.get('min', 0):.1f}°C" if stats.get('min') else 'N/A',
-            'max_temperature': f"{stats.get('max', 0):.1f}°C" if stats.get('max') else 'N/A',
+            'average_temperature': format_temperature(stats.get('average')),
+            'min_temperature': format_temperature(stats.get('min')),
+            'max_temperature': format_temperature(stats.get('max')),
             'data_points': stats.get('count', 0)
         }
+        output.update(format_advanced_stats(stats))
         
         print(format_output(output, args.json))
         return output
@@ -189,53 +476,253 @@ def cmd_stats(client: NetatmoClient, args: argparse.Namespace) -> Dict[str, Any]
         sys.exit(1)
 
 
-def main():
-    """Point d'entrée principal de l'application CLI."""
+def cmd_fleet(config: Config, args: argparse.Namespace) -> None:
+    """Exécute status, stats ou set sur tous les comptes d'un fichier de flotte (sortie JSONL)."""
+    import time
+    from fleet import load_accounts, print_fleet, run_fleet
+    
+    if args.action == 'set' and args.temperature is None:
+        raise ValueError("fleet set: température cible manquante")
+    accounts = load_accounts(args.accounts)
+    options = {
+        'days': args.days, 'scale': args.scale, 'metrics': args.metrics, 'temperature': args.temperature,
+        'force': args.force, 'no_cache': args.no_cache, 'max_age': args.max_age,
+    }
+    started = time.perf_counter()
+    summary = print_fleet(run_fleet(accounts, args.action, options, config.cache_dir / 'fleet', args.workers))
+    print(f"Flotte : {summary['accounts']} compte(s), {summary['failed']} en erreur, "
+          f"{time.perf_counter() - started:.1f} s", file=sys.stderr)
+    if summary['failed']:
+        sys.exit(1)
+
+
+def cmd_daemon(config: Config, args):
+    """Lance le démon (client chaud servi sur une socket Unix)."""
+    import daemon
+
+    socket_path = args.socket or config.daemon_socket_path
+    status_ttl = args.status_ttl if args.status_ttl is not None else config.status_ttl
+    daemon.serve(config, socket_path, status_ttl, build_parser())
+
+
+# Options dont la valeur est un chemin relatif au répertoire courant de l'appelant : (option, attribut)
+PATH_OPTIONS = (('--scene', 'scene'), ('--profile-output', 'profile_output'))
+
+
+def absolute_path_args(argv: List[str], args: argparse.Namespace) -> List[str]:
+    """
+    Rend absolus les chemins des arguments avant le transfert au démon (autre répertoire courant).
+
+    La valeur absolue est ajoutée en fin de ligne : argparse retient la dernière occurrence d'une option.
+    """
+    extra: List[str] = []
+    for option, dest in PATH_OPTIONS:
+        value = getattr(args, dest, None)
+        if value and not os.path.isabs(value):
+            extra += [option, os.path.abspath(value)]
+    return argv + extra
+
+
+def forward_to_daemon(config: Config, command: str, argv: List[str]) -> bool:
+    """
+    Exécute la commande via le démon s'il tourne.
+
+    Returns:
+        False si aucun démon ne répond (la commande doit être exécutée localement)
+    """
+    # Sans socket, pas de démon : le module (socket, socketserver) n'est pas importé
+    if not os.path.exists(config.daemon_socket_path):
+        return False
+    import daemon
+
+    if command not in daemon.FORWARDED_COMMANDS:
+        return False
+    response = daemon.forward(config.daemon_socket_path, argv, account=daemon.account_identity(config))
+    if response is None:
+        return False
+    sys.stdout.write(response.get('stdout', ''))
+    sys.stderr.write(response.get('stderr', ''))
+    sys.stdout.flush()
+    sys.exit(response.get('exit_code', 1))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construit le parser de la ligne de commande (partagé avec le démon)."""
     parser = argparse.ArgumentParser(
         description='Piloter votre thermostat Netatmo connecté à votre chaudière',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
+    parser.add_argument('-V', '--version', action='version', version=f'%(prog)s {__version__}')
     
-    # Arguments globaux partagés
-    common_args = argparse.ArgumentParser(add_help=False)
+    # Arguments partagés par toutes les commandes (y compris fleet)
+    base_args = argparse.ArgumentParser(add_help=False)
+    base_args.add_argument(
+        '--debug',
+        action='store_true',
+        help='Mode debug (affiche plus de détails sur les erreurs)'
+    )
+    base_args.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Interroger l'API sans utiliser les réponses en cache (topologie, statut, mesures)"
+    )
+    base_args.add_argument(
+        '--max-age',
+        type=float,
+        metavar='SECONDES',
+        default=None,
+        help="Âge maximal accepté pour les réponses en cache (défaut : durée de validité de chaque endpoint)"
+    )
+    
+    # Arguments des commandes exécutées par un seul client (localement ou par le démon)
+    common_args = argparse.ArgumentParser(add_help=False, parents=[base_args])
     common_args.add_argument(
         '--json',
         action='store_true',
         help='Afficher la sortie au format JSON'
     )
     common_args.add_argument(
-        '--debug',
+        '--timings',
         action='store_true',
-        help='Mode debug (affiche plus de détails sur les erreurs)'
+        help='Afficher la durée de chaque appel API (DNS, connexion, TLS, attente, transfert) sur stderr'
+    )
+    common_args.add_argument(
+        '--profile',
+        action='store_true',
+        help='Profiler la commande (fonctions les plus coûteuses et allocations mémoire) sur stderr'
+    )
+    common_args.add_argument(
+        '--profile-output',
+        metavar='FICHIER',
+        default=None,
+        help='Enregistrer aussi le profil CPU au format pstats (implique --profile)'
+    )
+    common_args.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Exécuter la commande localement même si le démon tourne'
     )
     
     subparsers = parser.add_subparsers(dest='command', help='Commandes disponibles')
     
     # Commande status
     parser_status = subparsers.add_parser('status', help='Afficher le statut du thermostat', parents=[common_args])
+    parser_status.add_argument('--all', action='store_true',
+                               help='Toutes les pièces et tous les modules de chauffage de toutes les maisons')
+    parser_status.add_argument('--workers', type=int, default=None,
+                               help='Nombre d\'appels simultanés avec --all (défaut: NETATMO_MAX_CONCURRENCY)')
+    parser_status.add_argument('--watch', action='store_true',
+                               help='Surveiller toutes les pièces et n\'afficher que les changements (JSONL avec --json)')
+    parser_status.add_argument('--min-interval', type=float, default=15,
+                               help='Intervalle minimal en secondes avec --watch, tant que le chauffage change (défaut: 15)')
+    parser_status.add_argument('--max-interval', type=float, default=300,
+                               help='Intervalle maximal en secondes avec --watch, maison stable (défaut: 300)')
+    parser_status.add_argument('--count', type=int, default=None,
+                               help='Nombre d\'interrogations avec --watch (défaut: jusqu\'à Ctrl+C)')
     parser_status.set_defaults(func=cmd_status)
     
+    # Option des commandes d'écriture : ignorer le statut en cache
+    force_args = argparse.ArgumentParser(add_help=False)
+    force_args.add_argument('--force', action='store_true',
+                            help='Envoyer la consigne même si le statut en cache indique qu\'elle est déjà en place')
+    
     # Commande set
-    parser_set = subparsers.add_parser('set', help='Définir la température cible', parents=[common_args])
+    parser_set = subparsers.add_parser('set', help='Définir la température cible', parents=[common_args, force_args])
     parser_set.add_argument('temperature', type=float, help='Température cible en °C')
     parser_set.set_defaults(func=cmd_set)
     
+    # Commande set-many
+    parser_set_many = subparsers.add_parser('set-many', help='Définir les consignes de plusieurs pièces en un appel par maison',
+                                            parents=[common_args, force_args])
+    parser_set_many.add_argument('setpoints', nargs='*', metavar='PIÈCE=VALEUR',
+                                 help='Consigne par pièce (nom ou ID) : température en °C, schedule, off ou max')
+    parser_set_many.add_argument('--scene', default=None,
+                                 help='Fichier de scène JSON {"pièce": consigne, ...}')
+    parser_set_many.set_defaults(func=cmd_set_many)
+    
     # Commande frost-guard
-    parser_frost = subparsers.add_parser('frost-guard', help='Activer/désactiver le mode hors gel', parents=[common_args])
+    parser_frost = subparsers.add_parser('frost-guard', help='Activer/désactiver le mode hors gel', parents=[common_args, force_args])
     parser_frost.add_argument('state', choices=['on', 'off'], help='État: on ou off')
     parser_frost.set_defaults(func=cmd_frost_guard)
     
+    # Options du stockage local des mesures (history, stats)
+    store_args = argparse.ArgumentParser(add_help=False)
+    store_args.add_argument('--offline', action='store_true',
+                            help='Lire uniquement les mesures stockées localement, sans appel API')
+    store_args.add_argument('--no-store', action='store_true',
+                            help='Interroger directement l\'API sans passer par le stockage local')
+    
     # Commande history
-    parser_history = subparsers.add_parser('history', help='Afficher l\'historique des températures', parents=[common_args])
+    parser_history = subparsers.add_parser('history', help='Afficher l\'historique des températures', parents=[common_args, store_args])
     parser_history.add_argument('--days', type=int, default=7, help='Nombre de jours (défaut: 7)')
+    parser_history.add_argument('--scale', choices=list(SCALE_SECONDS), default='1hour',
+                                help='Échelle des mesures (défaut: 1hour)')
+    parser_history.add_argument('--types', default=None,
+                                help='Types de mesures séparés par des virgules, une colonne par type : Temperature, '
+                                     'sp_temperature, boileron, boileroff, sum_boiler_on, sum_boiler_off '
+                                     'ou boiler (défaut: Temperature)')
+    parser_history.add_argument('--rooms', default=None, metavar='all|PIECE,...',
+                                help='Historique par pièce (getroommeasure), une colonne par pièce : '
+                                     'all ou noms/IDs séparés par des virgules')
+    parser_history.add_argument('--home', default=None, metavar='MAISON',
+                                help='Maison des pièces de --rooms, nom ou ID (défaut: maison du thermostat)')
+    parser_history.add_argument('--workers', type=int, default=None,
+                                help='Pièces récupérées en parallèle avec --rooms (défaut: NETATMO_MAX_CONCURRENCY)')
     parser_history.set_defaults(func=cmd_history)
     
     # Commande stats
-    parser_stats = subparsers.add_parser('stats', help='Afficher les statistiques', parents=[common_args])
+    parser_stats = subparsers.add_parser('stats', help='Afficher les statistiques', parents=[common_args, store_args])
     parser_stats.add_argument('--days', type=int, default=7, help='Nombre de jours (défaut: 7)')
+    parser_stats.add_argument('--scale', choices=list(SCALE_SECONDS), default='1hour',
+                              help='Échelle des mesures (défaut: 1hour)')
+    parser_stats.add_argument('--metrics', type=parse_metrics, default=None,
+                              help='Métriques séparées par des virgules: basic, percentiles, std, rolling, '
+                                   'time_weighted, degree_days, hourly_profile, boiler, setpoint ou all '
+                                   '(défaut: basic)')
     parser_stats.set_defaults(func=cmd_stats)
     
-    args = parser.parse_args()
+    # Commande fleet
+    parser_fleet = subparsers.add_parser('fleet', help='Exécuter status, stats ou set sur plusieurs comptes en parallèle',
+                                         parents=[base_args])
+    parser_fleet.add_argument('accounts', metavar='FICHIER', help='Fichier JSON des comptes')
+    parser_fleet.add_argument('action', choices=['status', 'stats', 'set'], help='Commande à exécuter sur chaque compte')
+    parser_fleet.add_argument('temperature', type=float, nargs='?', default=None,
+                              help='Température cible en °C (set)')
+    parser_fleet.add_argument('--workers', type=int, default=None,
+                              help='Nombre de processus (défaut: un par compte, au plus 32)')
+    parser_fleet.add_argument('--days', type=int, default=7, help='Nombre de jours (stats, défaut: 7)')
+    parser_fleet.add_argument('--scale', choices=list(SCALE_SECONDS), default='1hour',
+                              help='Échelle des mesures (stats, défaut: 1hour)')
+    parser_fleet.add_argument('--metrics', type=parse_metrics, default=None,
+                              help='Métriques des statistiques, séparées par des virgules: basic, percentiles, '
+                                   'std, rolling, time_weighted, degree_days, hourly_profile, boiler, setpoint '
+                                   'ou all (défaut: basic)')
+    parser_fleet.add_argument('--force', action='store_true',
+                              help='Envoyer la consigne même si le statut en cache indique qu\'elle est déjà en place')
+    parser_fleet.set_defaults(func=None)
+    
+    # Commande daemon
+    parser_daemon = subparsers.add_parser('daemon', help='Lancer le démon qui garde le client chaud entre les commandes',
+                                          parents=[common_args])
+    parser_daemon.add_argument('--socket', default=None,
+                               help='Chemin de la socket Unix (défaut: NETATMO_DAEMON_SOCKET)')
+    parser_daemon.add_argument('--status-ttl', type=float, default=None,
+                               help='Durée de réconciliation du statut en cache, en secondes (défaut: NETATMO_STATUS_TTL)')
+    parser_daemon.set_defaults(func=None)
+    
+    return parser
+
+
+def main():
+    """Point d'entrée principal de l'application CLI."""
+    argv = sys.argv[1:]
+    # Chemin rapide : --version n'a besoin ni du parser complet ni de la configuration
+    if argv in (['--version'], ['-V']):
+        print(f"netatmo_cli.py {__version__}")
+        return
+    
+    parser = build_parser()
+    args = parser.parse_args(argv)
     
     if not args.command:
         parser.print_help()
@@ -243,11 +730,29 @@ def main():
     
     try:
         config = Config()
-        client = NetatmoClient(config)
         if args.debug:
             import logging
             logging.basicConfig(level=logging.DEBUG)
-        args.func(client, args)
+        if args.command == 'daemon':
+            cmd_daemon(config, args)
+            return
+        if args.command == 'fleet':
+            cmd_fleet(config, args)
+            return
+        # La surveillance est une boucle longue : pas de transfert au démon (sortie bufferisée)
+        if not args.no_daemon and not getattr(args, 'watch', False):
+            forward_to_daemon(config, args.command, absolute_path_args(argv, args))
+        from instrumentation import timings_report
+        from netatmo_client import NetatmoClient
+        from profiling import profile_command
+        # Une seule session HTTP (keep-alive) pour tous les appels de la commande
+        with NetatmoClient(config) as client, client.cache_policy(args.no_cache, args.max_age), \
+                timings_report(client, args.timings), \
+                profile_command(args.profile or bool(args.profile_output), args.profile_output):
+            result = args.func(client, args)
+        # Les commandes longues (status --watch) renvoient leur code de sortie
+        if isinstance(result, int) and not isinstance(result, bool) and result:
+            sys.exit(result)
     except ValueError as e:
         print(f"Erreur de configuration: {e}", file=sys.stderr)
         if args.debug:
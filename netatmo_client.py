@@ -1,54 +1,414 @@
 """Client API Netatmo pour interagir avec le thermostat."""
-import requests
+import json
+import threading
 import time
 import sys
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Any, Tuple
 from config import Config
+from instrumentation import RequestEvent, RequestObserver, connection_timings, reset_connection_timings
+from rate_limiter import RateLimiter
+from singleflight import SingleFlight, request_key
+from resilience import (
+    CircuitBreaker, NetatmoAPIError, RetryPolicy, TokenExpiredError, TransientAPIError, classify_error
+)
+from measures import SCALE_SECONDS, iter_measures, merge_measure_responses, split_time_range
+from token_store import TokenStore
+from timeseries import TimeSeries
+from status_cache import StatusCache, same_setpoint
+from topology import HomeTopology, TopologyCache
+
+if TYPE_CHECKING:
+    import requests
+    from measure_store import MeasureStore
+    from response_cache import ResponseCache
+
+
+OAUTH_HEADERS = {
+    'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8',
+    'User-Agent': 'NetatmoCLI/1.0'
+}
+
+
+def _parse_json(text: str) -> Any:
+    """Parse une réponse JSON, retourne None si ce n'est pas du JSON."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def auth_error_message(status_code: int, content_type: str, text: str) -> str:
+    """Construit le message d'erreur d'une authentification username/password échouée."""
+    error_msg = f"Erreur d'authentification ({status_code})"
+    
+    # Vérifier si c'est une réponse HTML (blocage)
+    if 'text/html' in content_type:
+        error_msg += ": La requête a été bloquée par Netatmo"
+        error_msg += "\nCauses possibles:"
+        error_msg += "\n  - Identifiants incorrects (Client ID, Client Secret, username, password)"
+        error_msg += "\n  - Application non configurée correctement dans le portail développeur"
+        error_msg += "\n  - Restrictions de sécurité sur le compte Netatmo"
+        return error_msg
+    
+    # Essayer de parser comme JSON
+    error_data = _parse_json(text)
+    if not isinstance(error_data, dict):
+        # Si ce n'est pas du JSON, prendre les 200 premiers caractères
+        text = text[:200].replace('\n', ' ')
+        if text:
+            error_msg += f": {text}"
+        return error_msg
+    
+    if 'error' in error_data:
+        error_code = error_data.get('error')
+        error_msg += f": {error_code}"
+        
+        # Messages d'erreur spécifiques selon le code d'erreur
+        if error_code == 'invalid_client':
+            error_msg += "\nLe Client ID ou Client Secret est incorrect."
+            error_msg += "\nVérifiez dans le portail développeur (https://dev.netatmo.com/) que:"
+            error_msg += "\n  - Le Client ID correspond exactement à celui de votre application"
+            error_msg += "\n  - Le Client Secret correspond exactement à celui de votre application"
+            error_msg += "\n  - Il n'y a pas d'espaces ou de caractères invisibles dans le fichier .env"
+        elif error_code == 'invalid_grant':
+            error_msg += "\nLe username ou password est incorrect, ou le grant type n'est pas autorisé."
+            error_msg += "\nVérifiez que:"
+            error_msg += "\n  - Le username et password sont ceux de votre compte Netatmo"
+            error_msg += "\n  - Le grant type 'password' est activé pour votre application"
+        elif error_code == 'invalid_scope':
+            error_msg += "\nLe scope demandé n'est pas autorisé pour votre application."
+            error_msg += "\nVérifiez dans le portail développeur que votre application a accès à l'API Energy."
+        
+        if 'error_description' in error_data:
+            error_msg += f"\nDescription: {error_data.get('error_description')}"
+    
+    return error_msg
+
+
+def refresh_error_message(status_code: int, content_type: str, text: str) -> str:
+    """Construit le message d'erreur d'un rafraîchissement de token échoué."""
+    error_msg = f"Erreur de rafraîchissement du token ({status_code})"
+    
+    if 'text/html' in content_type:
+        return error_msg + ": La requête a été bloquée par Netatmo"
+    
+    error_data = _parse_json(text)
+    if not isinstance(error_data, dict):
+        text = text[:200].replace('\n', ' ')
+        if text:
+            error_msg += f": {text}"
+        return error_msg
+    
+    if 'error' in error_data:
+        error_code = error_data.get('error')
+        error_msg += f": {error_code}"
+        if error_code == 'invalid_grant':
+            error_msg += "\nLe refresh token est invalide ou expiré. Une nouvelle authentification est nécessaire."
+    
+    return error_msg
+
+
+def api_error_message(status_code: int, text: str) -> str:
+    """Construit le message d'erreur d'un appel API échoué."""
+    error_msg = f"Erreur API ({status_code})"
+    error_data = _parse_json(text)
+    if isinstance(error_data, dict):
+        error = error_data.get('error')
+        if isinstance(error, dict):
+            # Format de l'API Netatmo : {"error": {"code": 26, "message": "User usage reached"}}
+            error_msg += f": {error.get('message')} (code {error.get('code')})"
+        elif 'error' in error_data:
+            error_msg += f": {error}"
+        if 'error_description' in error_data:
+            error_msg += f" - {error_data.get('error_description')}"
+    else:
+        # Si ce n'est pas du JSON, prendre les premiers caractères
+        text = text[:200].replace('\n', ' ')
+        if text:
+            error_msg += f": {text}"
+    return error_msg
+
+
+# Modes de consigne d'une pièce acceptés par /api/setstate (alias du CLI -> valeur API)
+ROOM_SETPOINT_MODES = {
+    'schedule': 'home',
+    'program': 'home',
+    'home': 'home',
+    'off': 'off',
+    'max': 'max',
+}
+
+
+def room_setpoint(value: Any) -> Dict[str, Any]:
+    """
+    Convertit une consigne (température ou mode) en champs de pièce pour /api/setstate.
+    
+    Args:
+        value: Température en °C (nombre ou texte) ou mode ('schedule', 'off', 'max')
+    """
+    if isinstance(value, str):
+        mode = ROOM_SETPOINT_MODES.get(value.strip().lower())
+        if mode is not None:
+            return {'therm_setpoint_mode': mode}
+        try:
+            value = float(value.replace(',', '.'))
+        except ValueError:
+            raise ValueError(
+                f"Consigne invalide: {value} (température en °C ou mode parmi: {', '.join(ROOM_SETPOINT_MODES)})"
+            ) from None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Consigne invalide: {value}")
+    return {'therm_setpoint_mode': 'manual', 'therm_setpoint_temperature': value}
 
 
 class NetatmoClient:
     """Client pour interagir avec l'API Netatmo."""
     
     BASE_URL = "https://api.netatmo.com"
-    OAUTH_URL = f"{BASE_URL}/oauth2/token"
     
-    def __init__(self, config: Config):
-        """Initialise le client avec la configuration."""
+    def __init__(self, config: Config, pool_size: Optional[int] = None,
+                 timeout: Optional[Tuple[float, float]] = None, status_ttl: Optional[float] = None):
+        """
+        Initialise le client avec la configuration.
+        
+        Args:
+            config: Configuration Netatmo
+            pool_size: Nombre de connexions keep-alive conservées (défaut: config.pool_size)
+            timeout: Timeouts (connexion, lecture) en secondes (défaut: ceux de la config)
+            status_ttl: Durée de réconciliation du statut en cache (défaut: config.status_ttl)
+        """
         self.config = config
         self.config.validate()
+        self.base_url = config.api_url or self.BASE_URL
+        self.oauth_url = f"{self.base_url}/oauth2/token"
+        self.timeout = timeout or (config.connect_timeout, config.read_timeout)
+        # Session HTTP créée au premier appel réseau : requests n'est importé que si nécessaire
+        self._pool_size = pool_size or config.pool_size
+        self._session: Optional['requests.Session'] = None
+        self._session_lock = threading.Lock()
+        self.measure_store: Optional['MeasureStore'] = None
+        self._response_cache: Optional['ResponseCache'] = None
+        # Âge maximal accepté pour les données en cache (None = TTL de chaque cache, 0 = aucun cache)
+        self.max_age: Optional[float] = None
+        # Sérialise les rafraîchissements du token entre threads (appels parallèles)
+        self._token_lock = threading.Lock()
         self.access_token = None
         self.refresh_token = config.refresh_token
         self.token_expires_at = 0
+        self.scope = None
+        self.token_store = TokenStore(config.token_cache_path, config.client_id)
+        self.topology_cache = TopologyCache(config.topology_cache_path, config.topology_ttl, config.client_id)
+        self.status_cache = StatusCache(
+            config.status_cache_path, config.status_ttl if status_ttl is None else status_ttl, config.client_id
+        )
+        self.rate_limiter = self._create_rate_limiter(config)
+        self.retry_policy = RetryPolicy(config.max_retries, max_delay=config.retry_max_delay)
+        self.circuit_breaker = CircuitBreaker(config.circuit_threshold, config.circuit_reset)
+        # Observateurs des appels HTTP (instrumentation, --timings)
+        self.observers: List[RequestObserver] = []
+        # Lectures identiques simultanées : un seul appel à l'API
+        self.singleflight = SingleFlight()
+        self._load_cached_token()
+        
+    @property
+    def session(self) -> 'requests.Session':
+        """Session HTTP partagée, créée au premier appel réseau."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session(self._pool_size)
+        return self._session
+    
+    @staticmethod
+    def _create_session(pool_size: int) -> 'requests.Session':
+        """Crée la session HTTP partagée : une connexion TLS réutilisée pour tous les appels."""
+        import requests
+        from timed_adapter import TimedHTTPAdapter
+        
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['User-Agent'] = 'NetatmoCLI/1.0'
+        return session
+    
+    @staticmethod
+    def _create_rate_limiter(config: Config) -> RateLimiter:
+        """Crée le limiteur de débit partagé entre processus (quotas par 10 s et par heure)."""
+        return RateLimiter(
+            config.rate_limit_path,
+            [(config.rate_limit_10s, 10), (config.rate_limit_hour, 3600)],
+            config.client_id
+        )
+    
+    @staticmethod
+    def _report_rate_limit_wait(wait: float) -> None:
+        """Signale une requête retardée pour respecter les quotas de l'API."""
+        if wait >= 0.5:
+            print(f"⏳ Quota API Netatmo atteint : requête retardée de {wait:.1f}s", file=sys.stderr)
+    
+    def add_observer(self, observer: RequestObserver) -> None:
+        """Ajoute un observateur notifié après chaque appel HTTP (voir instrumentation.RequestObserver)."""
+        self.observers.append(observer)
+    
+    def remove_observer(self, observer: RequestObserver) -> None:
+        """Retire un observateur ajouté par add_observer."""
+        if observer in self.observers:
+            self.observers.remove(observer)
+    
+    def _send(self, method: str, url: str, endpoint: str, attempt: int = 0,
+              rate_limit_wait: float = 0.0, **kwargs) -> 'requests.Response':
+        """
+        Envoie une requête HTTP et notifie les observateurs de ses mesures.
+        
+        Args:
+            method: Méthode HTTP
+            url: URL complète
+            endpoint: Chemin de l'API (rapport)
+            attempt: Numéro de tentative (0 pour le premier essai)
+            rate_limit_wait: Attente imposée par le limiteur de débit avant l'envoi
+        """
+        if not self.observers:
+            return self.session.request(method, url, **kwargs)
+        
+        reset_connection_timings()
+        start = time.perf_counter()
+        event = RequestEvent(method, endpoint, attempt=attempt, rate_limit_wait=rate_limit_wait)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception as e:
+            event.error = type(e).__name__
+            raise
+        else:
+            event.status = response.status_code
+            event.size = len(response.content)
+            # elapsed : de l'envoi à la réception des en-têtes (connexion comprise)
+            headers_received = response.elapsed.total_seconds()
+            event.transfer = max(0.0, time.perf_counter() - start - headers_received)
+            return response
+        finally:
+            event.total = time.perf_counter() - start
+            phases = connection_timings()
+            event.dns, event.connect, event.tls = phases['dns'], phases['connect'], phases['tls']
+            event.new_connection = phases['new_connection']
+            event.wait = max(0.0, event.total - event.transfer - event.dns - event.connect - event.tls)
+            for observer in list(self.observers):
+                try:
+                    observer.on_request(event)
+                except Exception:
+                    pass
+    
+    def close(self) -> None:
+        """Ferme les connexions du pool, le stockage local des mesures et le cache des réponses."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self.measure_store is not None:
+            self.measure_store.close()
+            self.measure_store = None
+        if self._response_cache is not None:
+            self._response_cache.close()
+            self._response_cache = None
+    
+    @property
+    def response_cache(self) -> 'ResponseCache':
+        """Cache disque des réponses GET, ouvert au premier appel (sqlite3 n'est importé que si nécessaire)."""
+        if self._response_cache is None:
+            from response_cache import OPEN_WINDOW_TTL, ResponseCache
+            
+            # Topologie et statut ont leur propre cache (TopologyCache, StatusCache) : un seul niveau par endpoint
+            self._response_cache = ResponseCache(
+                self.config.response_cache_path,
+                self.config.response_cache_size,
+                {
+                    '/api/getmeasure': OPEN_WINDOW_TTL,
+                    '/api/getroommeasure': OPEN_WINDOW_TTL,
+                },
+                self.config.client_id,
+            )
+        return self._response_cache
+    
+    @contextmanager
+    def cache_policy(self, no_cache: bool = False, max_age: Optional[float] = None) -> Iterator[None]:
+        """
+        Fraîcheur exigée des données en cache (topologie, statut, réponses) le temps d'une commande.
+        
+        Args:
+            no_cache: Interroger l'API sans lire les caches (les réponses fraîches y sont enregistrées)
+            max_age: Âge maximal accepté en secondes
+        """
+        if max_age is not None and max_age < 0:
+            raise ValueError("L'âge maximal du cache doit être positif ou nul")
+        previous = self.max_age
+        self.max_age = 0 if no_cache else max_age
+        try:
+            yield
+        finally:
+            self.max_age = previous
+    
+    def _max_age(self, max_age: Optional[float] = None) -> Optional[float]:
+        """Âge maximal effectif : le plus strict de celui de l'appel et de la politique en cours."""
+        ages = [age for age in (max_age, self.max_age) if age is not None]
+        return min(ages) if ages else None
+    
+    def __enter__(self) -> 'NetatmoClient':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def _load_cached_token(self) -> bool:
+        """Charge les tokens depuis le cache disque (aucun appel OAuth si l'access token est encore valide)."""
+        cached = self.token_store.load()
+        if not cached:
+            return False
+        self.access_token = cached.get('access_token')
+        self.refresh_token = cached.get('refresh_token') or self.refresh_token
+        self.token_expires_at = cached.get('expires_at', 0)
+        self.scope = cached.get('scope')
+        return True
+    
+    def _apply_token_response(self, token_data: Dict[str, Any]) -> None:
+        """Met à jour les tokens en mémoire et les persiste dans le cache disque."""
+        self.access_token = token_data['access_token']
+        # Le refresh token peut être renouvelé, on garde le nouveau s'il est fourni
+        self.refresh_token = token_data.get('refresh_token', self.refresh_token)
+        # Netatmo utilise généralement 10800 secondes (3 heures) pour expires_in
+        self.token_expires_at = time.time() + token_data.get('expires_in', 10800) - 60  # -60 pour marge de sécurité
+        self.scope = token_data.get('scope', self.scope)
+        
+        try:
+            self.token_store.save(self.access_token, self.refresh_token, self.token_expires_at, self.scope)
+        except OSError as e:
+            print(f"⚠ Impossible d'écrire le cache des tokens ({self.token_store.path}): {e}", file=sys.stderr)
         
     def _authenticate(self) -> str:
         """Authentifie le client et retourne le token d'accès."""
-        # Si on a un refresh token dans la config, l'utiliser en priorité
-        if self.refresh_token and not self.access_token:
-            try:
-                return self._refresh_access_token()
-            except Exception:
-                # Si le refresh échoue, on fait une authentification complète
-                pass
-        
         # Si on a déjà un token valide, le retourner
         if self.access_token and time.time() < self.token_expires_at:
             return self.access_token
         
-        # Si on a un refresh token valide (mais token expiré), le rafraîchir
-        if self.refresh_token and time.time() < self.token_expires_at + 86400:  # Refresh token valide encore 24h
+        # Utiliser le refresh token en priorité : d'abord celui du cache (le plus récent),
+        # puis celui de la config si le premier a été révoqué
+        refresh_candidates = []
+        for candidate in (self.refresh_token, self.config.refresh_token):
+            if candidate and candidate not in refresh_candidates:
+                refresh_candidates.append(candidate)
+        
+        for candidate in refresh_candidates:
+            self.refresh_token = candidate
             try:
                 return self._refresh_access_token()
             except Exception:
-                # Si le refresh échoue, on fait une authentification complète
+                # Si le refresh échoue, on essaie le suivant puis l'authentification complète
                 pass
         
         # Authentification complète avec username/password
         # Les headers sont importants pour éviter le blocage
         # Note: La doc Netatmo spécifie charset=UTF-8 dans Content-Type
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8',
-            'User-Agent': 'NetatmoCLI/1.0'
-        }
+        headers = OAUTH_HEADERS
         
         data = {
             'grant_type': 'password',
@@ -59,7 +419,7 @@ class NetatmoClient:
         }
         
         # Essayer d'abord sans scope
-        response = requests.post(self.OAUTH_URL, data=data, headers=headers)
+        response = self._send('POST', self.oauth_url, '/oauth2/token', data=data, headers=headers, timeout=self.timeout)
         
         # Si 403 ou autre erreur, essayer avec scope
         if response.status_code != 200:
@@ -73,78 +433,52 @@ class NetatmoClient:
             for scope in scopes_to_try:
                 data_with_scope = data.copy()
                 data_with_scope['scope'] = scope
-                response = requests.post(self.OAUTH_URL, data=data_with_scope, headers=headers)
+                response = self._send('POST', self.oauth_url, '/oauth2/token', data=data_with_scope,
+                                      headers=headers, timeout=self.timeout)
                 if response.status_code == 200:
                     break
         
         # Vérifier la réponse
         if response.status_code != 200:
-            error_msg = f"Erreur d'authentification ({response.status_code})"
-            
-            # Vérifier si c'est une réponse HTML (blocage)
-            content_type = response.headers.get('Content-Type', '')
-            if 'text/html' in content_type:
-                error_msg += ": La requête a été bloquée par Netatmo"
-                error_msg += "\nCauses possibles:"
-                error_msg += "\n  - Identifiants incorrects (Client ID, Client Secret, username, password)"
-                error_msg += "\n  - Application non configurée correctement dans le portail développeur"
-                error_msg += "\n  - Restrictions de sécurité sur le compte Netatmo"
-            else:
-                # Essayer de parser comme JSON
-                try:
-                    error_data = response.json()
-                    if 'error' in error_data:
-                        error_code = error_data.get('error')
-                        error_msg += f": {error_code}"
-                        
-                        # Messages d'erreur spécifiques selon le code d'erreur
-                        if error_code == 'invalid_client':
-                            error_msg += "\nLe Client ID ou Client Secret est incorrect."
-                            error_msg += "\nVérifiez dans le portail développeur (https://dev.netatmo.com/) que:"
-                            error_msg += "\n  - Le Client ID correspond exactement à celui de votre application"
-                            error_msg += "\n  - Le Client Secret correspond exactement à celui de votre application"
-                            error_msg += "\n  - Il n'y a pas d'espaces ou de caractères invisibles dans le fichier .env"
-                        elif error_code == 'invalid_grant':
-                            error_msg += "\nLe username ou password est incorrect, ou le grant type n'est pas autorisé."
-                            error_msg += "\nVérifiez que:"
-                            error_msg += "\n  - Le username et password sont ceux de votre compte Netatmo"
-                            error_msg += "\n  - Le grant type 'password' est activé pour votre application"
-                        elif error_code == 'invalid_scope':
-                            error_msg += "\nLe scope demandé n'est pas autorisé pour votre application."
-                            error_msg += "\nVérifiez dans le portail développeur que votre application a accès à l'API Energy."
-                        
-                        if 'error_description' in error_data:
-                            error_msg += f"\nDescription: {error_data.get('error_description')}"
-                except:
-                    # Si ce n'est pas du JSON, prendre les 200 premiers caractères
-                    text = response.text[:200].replace('\n', ' ')
-                    if text:
-                        error_msg += f": {text}"
-            
-            raise ValueError(error_msg)
+            raise ValueError(auth_error_message(
+                response.status_code, response.headers.get('Content-Type', ''), response.text
+            ))
         
         token_data = response.json()
-        self.access_token = token_data['access_token']
-        self.refresh_token = token_data.get('refresh_token', self.refresh_token)
-        # Netatmo utilise généralement 10800 secondes (3 heures) pour expires_in
-        self.token_expires_at = time.time() + token_data.get('expires_in', 10800) - 60  # -60 pour marge de sécurité
+        self._apply_token_response(token_data)
         
         # Afficher un message informatif si un nouveau refresh token est obtenu
         if 'refresh_token' in token_data:
-            print(f"✓ Authentification réussie. Refresh token sauvegardé dans la config.", file=sys.stderr)
+            print(f"✓ Authentification réussie. Refresh token sauvegardé dans {self.token_store.path}.", file=sys.stderr)
         
         return self.access_token
     
     def _refresh_access_token(self) -> str:
-        """Rafraîchit le token d'accès avec le refresh token."""
+        """
+        Rafraîchit le token d'accès avec le refresh token.
+        
+        Le rafraîchissement est sérialisé entre processus par le verrou du cache :
+        si un autre processus a déjà obtenu un nouveau token pendant l'attente,
+        celui-ci est réutilisé au lieu de consommer un refresh token déjà tourné.
+        """
+        with self.token_store.lock():
+            cached = self.token_store.load()
+            if cached:
+                if (cached.get('access_token') != self.access_token
+                        and time.time() < cached.get('expires_at', 0)):
+                    self._load_cached_token()
+                    return self.access_token
+                if cached.get('refresh_token') and self.refresh_token != self.config.refresh_token:
+                    self.refresh_token = cached['refresh_token']
+            return self._request_token_refresh()
+    
+    def _request_token_refresh(self) -> str:
+        """Appelle /oauth2/token avec le grant refresh_token."""
         if not self.refresh_token:
             raise ValueError("Aucun refresh token disponible pour rafraîchir l'authentification")
         
         # Note: La doc Netatmo spécifie charset=UTF-8 dans Content-Type
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8',
-            'User-Agent': 'NetatmoCLI/1.0'
-        }
+        headers = OAUTH_HEADERS
         
         data = {
             'grant_type': 'refresh_token',
@@ -153,82 +487,144 @@ class NetatmoClient:
             'client_secret': self.config.client_secret
         }
         
-        response = requests.post(self.OAUTH_URL, data=data, headers=headers)
+        response = self._send('POST', self.oauth_url, '/oauth2/token', data=data, headers=headers, timeout=self.timeout)
         
         if response.status_code != 200:
-            error_msg = f"Erreur de rafraîchissement du token ({response.status_code})"
-            
-            content_type = response.headers.get('Content-Type', '')
-            if 'text/html' in content_type:
-                error_msg += ": La requête a été bloquée par Netatmo"
-            else:
-                try:
-                    error_data = response.json()
-                    if 'error' in error_data:
-                        error_code = error_data.get('error')
-                        error_msg += f": {error_code}"
-                        if error_code == 'invalid_grant':
-                            error_msg += "\nLe refresh token est invalide ou expiré. Une nouvelle authentification est nécessaire."
-                except:
-                    text = response.text[:200].replace('\n', ' ')
-                    if text:
-                        error_msg += f": {text}"
-            
-            raise ValueError(error_msg)
+            raise ValueError(refresh_error_message(
+                response.status_code, response.headers.get('Content-Type', ''), response.text
+            ))
         
-        token_data = response.json()
-        self.access_token = token_data['access_token']
-        # Le refresh token peut être renouvelé, on garde le nouveau s'il est fourni
-        self.refresh_token = token_data.get('refresh_token', self.refresh_token)
-        self.token_expires_at = time.time() + token_data.get('expires_in', 10800) - 60  # Netatmo utilise 10800s (3h)
+        self._apply_token_response(response.json())
         
         return self.access_token
     
     def _get_access_token(self) -> str:
         """Récupère un token d'accès valide."""
         if not self.access_token or time.time() >= self.token_expires_at:
-            self._authenticate()
+            with self._token_lock:
+                # Un autre thread a pu rafraîchir le token pendant l'attente du verrou
+                if not self.access_token or time.time() >= self.token_expires_at:
+                    self._authenticate()
         return self.access_token
     
-    def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Effectue une requête authentifiée à l'API Netatmo."""
-        token = self._get_access_token()
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+    def _invalidate_access_token(self, token: str) -> None:
+        """Marque comme expiré un access token refusé par l'API (sauf s'il a déjà été remplacé)."""
+        with self._token_lock:
+            if self.access_token == token:
+                self.token_expires_at = 0
+    
+    def _request(self, method: str, endpoint: str, max_age: Optional[float] = None,
+                 cache: bool = True, **kwargs) -> Dict[str, Any]:
+        """
+        Effectue une requête authentifiée à l'API Netatmo.
         
-        url = f"{self.BASE_URL}{endpoint}"
-        response = requests.request(method, url, headers=headers, **kwargs)
+        Une réponse GET encore valide est lue dans le cache disque des réponses ;
+        sinon les GET identiques (même endpoint, mêmes paramètres) lancés en même
+        temps par plusieurs threads partagent un seul appel et sa réponse décodée.
         
-        # Gestion améliorée des erreurs
-        if response.status_code != 200:
-            error_msg = f"Erreur API ({response.status_code})"
-            try:
-                error_data = response.json()
-                if 'error' in error_data:
-                    error_msg += f": {error_data.get('error')}"
-                if 'error_description' in error_data:
-                    error_msg += f" - {error_data.get('error_description')}"
-            except:
-                # Si ce n'est pas du JSON, prendre les premiers caractères
-                text = response.text[:200].replace('\n', ' ')
-                if text:
-                    error_msg += f": {text}"
-            raise ValueError(error_msg)
-        
-        return response.json()
-    
-    def get_homes_data(self) -> Dict[str, Any]:
-        """Récupère la liste des maisons et leurs données."""
-        return self._request('GET', '/api/homesdata')
-    
-    def get_home_status(self, home_id: Optional[str] = None) -> Dict[str, Any]:
+        Args:
+            max_age: Âge maximal accepté pour une réponse en cache (0 = interroger l'API)
+            cache: False pour ne ni lire ni enregistrer la réponse dans le cache disque
+        
+        Raises:
+            NetatmoAPIError: Erreur de l'API (sous-classe de ValueError)
+        """
+        if method != 'GET' or not set(kwargs) <= {'params'}:
+            return self._perform_request(method, endpoint, **kwargs)
+        
+        params = kwargs.get('params')
+        max_age = self._max_age(max_age)
+        if cache and max_age != 0:
+            cached = self.response_cache.get(endpoint, params, max_age)
+            if cached is not None:
+                return cached
+        
+        def fetch() -> Dict[str, Any]:
+            response = self._perform_request(method, endpoint, **kwargs)
+            if cache:
+                self.response_cache.put(endpoint, params, response)
+            return response
+        
+        return self.singleflight.do(request_key(method, endpoint, params), fetch)
+    
+    def _perform_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """
+        Envoie une requête authentifiée à l'API Netatmo.
+        
+        Les erreurs temporaires (5xx, 429, réseau) sont retentées avec un backoff
+        exponentiel qui respecte Retry-After ; un token refusé est rafraîchi une
+        fois de façon transparente.
+        
+        Raises:
+            NetatmoAPIError: Erreur de l'API (sous-classe de ValueError)
+        """
+        import requests
+        
+        url = f"{self.base_url}{endpoint}"
+        kwargs.setdefault('timeout', self.timeout)
+        token_refreshed = False
+        retry = 0
+        attempt = 0
+        
+        # L'appel d'essai du disjoncteur semi-ouvert garde la main jusqu'à sa fin
+        trial = False
+        try:
+            while True:
+                if not trial:
+                    trial = self.circuit_breaker.before_call()
+                token = self._get_access_token()
+                headers = {
+                    'Authorization': f'Bearer {token}',
+                    'Content-Type': 'application/json'
+                }
+                # Mise en file d'attente plutôt qu'un dépassement de quota (erreur 429/403)
+                rate_limit_wait = self.rate_limiter.acquire()
+                self._report_rate_limit_wait(rate_limit_wait)
+            
+                try:
+                    response = self._send(method, url, endpoint, attempt, rate_limit_wait, headers=headers, **kwargs)
+                except requests.RequestException as e:
+                    error: NetatmoAPIError = TransientAPIError(f"Erreur réseau ({endpoint}): {e}")
+                else:
+                    if response.status_code == 200:
+                        self.circuit_breaker.record_success()
+                        return response.json()
+                    error = classify_error(
+                        response.status_code, api_error_message(response.status_code, response.text),
+                        _parse_json(response.text), response.headers
+                    )
+            
+                attempt += 1
+                if isinstance(error, TokenExpiredError) and not token_refreshed:
+                    token_refreshed = True
+                    self._invalidate_access_token(token)
+                    continue
+                if not isinstance(error, TransientAPIError):
+                    # L'API répond : erreur définitive, inutile de réessayer
+                    self.circuit_breaker.record_success()
+                    raise error
+            
+                self.circuit_breaker.record_failure()
+                delay = self.retry_policy.delay(retry, error)
+                if delay is None:
+                    raise error
+                retry += 1
+                time.sleep(delay)
+        finally:
+            if trial:
+                self.circuit_breaker.end_trial()
+    
+    def get_homes_data(self, refresh: bool = False) -> Dict[str, Any]:
+        """Récupère la liste des maisons et leurs données, via le cache de la topologie (refresh: l'ignorer)."""
+        return self.get_topology(refresh).homes_data
+    
+    def get_home_status(self, home_id: Optional[str] = None, refresh: bool = False) -> Dict[str, Any]:
         """
         Récupère le statut de la maison et des thermostats.
         
         Args:
             home_id: ID de la maison (optionnel, si non fourni, utilise la première maison)
+            refresh: Ignorer le statut en cache (la réponse fraîche le remplace)
         """
         # Si home_id n'est pas fourni, obtenir la liste des maisons d'abord
         if not home_id:
@@ -240,28 +636,65 @@ class NetatmoClient:
             if not home_id:
                 raise ValueError("Impossible de déterminer l'ID de la maison")
         
+        max_age = 0 if refresh else self._max_age()
+        cached = None if max_age == 0 else self.status_cache.get(home_id, max_age)
+        if cached is not None:
+            return cached
+        
         # Appeler homestatus avec le home_id
-        return self._request('GET', '/api/homestatus', params={'home_id': home_id})
+        status = self._request('GET', '/api/homestatus', params={'home_id': home_id}, cache=False)
+        self.status_cache.put(home_id, status)
+        return status
+    
+    def get_topology(self, refresh: bool = False) -> HomeTopology:
+        """
+        Retourne la topologie indexée des maisons.
+        
+        La réponse de /api/homesdata est mise en cache (mémoire et disque) pendant
+        config.topology_ttl secondes.
+        
+        Args:
+            refresh: Oublier le cache (la topologie a pu changer) et interroger l'API
+        """
+        if refresh:
+            # Même si l'appel échoue, l'ancienne topologie ne doit plus être servie
+            self.topology_cache.invalidate()
+        max_age = 0 if refresh else self._max_age()
+        if max_age != 0:
+            topology = self.topology_cache.get(max_age)
+            if topology is not None:
+                return topology
+        
+        topology = HomeTopology(self._request('GET', '/api/homesdata', cache=False))
+        self.topology_cache.put(topology)
+        return topology
+    
+    def get_thermostat_location(self) -> Dict[str, Any]:
+        """Résout maison, pièce, module et bridge du thermostat sans appel réseau si la topologie est en cache."""
+        topology = self.get_topology()
+        if not topology.homes:
+            raise ValueError("Aucune maison trouvée dans votre compte Netatmo")
+        
+        location = topology.find_thermostat()
+        if not location:
+            raise ValueError("Aucun thermostat trouvé dans vos maisons Netatmo")
+        return location
     
     def get_thermostat_status(self, debug: bool = False) -> Dict[str, Any]:
         """Récupère le statut du thermostat."""
-        # Obtenir d'abord la liste des maisons pour trouver le home_id
-        homes_data = self.get_homes_data()
+        # La topologie (en cache) donne les maisons et leurs modules de chauffage
+        topology = self.get_topology()
         
         if debug:
-            import json
             print("DEBUG - homes_data structure:", file=sys.stderr)
-            print(json.dumps(homes_data, indent=2)[:2000], file=sys.stderr)
-        
-        homes = homes_data.get('body', {}).get('homes', [])
+            print(json.dumps(topology.homes_data, indent=2)[:2000], file=sys.stderr)
         
-        if not homes:
+        if not topology.homes:
             raise ValueError("Aucune maison trouvée dans votre compte Netatmo")
         
         # Parcourir les maisons pour trouver un thermostat
-        for home in homes:
-            home_id = home.get('id')
-            if not home_id:
+        for home_id in topology.homes:
+            if not topology.heating_modules(home_id):
                 continue
             
             # Obtenir le statut de cette maison
@@ -269,7 +702,6 @@ class NetatmoClient:
                 home_status = self.get_home_status(home_id)
                 
                 if debug:
-                    import json
                     print(f"\nDEBUG - home_status structure for {home_id}:", file=sys.stderr)
                     print(json.dumps(home_status, indent=2)[:2000], file=sys.stderr)
             except Exception as e:
@@ -277,85 +709,64 @@ class NetatmoClient:
                     print(f"DEBUG - Error getting home_status: {e}", file=sys.stderr)
                 continue
             
-            # La structure est : body.home.rooms (données de température) et body.home.modules (infos modules)
-            home_data = home_status.get('body', {}).get('home', {})
-            rooms = home_data.get('rooms', [])
-            modules = home_data.get('modules', [])
-            
-            # Chercher le module thermostat dans les modules
-            thermostat_module = None
-            for module in modules:
-                module_type = module.get('type')
-                if module_type in ['NATherm1', 'NRV', 'OTM', 'OTM-C']:
-                    thermostat_module = module
-                    break
-            
-            if not thermostat_module:
-                continue
-            
-            # Trouver la room correspondante
-            thermostat_room = None
-            module_id = thermostat_module.get('id')
-            
-            # Méthode 1: Utiliser room_id du module (depuis homes_data)
-            module_room_id = None
-            for mod in home.get('modules', []):
-                if mod.get('id') == module_id:
-                    module_room_id = mod.get('room_id')
-                    break
-            
-            # Chercher la room correspondante dans home_status
-            for room in rooms:
-                room_id = room.get('id')
-                # Vérifier si c'est la room du module
-                if room_id == module_room_id:
-                    thermostat_room = room
-                    break
-                
-                # Vérifier aussi via module_ids dans homes_data
-                for r in home.get('rooms', []):
-                    if r.get('id') == room_id and module_id in r.get('module_ids', []):
-                        thermostat_room = room
-                        break
-                    if thermostat_room:
-                        break
-                if thermostat_room:
-                    break
-            
-            # Si pas de room trouvée, utiliser la première room (fallback)
-            if not thermostat_room and rooms:
-                thermostat_room = rooms[0]
-            
-            if thermostat_room:
-                # Obtenir le nom du module depuis homes_data
-                module_name = thermostat_module.get('name', 'Thermostat')
-                for mod in home.get('modules', []):
-                    if mod.get('id') == module_id:
-                        module_name = mod.get('name', 'Thermostat')
-                        break
-                
-                return {
-                    'home_id': home_id,
-                    'room_id': thermostat_room.get('id'),
-                    'module_id': module_id,
-                    'module_name': module_name,
-                    'current_temp': thermostat_room.get('therm_measured_temperature'),
-                    'target_temp': thermostat_room.get('therm_setpoint_temperature'),
-                    'setpoint_mode': thermostat_room.get('therm_setpoint_mode'),
-                    'boiler_status': thermostat_module.get('boiler_status', False),
-                    'heating_power_request': thermostat_room.get('heating_power_request', 0),
-                }
+            status = topology.thermostat_status(home_id, home_status)
+            if status:
+                return status
         
         # Si debug, afficher la structure complète pour diagnostic
         if debug:
-            import json
             print("\nDEBUG - Structure complète des données:", file=sys.stderr)
-            print(json.dumps(homes_data, indent=2)[:5000], file=sys.stderr)
+            print(json.dumps(topology.homes_data, indent=2)[:5000], file=sys.stderr)
         
         raise ValueError("Aucun thermostat trouvé dans vos maisons Netatmo")
     
+    def get_all_status(self, max_workers: Optional[int] = None, refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Récupère le statut de toutes les pièces et de tous les modules de chauffage du compte.
+        
+        Les appels /api/homestatus sont faits en parallèle sur un pool de threads borné.
+        Une maison en erreur produit une ligne avec une clé 'error' sans bloquer les autres.
+        
+        Args:
+            max_workers: Nombre d'appels simultanés (défaut: config.max_concurrency)
+            refresh: Ignorer le statut en cache
+        
+        Returns:
+            Liste de lignes à plat (une par pièce et module de chauffage)
+        """
+        topology = self.get_topology()
+        if not topology.homes:
+            raise ValueError("Aucune maison trouvée dans votre compte Netatmo")
+        
+        # Obtenir le token avant de paralléliser pour n'avoir qu'un seul appel OAuth
+        self._get_access_token()
+        
+        home_ids = list(topology.homes)
+        workers = max(1, min(max_workers or self.config.max_concurrency, len(home_ids)))
+        
+        def fetch(home_id: str) -> Any:
+            try:
+                return self.get_home_status(home_id, refresh=refresh)
+            except Exception as e:
+                return e
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            statuses = list(executor.map(fetch, home_ids))
+        
+        rows = []
+        for home_id, home_status in zip(home_ids, statuses):
+            if isinstance(home_status, Exception):
+                rows.append({
+                    'home_id': home_id,
+                    'home_name': topology.homes[home_id].get('name'),
+                    'error': str(home_status),
+                })
+                continue
+            rows.extend(topology.status_rows(home_id, home_status))
+        return rows
+    
     def set_thermpoint(self, home_id: str, room_id: str, mode: str, 
-                       temperature: Optional[float] = None) -> Dict[str, Any]:
+                       temperature: Optional[float] = None, force: bool = False) -> Dict[str, Any]:
         """
         Définit le point de consigne du thermostat.
         
@@ -364,7 +775,18 @@ class NetatmoClient:
             room_id: ID de la pièce
             mode: Mode ('manual', 'away', 'hg' pour hors gel, 'program', 'off')
             temperature: Température cible (requis pour mode 'manual')
+            force: Envoyer la consigne même si l'état en cache est déjà celui demandé
+        
+        Returns:
+            Réponse de l'API, ou {'status': 'ok', 'unchanged': True} si la consigne
+            était déjà en place (aucun appel)
         """
+        max_age = self._max_age()
+        if not force and max_age != 0:
+            room_state = self.status_cache.room_state(home_id, room_id, max_age)
+            if room_state is not None and same_setpoint(room_state, mode, temperature):
+                return {'status': 'ok', 'unchanged': True}
+        
         data = {
             'home_id': home_id,
             'room_id': room_id,
@@ -374,31 +796,114 @@ class NetatmoClient:
         if mode == 'manual' and temperature is not None:
             data['temp'] = temperature
         
-        return self._request('POST', '/api/setthermpoint', json=data)
+        response = self._request('POST', '/api/setthermpoint', json=data)
+        # Write-through : le statut en cache reflète la consigne acceptée par l'API
+        self.status_cache.apply_setpoints(home_id, [{
+            'id': room_id,
+            'therm_setpoint_mode': 'schedule' if mode == 'program' else mode,
+            'therm_setpoint_temperature': data.get('temp'),
+        }])
+        return response
     
-    def set_temperature(self, temperature: float) -> Dict[str, Any]:
+    def set_temperature(self, temperature: float, force: bool = False) -> Dict[str, Any]:
         """Définit la température cible en mode manuel."""
-        status = self.get_thermostat_status()
+        location = self.get_thermostat_location()
         return self.set_thermpoint(
-            status['home_id'],
-            status['room_id'],
+            location['home_id'],
+            location['room_id'],
             'manual',
-            temperature
+            temperature,
+            force=force
         )
     
-    def set_frost_guard(self, enabled: bool) -> Dict[str, Any]:
+    def set_frost_guard(self, enabled: bool, force: bool = False) -> Dict[str, Any]:
         """Active ou désactive le mode hors gel."""
-        status = self.get_thermostat_status()
+        location = self.get_thermostat_location()
         mode = 'hg' if enabled else 'program'
         return self.set_thermpoint(
-            status['home_id'],
-            status['room_id'],
-            mode
+            location['home_id'],
+            location['room_id'],
+            mode,
+            force=force
         )
     
+    def set_state(self, home_id: str, rooms: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Modifie plusieurs pièces d'une maison en un seul appel /api/setstate.
+        
+        Args:
+            home_id: ID de la maison
+            rooms: Pièces à modifier ({'id', 'therm_setpoint_mode', 'therm_setpoint_temperature'})
+        """
+        response = self._request('POST', '/api/setstate', json={'home': {'id': home_id, 'rooms': rooms}})
+        # Write-through, sauf pour les pièces refusées par l'API
+        body = response.get('body') if isinstance(response.get('body'), dict) else {}
+        rejected = {error.get('id') for error in body.get('errors', [])}
+        self.status_cache.apply_setpoints(home_id, [room for room in rooms if room['id'] not in rejected])
+        return response
+    
+    def set_room_setpoints(self, setpoints: Dict[str, Any], force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Applique des consignes à plusieurs pièces, avec un seul appel par maison.
+        
+        Les pièces sont résolues (nom ou ID) depuis la topologie en cache et
+        toutes les consignes sont validées avant le premier appel.
+        
+        Args:
+            setpoints: {nom ou ID de pièce: température en °C ou mode}
+            force: Envoyer aussi les consignes identiques à l'état en cache
+        
+        Returns:
+            Un résultat par pièce (home_id, room_id, room_name, consigne, status, error) ;
+            status vaut 'unchanged' pour une consigne déjà en place (non envoyée)
+        """
+        topology = self.get_topology()
+        # {home_id: {room_id: consigne}} : une pièce citée deux fois garde sa dernière consigne
+        rooms_by_home: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        resolved: Dict[str, Dict[str, Any]] = {}
+        for reference, value in setpoints.items():
+            room = topology.find_room(str(reference))
+            state = room_setpoint(value)
+            rooms_by_home.setdefault(room['home_id'], {})[room['room_id']] = dict(state, id=room['room_id'])
+            resolved[room['room_id']] = dict(room, **state)
+        results = list(resolved.values())
+        
+        errors: Dict[str, str] = {}
+        unchanged = set()
+        max_age = self._max_age()
+        for home_id, home_rooms in rooms_by_home.items():
+            rooms = []
+            for room in home_rooms.values():
+                state = None if force or max_age == 0 else self.status_cache.room_state(home_id, room['id'], max_age)
+                if state is not None and same_setpoint(
+                        state, room['therm_setpoint_mode'], room.get('therm_setpoint_temperature')):
+                    unchanged.add(room['id'])
+                else:
+                    rooms.append(room)
+            if not rooms:
+                continue
+            try:
+                response = self.set_state(home_id, rooms)
+            except ValueError as e:
+                errors.update({room['id']: str(e) for room in rooms})
+                continue
+            # Erreurs par pièce : {"body": {"errors": [{"code": ..., "id": room_id}]}}
+            body = response.get('body') if isinstance(response.get('body'), dict) else {}
+            for error in body.get('errors', []):
+                errors[error.get('id')] = f"Erreur API (code {error.get('code')})"
+        
+        for result in results:
+            error = errors.get(result['room_id'])
+            if error:
+                result['status'] = 'error'
+            else:
+                result['status'] = 'unchanged' if result['room_id'] in unchanged else 'success'
+            result['error'] = error
+        return results
+    
     def get_measure(self, device_id: str, module_id: str, scale: str = '1day',
                    types: List[str] = None, start_date: Optional[int] = None,
-                   end_date: Optional[int] = None) -> Dict[str, Any]:
+                   end_date: Optional[int] = None, cache: bool = True) -> Dict[str, Any]:
         """
         Récupère les mesures historiques.
         
@@ -409,6 +914,7 @@ class NetatmoClient:
             types: Types de mesures (ex: ['Temperature'])
             start_date: Timestamp de début (optionnel)
             end_date: Timestamp de fin (optionnel)
+            cache: Passer par le cache des réponses (une fenêtre close n'expire jamais)
         """
         if types is None:
             types = ['Temperature']
@@ -425,26 +931,174 @@ class NetatmoClient:
         if end_date:
             params['date_end'] = end_date
         
-        return self._request('GET', '/api/getmeasure', params=params)
+        return self._request('GET', '/api/getmeasure', params=params, cache=cache)
+    
+    def get_measure_range(self, device_id: str, module_id: str, scale: str = '1day',
+                          types: List[str] = None, start_date: Optional[int] = None,
+                          end_date: Optional[int] = None,
+                          max_workers: Optional[int] = None, cache: bool = True) -> Dict[str, Any]:
+        """
+        Récupère les mesures d'une plage complète, sans troncature à 1024 points.
+        
+        La plage est découpée en fenêtres de 1024 points au plus, récupérées en
+        parallèle (au plus max_workers appels simultanés), puis fusionnées dans
+        l'ordre chronologique sans doublons.
+        
+        Args:
+            device_id: ID du device
+            module_id: ID du module
+            scale: Échelle de temps ('max', '30min', '1hour', '3hours', '1day', '1week', '1month')
+            types: Types de mesures (ex: ['Temperature'])
+            start_date: Timestamp de début (défaut: 1024 points avant end_date)
+            end_date: Timestamp de fin (défaut: maintenant)
+            max_workers: Nombre d'appels simultanés (défaut: config.max_concurrency)
+            cache: Passer par le cache des réponses
+        """
+        end_date = end_date or int(time.time())
+        if not start_date:
+            return self.get_measure(device_id, module_id, scale, types, None, end_date, cache)
+        
+        windows = split_time_range(start_date, end_date, scale)
+        if len(windows) == 1:
+            return self.get_measure(device_id, module_id, scale, types, start_date, end_date, cache)
+        
+        # Obtenir le token avant de paralléliser pour n'avoir qu'un seul appel OAuth
+        self._get_access_token()
+        
+        def fetch(window):
+            return self.get_measure(device_id, module_id, scale, types, window[0], window[1], cache)
+        
+        workers = max(1, min(max_workers or self.config.max_concurrency, len(windows)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(fetch, windows))
+        
+        return merge_measure_responses(responses)
+    
+    def get_room_measure(self, home_id: str, room_id: str, scale: str = '1hour',
+                         types: List[str] = None, start_date: Optional[int] = None,
+                         end_date: Optional[int] = None, cache: bool = True) -> Dict[str, Any]:
+        """
+        Récupère les mesures historiques d'une pièce (/api/getroommeasure).
+        
+        La plage est découpée en fenêtres de 1024 points au plus, récupérées à la
+        suite puis fusionnées (les pièces, elles, sont récupérées en parallèle par
+        get_rooms_history).
+        
+        Args:
+            home_id: ID de la maison
+            room_id: ID de la pièce
+            scale: Échelle de temps ('max', '30min', '1hour', '3hours', '1day', '1week', '1month')
+            types: Types de mesures (ex: ['temperature'])
+            start_date: Timestamp de début (optionnel)
+            end_date: Timestamp de fin (optionnel)
+            cache: Passer par le cache des réponses (une fenêtre close n'expire jamais)
+        """
+        params = {
+            'home_id': home_id,
+            'room_id': room_id,
+            'scale': scale,
+            'type': ','.join(types or ['temperature'])
+        }
+        if not start_date:
+            if end_date:
+                params['date_end'] = end_date
+            return self._request('GET', '/api/getroommeasure', params=params, cache=cache)
+        
+        end_date = end_date or int(time.time())
+        responses = [
+            self._request('GET', '/api/getroommeasure', params=dict(params, date_begin=begin, date_end=end),
+                          cache=cache)
+            for begin, end in split_time_range(start_date, end_date, scale)
+        ]
+        return responses[0] if len(responses) == 1 else merge_measure_responses(responses)
+    
+    def _get_measure_store(self) -> 'MeasureStore':
+        """Ouvre le stockage local des mesures au premier usage."""
+        if self.measure_store is None:
+            from measure_store import MeasureStore
+            self.measure_store = MeasureStore(self.config.measure_store_path)
+        return self.measure_store
     
-    def get_thermostat_history(self, days: int = 7, debug: bool = False) -> Dict[str, Any]:
-        """Récupère l'historique des températures."""
-        status = self.get_thermostat_status()
-        home_id = status['home_id']
-        module_id = status['module_id']
+    def sync_measures(self, location: Dict[str, Any], types: List[str], scale: str,
+                      start_date: int, end_date: int, offline: bool = False) -> 'MeasureStore':
+        """
+        Synchronise le stockage local des mesures et le retourne.
         
-        # Obtenir les informations du module pour trouver le bridge
-        homes_data = self.get_homes_data()
-        homes = homes_data.get('body', {}).get('homes', [])
+        Seules les plages absentes du stockage sont téléchargées. Si l'API est
+        indisponible, les mesures déjà stockées restent utilisables.
         
-        bridge_id = None
-        for home in homes:
-            if home.get('id') == home_id:
-                for module in home.get('modules', []):
-                    if module.get('id') == module_id:
-                        bridge_id = module.get('bridge')
-                        break
-                break
+        Args:
+            location: Emplacement du module (voir get_thermostat_location)
+            types: Types de mesures
+            scale: Échelle de temps
+            start_date: Timestamp de début
+            end_date: Timestamp de fin
+            offline: Ne pas interroger l'API, utiliser uniquement le stockage local
+        """
+        store = self._get_measure_store()
+        home_id = location['home_id']
+        module_id = location['module_id']
+        
+        if not offline:
+            # Les mesures téléchargées sont conservées par le stockage local, pas par le cache des réponses
+            def fetch(fetch_types: List[str], begin: int, end: int) -> Dict[str, Any]:
+                return self.get_measure_range(location['bridge_id'], module_id, scale, fetch_types, begin, end,
+                                              cache=False)
+            
+            try:
+                store.sync(home_id, module_id, types, scale, start_date, end_date, fetch)
+            except (ValueError, OSError) as e:
+                if not store.coverage(home_id, module_id, types[0], scale):
+                    raise
+                print(f"⚠ API indisponible, utilisation des mesures locales: {e}", file=sys.stderr)
+        
+        return store
+    
+    def get_stored_measures(self, location: Dict[str, Any], types: List[str], scale: str,
+                            start_date: int, end_date: int, offline: bool = False) -> Dict[str, Any]:
+        """Lit des mesures (au format getmeasure) depuis le stockage local après l'avoir synchronisé."""
+        store = self.sync_measures(location, types, scale, start_date, end_date, offline)
+        return store.read(location['home_id'], location['module_id'], types, scale, start_date, end_date)
+    
+    def get_thermostat_history(self, days: int = 7, debug: bool = False,
+                               scale: str = '1hour', use_store: bool = True,
+                               offline: bool = False) -> TimeSeries:
+        """
+        Récupère l'historique des températures sous forme de TimeSeries compacte.
+        
+        Args:
+            days: Nombre de jours
+            debug: Afficher la réponse brute
+            scale: Échelle de temps ('max', '30min', '1hour', ...)
+            use_store: Passer par le stockage local synchronisé (sinon appel direct à l'API)
+            offline: Lire uniquement le stockage local, sans appel à l'API
+        """
+        return self.get_thermostat_measures(['Temperature'], days, debug, scale, use_store, offline)['Temperature']
+    
+    def get_thermostat_measures(self, types: List[str], days: int = 7, debug: bool = False,
+                                scale: str = '1hour', use_store: bool = True,
+                                offline: bool = False) -> Dict[str, TimeSeries]:
+        """
+        Récupère plusieurs types de mesures du thermostat, une TimeSeries par type.
+        
+        Tous les types sont demandés dans le même appel getmeasure (par fenêtre de
+        1024 points) : température, consigne et durées de chauffe coûtent une
+        seule requête au lieu d'une par type.
+        
+        Args:
+            types: Types de mesures (voir measures.THERMOSTAT_TYPES)
+            days: Nombre de jours
+            debug: Afficher la réponse brute
+            scale: Échelle de temps ('max', '30min', '1hour', ...)
+            use_store: Passer par le stockage local synchronisé (sinon appel direct à l'API)
+            offline: Lire uniquement le stockage local, sans appel à l'API
+        """
+        if scale not in SCALE_SECONDS:
+            raise ValueError(f"Échelle inconnue: {scale} (valeurs possibles: {', '.join(SCALE_SECONDS)})")
+        # Le bridge est résolu depuis la topologie en cache, sans appel à homestatus
+        location = self.get_thermostat_location()
+        module_id = location['module_id']
+        bridge_id = location['bridge_id']
         
         if not bridge_id:
             raise ValueError("Bridge ID non trouvé pour le thermostat")
@@ -452,59 +1106,183 @@ class NetatmoClient:
         end_date = int(time.time())
         start_date = end_date - (days * 24 * 3600)
         
-        # Pour getmeasure avec un thermostat bridgé:
-        # - device_id = bridge (NAPlug)
-        # - module_id = module thermostat (NATherm1)
-        result = self.get_measure(
-            bridge_id,  # Le bridge (NAPlug) comme device_id
-            module_id,  # Le thermostat comme module_id
-            scale='1hour',
-            types=['Temperature'],
-            start_date=start_date,
-            end_date=end_date
-        )
+        if use_store:
+            store = self.sync_measures(location, types, scale, start_date, end_date, offline)
+            if len(types) == 1:
+                columns = {types[0]: store.read_series(location['home_id'], module_id, types[0], scale,
+                                                       start_date, end_date)}
+            else:
+                body = store.read(location['home_id'], module_id, types, scale, start_date, end_date)['body']
+                columns = TimeSeries.columns_from_body(body, types)
+        else:
+            # Pour getmeasure avec un thermostat bridgé:
+            # - device_id = bridge (NAPlug)
+            # - module_id = module thermostat (NATherm1)
+            # La plage est découpée si elle dépasse 1024 points à cette échelle
+            result = self.get_measure_range(
+                bridge_id,  # Le bridge (NAPlug) comme device_id
+                module_id,  # Le thermostat comme module_id
+                scale=scale,
+                types=types,
+                start_date=start_date,
+                end_date=end_date
+            )
+            columns = TimeSeries.columns_from_body(result.get('body'), types)
         
         if debug:
-            import json
             print("\nDEBUG - getmeasure response structure:", file=sys.stderr)
-            print(json.dumps(result, indent=2)[:3000], file=sys.stderr)
-        
-        return result
-    
-    def get_statistics(self, days: int = 7, debug: bool = False) -> Dict[str, Any]:
-        """Calcule les statistiques de température."""
-        history = self.get_thermostat_history(days, debug=debug)
-        
-        # Parser les données de mesure
-        # La structure peut être différente selon l'API
-        temperatures = []
-        
-        # Structure 1: body est une liste
-        if 'body' in history:
-            body = history['body']
-            if isinstance(body, list):
-                for entry in body:
-                    if 'value' in entry and entry['value']:
-                        # Les valeurs sont stockées comme [[temp1], [temp2], ...]
-                        # Chaque élément de value est une liste avec une seule température
-                        for value_set in entry['value']:
-                            if isinstance(value_set, list) and len(value_set) > 0:
-                                temp = value_set[0]  # La température est le premier élément
-                                if temp is not None:
-                                    temperatures.append(temp)
-            elif isinstance(body, dict):
-                # Structure alternative
-                for key, entry in body.items():
-                    if isinstance(entry, dict) and 'value' in entry:
-                        values = entry['value']
-                        if isinstance(values, list):
-                            for value_set in values:
-                                if isinstance(value_set, list) and len(value_set) > 0:
-                                    temp = value_set[0]
-                                    if temp is not None:
-                                        temperatures.append(temp)
-        
-        if not temperatures:
+            for measure_type, series in columns.items():
+                print(f"{measure_type}: {json.dumps(series.to_dict(), indent=2)[:3000]}", file=sys.stderr)
+        
+        return columns
+    
+    def resolve_rooms(self, rooms: Optional[List[str]] = None, home: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Résout les pièces demandées depuis la topologie en cache.
+        
+        Args:
+            rooms: Noms ou IDs des pièces ; None ou ['all'] : toutes les pièces de la maison
+            home: Nom ou ID de la maison (défaut: maison du thermostat, sinon la première)
+        
+        Returns:
+            Pièces (home_id, home_name, room_id, room_name), dans l'ordre demandé
+        """
+        topology = self.get_topology()
+        home_id = topology.find_home(home)
+        if not rooms or [room.strip().lower() for room in rooms] == ['all']:
+            located = topology.home_rooms(home_id)
+            if not located:
+                raise ValueError(f"Aucune pièce dans la maison {topology.homes[home_id].get('name') or home_id}")
+            return located
+        located = []
+        for reference in rooms:
+            room = topology.find_room(reference, home_id)
+            if all(room['room_id'] != other['room_id'] for other in located):
+                located.append(room)
+        return located
+    
+    def get_rooms_history(self, rooms: List[Dict[str, Any]], days: int = 7, scale: str = '1hour',
+                          measure_type: str = 'temperature', use_store: bool = True, offline: bool = False,
+                          max_workers: Optional[int] = None) -> Tuple[Dict[str, TimeSeries], Dict[str, str]]:
+        """
+        Récupère l'historique de plusieurs pièces via /api/getroommeasure.
+        
+        Les pièces sont récupérées en parallèle sur un pool de threads borné ; seules
+        les plages absentes du stockage local sont téléchargées (les pièces y sont
+        rangées sous la clé "room:<room_id>"). Les écritures dans le stockage sont
+        faites ensuite, dans le thread appelant. Une pièce en erreur n'interrompt
+        pas les autres.
+        
+        Args:
+            rooms: Pièces (voir resolve_rooms)
+            days: Nombre de jours
+            scale: Échelle de temps ('max', '30min', '1hour', ...)
+            measure_type: Type de mesure de getroommeasure ('temperature', 'sp_temperature', ...)
+            use_store: Passer par le stockage local synchronisé (sinon appel direct à l'API)
+            offline: Lire uniquement le stockage local, sans appel à l'API
+            max_workers: Nombre d'appels simultanés (défaut: config.max_concurrency)
+        
+        Returns:
+            (séries par room_id dans l'ordre de `rooms`, erreurs par room_id)
+        """
+        if scale not in SCALE_SECONDS:
+            raise ValueError(f"Échelle inconnue: {scale} (valeurs possibles: {', '.join(SCALE_SECONDS)})")
+        end_date = int(time.time())
+        start_date = end_date - (days * 24 * 3600)
+        types = [measure_type]
+        store = self._get_measure_store() if use_store else None
+        
+        # Plages à télécharger par pièce : (pièce, début, fin)
+        tasks = []
+        if not offline:
+            for room in rooms:
+                ranges = (store.missing_ranges(room['home_id'], f"room:{room['room_id']}", types, scale,
+                                               start_date, end_date)
+                          if store else [(start_date, end_date)])
+                tasks.extend((room, begin, end) for begin, end in ranges)
+        
+        def fetch(task: Tuple[Dict[str, Any], int, int]) -> Any:
+            room, begin, end = task
+            try:
+                # Les mesures téléchargées sont conservées par le stockage local, pas par le cache des réponses
+                return self.get_room_measure(room['home_id'], room['room_id'], scale, types, begin, end,
+                                             cache=store is None)
+            except Exception as e:
+                return e
+        
+        responses: List[Any] = []
+        if tasks:
+            # Obtenir le token avant de paralléliser pour n'avoir qu'un seul appel OAuth
+            self._get_access_token()
+            workers = max(1, min(max_workers or self.config.max_concurrency, len(tasks)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                responses = list(executor.map(fetch, tasks))
+        
+        errors: Dict[str, str] = {}
+        fetched: Dict[str, List[Dict[str, Any]]] = {}
+        for (room, begin, end), response in zip(tasks, responses):
+            if isinstance(response, Exception):
+                errors.setdefault(room['room_id'], str(response) or response.__class__.__name__)
+            elif store:
+                store.insert(room['home_id'], f"room:{room['room_id']}", types, scale, response, begin, end)
+            else:
+                fetched.setdefault(room['room_id'], []).append(response)
+        
+        series: Dict[str, TimeSeries] = {}
+        for room in rooms:
+            room_id = room['room_id']
+            if store:
+                series[room_id] = store.read_series(room['home_id'], f"room:{room_id}", measure_type, scale,
+                                                    start_date, end_date)
+            elif room_id in fetched:
+                series[room_id] = TimeSeries.from_body(merge_measure_responses(fetched[room_id])['body'])
+            else:
+                series[room_id] = TimeSeries()
+        return series, errors
+    
+    def get_statistics(self, days: int = 7, debug: bool = False, scale: str = '1hour',
+                       use_store: bool = True, offline: bool = False,
+                       metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Calcule les statistiques de température.
+        
+        Args:
+            metrics: Métriques à calculer (voir stats_engine.METRICS), défaut: ['basic']
+        """
+        if metrics and set(metrics) & {'boiler', 'setpoint'}:
+            # Consigne et durées de chauffe demandées dans le même appel que la température
+            import stats_engine
+            columns = self.get_thermostat_measures(stats_engine.measure_types(metrics, scale), days, debug,
+                                                   scale, use_store, offline)
+            return stats_engine.compute_thermostat_metrics(columns, metrics, step=SCALE_SECONDS[scale])
+        
+        history = self.get_thermostat_history(days, debug=debug, scale=scale,
+                                              use_store=use_store, offline=offline)
+        if not metrics or list(metrics) == ['basic']:
+            return self.compute_statistics(history)
+        
+        # Import à la demande : NumPy n'est chargé que pour les métriques avancées
+        import stats_engine
+        return stats_engine.compute_statistics(history, metrics, step=SCALE_SECONDS[scale])
+    
+    @staticmethod
+    def compute_statistics(history: Any) -> Dict[str, Any]:
+        """Calcule moyenne, min et max d'une TimeSeries (ou d'une réponse /api/getmeasure)."""
+        points = history if isinstance(history, TimeSeries) else iter_measures(history.get('body'))
+        
+        # Un seul parcours en flux des points, sans liste intermédiaire
+        count = 0
+        total = 0.0
+        minimum = maximum = None
+        for _, temp in points:
+            count += 1
+            total += temp
+            if minimum is None or temp < minimum:
+                minimum = temp
+            if maximum is None or temp > maximum:
+                maximum = temp
+        
+        if not count:
             return {
                 'average': None,
                 'min': None,
@@ -513,9 +1291,9 @@ class NetatmoClient:
             }
         
         return {
-            'average': sum(temperatures) / len(temperatures),
-            'min': min(temperatures),
-            'max': max(temperatures),
-            'count': len(temperatures)
+            'average': total / count,
+            'min': minimum,
+            'max': maximum,
+            'count': count
         }
 
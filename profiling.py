@@ -0,0 +1,142 @@
+"""Mode --profile : profil CPU (cProfile) et mémoire (tracemalloc) d'une commande."""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, TextIO
+
+# Allocations sans intérêt pour l'utilisateur (machinerie d'import, tracemalloc lui-même)
+ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+)
+
+
+def _format_size(size: float) -> str:
+    if abs(size) < 1024:
+        return f"{size:.0f} o"
+    size /= 1024
+    for unit in ('Ko', 'Mo'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} Go"
+
+
+class CommandProfiler:
+    """
+    Profileur d'une commande : temps CPU par fonction et allocations mémoire.
+
+    cProfile ne suit que le thread qui l'active : un profileur est donc aussi
+    créé dans chaque thread démarré pendant la commande (fenêtres de mesures
+    téléchargées en parallèle), puis les statistiques sont fusionnées.
+    """
+
+    def __init__(self, limit: int = 25, output: Optional[str] = None):
+        """
+        Args:
+            limit: Nombre de fonctions et d'emplacements d'allocation affichés
+            output: Fichier où enregistrer les statistiques pstats (optionnel)
+        """
+        self.limit = limit
+        self.output = output
+        self.profile = cProfile.Profile()
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self.peak_memory = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._tracemalloc_was_tracing = False
+
+    def _profile_thread(self, frame, event, arg) -> None:
+        """Crochet threading.setprofile : active un profileur dans le nouveau thread."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Profileur déjà actif pour tous les threads (Python 3.12+)
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self._thread_profiles.append(profile)
+
+    def start(self) -> None:
+        self._tracemalloc_was_tracing = tracemalloc.is_tracing()
+        if not self._tracemalloc_was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        threading.setprofile(self._profile_thread)
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+        threading.setprofile(None)
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        # Les données de la commande (mesures, séries) sont encore en mémoire
+        self.snapshot = tracemalloc.take_snapshot().filter_traces(ALLOCATION_FILTERS)
+        if not self._tracemalloc_was_tracing:
+            tracemalloc.stop()
+
+    def stats(self) -> pstats.Stats:
+        """Statistiques CPU fusionnées (thread principal et threads de la commande)."""
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        return stats
+
+    def save(self) -> None:
+        """Enregistre les statistiques au format pstats (python -m pstats FICHIER)."""
+        if self.output:
+            self.stats().dump_stats(self.output)
+
+    def format(self) -> str:
+        """Rapport : fonctions les plus coûteuses puis principales allocations."""
+        stream = io.StringIO()
+        stats = self.stats()
+        stats.stream = stream
+        stats.strip_dirs().sort_stats('tottime', 'cumulative').print_stats(self.limit)
+        cpu_report = stream.getvalue().strip('\n')
+
+        lines = ['', f"Profil CPU ({self.limit} fonctions les plus coûteuses en temps propre) :", cpu_report, '']
+        current = sum(stat.size for stat in self.snapshot.statistics('filename')) if self.snapshot else 0
+        lines.append(
+            f"Mémoire (tracemalloc) : pic {_format_size(self.peak_memory)}, "
+            f"{_format_size(current)} encore alloués en fin de commande"
+        )
+        if self.snapshot:
+            lines.append("Principales allocations encore en mémoire :")
+            for stat in self.snapshot.statistics('lineno')[:min(self.limit, 10)]:
+                frame = stat.traceback[0]
+                lines.append(f"  {_format_size(stat.size):>10}  {stat.count:>7} blocs  {frame.filename}:{frame.lineno}")
+        if self.output:
+            lines.append(f"✓ Statistiques pstats enregistrées dans {self.output} (python -m pstats {self.output})")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def profile_command(enabled: bool = True, output: Optional[str] = None, limit: int = 25,
+                    stream: Optional[TextIO] = None) -> Iterator[Optional[CommandProfiler]]:
+    """
+    Profile une commande et affiche le rapport à la fin (même en cas d'erreur).
+
+    Args:
+        enabled: False pour exécuter la commande sans profilage
+        output: Fichier pstats à écrire (optionnel)
+        limit: Nombre de fonctions affichées
+        stream: Flux du rapport (défaut: sys.stderr au moment de l'affichage)
+    """
+    if not enabled:
+        yield None
+        return
+    profiler = CommandProfiler(limit, output)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.save()
+        print(profiler.format(), file=stream or sys.stderr)
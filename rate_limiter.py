@@ -0,0 +1,102 @@
+"""Limiteur de débit (token bucket) partagé entre processus pour respecter les quotas Netatmo."""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from token_store import atomic_write_json, file_lock
+
+# Un seau : (nombre de requêtes, période en secondes)
+Bucket = Tuple[int, float]
+
+
+class RateLimiter:
+    """
+    Seaux à jetons (token bucket) dont l'état est partagé par un fichier JSON.
+
+    Chaque requête réserve un jeton dans chaque seau sous verrou fichier. Un
+    seau vide passe en négatif : la requête n'échoue pas, elle reçoit un
+    créneau après celles déjà en attente (tous processus confondus) et attend
+    jusqu'à ce créneau. Le débit reste ainsi au plafond autorisé au lieu de
+    déclencher des erreurs 429 en rafale.
+    """
+
+    def __init__(self, path: Path, buckets: List[Bucket], client_id: Optional[str] = None):
+        """
+        Args:
+            path: Fichier d'état partagé
+            buckets: Seaux (capacité, période en secondes) ; une capacité <= 0 désactive le seau
+            client_id: Client ID de l'application (quotas distincts par application)
+        """
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.buckets = [(capacity, period) for capacity, period in buckets if capacity > 0 and period > 0]
+        self.client_id = client_id
+        # Sérialise les réservations des threads d'un même processus
+        self._lock = threading.Lock()
+        self.last_wait = 0.0
+        self.total_wait = 0.0
+        self.waited_requests = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.buckets)
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('client_id') not in (None, self.client_id):
+            return {}
+        return data.get('buckets', {})
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        """
+        Réserve un jeton dans chaque seau.
+
+        Returns:
+            Attente nécessaire en secondes avant d'envoyer la requête (0 si immédiat)
+        """
+        if not self.buckets:
+            return 0.0
+
+        with self._lock, file_lock(self.lock_path):
+            now = time.time() if now is None else now
+            state = self._load()
+            buckets = {}
+            wait = 0.0
+            for capacity, period in self.buckets:
+                key = f'{capacity}/{period:g}'
+                bucket = state.get(key) or {'tokens': capacity, 'updated': now}
+                rate = capacity / period
+                elapsed = max(0.0, now - bucket['updated'])
+                tokens = min(float(capacity), bucket['tokens'] + elapsed * rate) - 1
+                if tokens < 0:
+                    wait = max(wait, -tokens / rate)
+                buckets[key] = {'tokens': tokens, 'updated': now}
+            # Appelé avant chaque requête : pas de fsync, perdre l'état des seaux lors d'un crash est sans gravité
+            atomic_write_json(self.path, {'client_id': self.client_id, 'buckets': buckets}, durable=False)
+        return wait
+
+    def acquire(self) -> float:
+        """
+        Attend qu'un jeton soit disponible dans chaque seau.
+
+        Returns:
+            Temps d'attente en secondes
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        self.record(wait)
+        return wait
+
+    def record(self, wait: float) -> None:
+        """Comptabilise l'attente d'une requête (statistiques du client)."""
+        self.last_wait = wait
+        if wait > 0:
+            self.total_wait += wait
+            self.waited_requests += 1
@@ -0,0 +1,191 @@
+"""Classification des erreurs de l'API Netatmo, nouvelles tentatives avec backoff et disjoncteur."""
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Mapping, Optional
+
+# Codes d'erreur Netatmo ({"error": {"code": ..., "message": ...}})
+TOKEN_ERROR_CODES = (2, 3)         # access token invalide / expiré
+RATE_LIMIT_ERROR_CODES = (26,)     # quota d'utilisation atteint
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class NetatmoAPIError(ValueError):
+    """Erreur retournée par l'API Netatmo."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, error_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_code = error_code
+
+
+class TransientAPIError(NetatmoAPIError):
+    """Erreur temporaire (5xx, réseau) : la requête peut être retentée."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, error_code: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message, status_code, error_code)
+        self.retry_after = retry_after
+
+
+class RateLimitError(TransientAPIError):
+    """Quota de l'API dépassé (429 ou code Netatmo 26)."""
+
+
+class TokenExpiredError(NetatmoAPIError):
+    """Access token refusé (401, invalid_token, codes Netatmo 2 et 3)."""
+
+
+class CircuitOpenError(NetatmoAPIError):
+    """Disjoncteur ouvert : l'API est considérée indisponible, échec immédiat."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes d'attente."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def api_error_code(error_data: Any) -> Optional[int]:
+    """Extrait le code d'erreur Netatmo d'une réponse JSON décodée."""
+    if isinstance(error_data, dict) and isinstance(error_data.get('error'), dict):
+        code = error_data['error'].get('code')
+        return code if isinstance(code, int) else None
+    return None
+
+
+def classify_error(status_code: int, message: str, error_data: Any = None,
+                   headers: Optional[Mapping[str, str]] = None) -> NetatmoAPIError:
+    """
+    Construit l'exception correspondant à une réponse en erreur.
+
+    Args:
+        status_code: Code HTTP de la réponse
+        message: Message d'erreur lisible
+        error_data: Corps de la réponse décodé (JSON), si disponible
+        headers: En-têtes de la réponse (pour Retry-After)
+    """
+    error_code = api_error_code(error_data)
+    error_name = error_data.get('error') if isinstance(error_data, dict) else None
+    retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+
+    if status_code == 429 or error_code in RATE_LIMIT_ERROR_CODES:
+        return RateLimitError(message, status_code, error_code, retry_after)
+    if status_code == 401 or error_code in TOKEN_ERROR_CODES or error_name == 'invalid_token':
+        return TokenExpiredError(message, status_code, error_code)
+    if status_code in RETRYABLE_STATUS_CODES:
+        return TransientAPIError(message, status_code, error_code, retry_after)
+    return NetatmoAPIError(message, status_code, error_code)
+
+
+class RetryPolicy:
+    """Nouvelles tentatives avec backoff exponentiel et jitter complet."""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0):
+        """
+        Args:
+            max_retries: Nombre de nouvelles tentatives après le premier échec
+            base_delay: Délai de base du backoff en secondes
+            max_delay: Délai maximal ; un Retry-After plus long n'est pas attendu
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry: int, error: Optional[NetatmoAPIError] = None) -> Optional[float]:
+        """
+        Délai avant la nouvelle tentative numéro `retry` (0 pour la première).
+
+        Returns:
+            Délai en secondes, ou None s'il ne faut plus réessayer
+        """
+        if retry >= self.max_retries:
+            return None
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        # Jitter complet : les clients en échec ne réessaient pas tous au même instant
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur : après `failure_threshold` échecs temporaires consécutifs, les
+    appels échouent immédiatement pendant `reset_timeout` secondes, puis un
+    seul appel d'essai est autorisé (semi-ouvert) pour tester le rétablissement.
+
+    L'appel d'essai garde la main pendant ses propres tentatives (token
+    rafraîchi, nouvelles tentatives) et se termine toujours par end_trial :
+    s'il n'a enregistré ni succès ni échec, le disjoncteur se rouvre.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Échecs consécutifs avant ouverture (0 = désactivé)
+            reset_timeout: Durée d'ouverture en secondes avant un appel d'essai
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """
+        Lève CircuitOpenError si l'API est considérée indisponible.
+
+        Returns:
+            True si l'appel est l'appel d'essai (l'appelant doit ensuite appeler end_trial)
+        """
+        if self.failure_threshold <= 0:
+            return False
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                return True
+            raise CircuitOpenError(
+                f"API Netatmo indisponible ({self.failures} échecs consécutifs), "
+                f"nouvel essai dans {max(0.0, remaining):.0f}s"
+            )
+
+    def end_trial(self) -> None:
+        """Fin de l'appel d'essai : sans succès ni échec enregistré (exception non classée), il se rouvre."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        """L'API a répondu : le disjoncteur se referme."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        """Échec temporaire : ouvre le disjoncteur au-delà du seuil ou si l'essai a échoué."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
@@ -0,0 +1,168 @@
+"""Cache disque (SQLite) des réponses GET de l'API, avec une durée de validité par endpoint."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from measures import SCALE_SECONDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+DROP INDEX IF EXISTS responses_home;
+"""
+
+# Endpoints de mesures : une fenêtre close est mise en cache sans limite de durée
+MEASURE_ENDPOINTS = ('/api/getmeasure', '/api/getroommeasure')
+
+# Délai après la fin d'une fenêtre avant de la considérer close (mesures envoyées en retard
+# par les modules sans fil, agrégat du dernier pas encore en cours)
+CLOSED_WINDOW_DELAY = 3 * 3600
+
+# Durée de validité d'une fenêtre encore ouverte (mesures récentes)
+OPEN_WINDOW_TTL = 300
+
+
+class ResponseCache:
+    """
+    Réponses GET de l'API en cache sur disque, partagées entre les exécutions.
+
+    La durée de validité dépend de l'endpoint (TTL configuré) ; une fenêtre de
+    mesures close ne change plus et n'expire jamais. Au-delà de `max_bytes`,
+    les entrées les moins récemment utilisées sont supprimées (LRU). Le client
+    n'y met que les mesures : topologie et statut ont leur propre cache.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, ttls: Dict[str, float], client_id: Optional[str] = None):
+        """
+        Args:
+            path: Fichier de la base SQLite
+            max_bytes: Taille maximale des réponses en cache (0 = cache désactivé)
+            ttls: Durée de validité en secondes par endpoint (absent ou 0 = pas de cache)
+            client_id: Client ID de l'application (les entrées d'une autre application sont ignorées)
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.client_id = client_id
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        # Connexion partagée entre les threads (fenêtres de mesures en parallèle)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connexion à la base, ouverte au premier accès."""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _key(self, endpoint: str, params: Optional[Dict[str, Any]]) -> str:
+        return json.dumps([self.client_id, endpoint, params or {}], sort_keys=True, default=str)
+
+    def ttl(self, endpoint: str, params: Optional[Dict[str, Any]] = None, now: Optional[float] = None) -> Optional[float]:
+        """
+        Durée de validité d'une réponse.
+
+        Returns:
+            Secondes, 0 si la réponse ne doit pas être mise en cache, ou None si
+            elle ne change plus (fenêtre de mesures close)
+        """
+        params = params or {}
+        if endpoint in MEASURE_ENDPOINTS:
+            now = time.time() if now is None else now
+            date_end = params.get('date_end')
+            step = SCALE_SECONDS.get(params.get('scale'), 0)
+            if date_end is not None and int(date_end) + step + CLOSED_WINDOW_DELAY <= now:
+                return None
+            return min(OPEN_WINDOW_TTL, self.ttls.get(endpoint, OPEN_WINDOW_TTL))
+        return self.ttls.get(endpoint, 0)
+
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+            max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retourne la réponse en cache si elle est encore valide.
+
+        Args:
+            max_age: Âge maximal accepté en secondes (en plus de la durée de validité)
+        """
+        if not self.enabled or self.ttl(endpoint, params) == 0:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT stored_at, expires_at, body FROM responses WHERE key = ?', (self._key(endpoint, params),)
+            ).fetchone()
+            if (row is None or (row[1] is not None and row[1] <= now)
+                    or (max_age is not None and now - row[0] > max_age)):
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE responses SET last_used = ? WHERE key = ?',
+                                  (now, self._key(endpoint, params)))
+            self.hits += 1
+        return json.loads(row[2])
+
+    def put(self, endpoint: str, params: Optional[Dict[str, Any]], response: Dict[str, Any]) -> None:
+        """Enregistre une réponse selon la politique de son endpoint, puis applique la limite de taille."""
+        if not self.enabled:
+            return
+        now = time.time()
+        ttl = self.ttl(endpoint, params, now)
+        if ttl == 0:
+            return
+        body = json.dumps(response, separators=(',', ':'))
+        if len(body) > self.max_bytes:
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, stored_at, expires_at, last_used, size, body) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self._key(endpoint, params), endpoint, now,
+                 None if ttl is None else now + ttl, now, len(body), body)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de max_bytes."""
+        self.conn.execute('DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_used'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Nombre d'entrées, taille totale et taux de succès du processus."""
+        entries, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,89 @@
+"""Mutualisation des lectures identiques simultanées (single-flight), pour threads et asyncio."""
+import asyncio
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def request_key(method: str, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str, str]:
+    """Clé d'une requête : deux appels de même clé obtiennent la même réponse."""
+    return method, endpoint, json.dumps(params or {}, sort_keys=True, default=str)
+
+
+class _Flight:
+    """Appel en cours : les appelants suivants attendent son résultat."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Un seul appel en cours par clé : les threads qui demandent la même clé
+    pendant l'appel attendent et reçoivent le même résultat (ou la même
+    exception). Rien n'est conservé après la fin de l'appel : ce n'est pas un
+    cache, seulement la fusion des appels simultanés.
+
+    Le résultat est partagé entre les appelants et ne doit pas être modifié.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Exécute `fn` pour la clé, ou attend l'appel identique déjà en cours."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Version asyncio de SingleFlight : les coroutines qui demandent la même clé
+    attendent la même tâche. L'annulation d'un appelant n'annule pas l'appel
+    partagé tant que d'autres l'attendent.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, 'asyncio.Task[Any]'] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Exécute la coroutine `fn()` pour la clé, ou attend l'appel identique déjà en cours."""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            self.calls += 1
+            task.add_done_callback(lambda _, key=key: self._flights.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,309 @@
+"""Moteur de statistiques vectorisé (NumPy) pour les séries de mesures."""
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from measures import boiler_types, iter_measures
+from timeseries import TimeSeries
+
+# Métriques disponibles pour `stats --metrics`
+METRICS = ('basic', 'percentiles', 'std', 'rolling', 'time_weighted', 'degree_days', 'hourly_profile',
+           'boiler', 'setpoint')
+
+# Métriques qui demandent d'autres types de mesures que la température (même appel getmeasure)
+COLUMN_METRICS = ('boiler', 'setpoint')
+
+# Écart à la consigne toléré avant de compter un point comme « sous la consigne » (°C)
+SETPOINT_TOLERANCE = 0.5
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def measure_arrays(body: Any, column: int = 0, types_count: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convertit un body getmeasure en deux tableaux contigus (timestamps, valeurs).
+
+    Les séries (beg_time, step_time, value) sont converties par blocs, sans
+    boucle Python par point ; les points sans valeur sont retirés.
+
+    Args:
+        body: Champ 'body' d'une réponse getmeasure
+        column: Index du type de mesure à extraire
+        types_count: Nombre de types de mesures de la réponse
+    """
+    timestamps = []
+    values = []
+    if isinstance(body, list):
+        for entry in body:
+            if not isinstance(entry, dict) or not entry.get('value'):
+                continue
+            rows = entry['value']
+            try:
+                # Conversion directe en matrice (None -> NaN) quand toutes les lignes ont la même largeur
+                matrix = np.array(rows, dtype=np.float64)
+                column_values = matrix[:, column] if matrix.ndim == 2 and matrix.shape[1] > column else None
+            except (ValueError, TypeError):
+                column_values = None
+            if column_values is None:
+                column_values = np.array(
+                    [row[column] if len(row) > column and row[column] is not None else np.nan for row in rows],
+                    dtype=np.float64
+                )
+            step = entry.get('step_time', 0)
+            timestamps.append(entry.get('beg_time', 0) + np.arange(len(rows), dtype=np.int64) * step)
+            values.append(column_values)
+    else:
+        points = [(point[0], point[1 + column]) for point in iter_measures(body, types_count, skip_empty=False)]
+        if points:
+            timestamps.append(np.array([p[0] for p in points], dtype=np.int64))
+            values.append(np.array([np.nan if p[1] is None else p[1] for p in points], dtype=np.float64))
+
+    if not timestamps:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    ts = np.concatenate(timestamps)
+    vals = np.concatenate(values)
+    valid = ~np.isnan(vals)
+    ts, vals = ts[valid], vals[valid]
+    order = np.argsort(ts, kind='stable')
+    return ts[order], vals[order]
+
+
+def sample_weights(timestamps: np.ndarray, step: Optional[float] = None) -> np.ndarray:
+    """
+    Durée représentée par chaque point, en secondes.
+
+    Un point vaut jusqu'au point suivant, plafonné au pas nominal : un trou
+    dans la série (module hors ligne) ne donne pas un poids démesuré au
+    dernier point avant le trou.
+    """
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=np.float64)
+    if step is None:
+        step = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 3600.0
+    deltas = np.diff(timestamps).astype(np.float64)
+    return np.minimum(np.append(deltas, step), step)
+
+
+def rolling_mean(timestamps: np.ndarray, values: np.ndarray, window: float) -> np.ndarray:
+    """Moyenne glissante sur une fenêtre de `window` secondes se terminant à chaque point."""
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    starts = np.searchsorted(timestamps, timestamps - window, side='right')
+    ends = np.arange(1, len(values) + 1)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def local_offset(timestamp: float) -> int:
+    """Décalage (en secondes) du fuseau local par rapport à UTC à une date donnée."""
+    return time.localtime(timestamp).tm_gmtoff
+
+
+def local_offsets(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Décalage du fuseau local de chaque point : une série qui traverse un changement
+    d'heure (heure d'été / d'hiver) garde ses points dans la bonne heure et le bon jour.
+
+    Le décalage est calculé une fois par heure UTC de la série ; seuls les points
+    d'une heure qui contient un changement d'heure sont calculés un par un.
+    """
+    if not len(timestamps):
+        return np.empty(0, dtype=np.int64)
+    hours, inverse = np.unique(timestamps // 3600, return_inverse=True)
+    starts = np.array([local_offset(int(hour) * 3600) for hour in hours], dtype=np.int64)
+    ends = np.array([local_offset(int(hour) * 3600 + 3599) for hour in hours], dtype=np.int64)
+    offsets = starts[inverse]
+    for index in np.flatnonzero((starts != ends)[inverse]):
+        offsets[index] = local_offset(int(timestamps[index]))
+    return offsets
+
+
+def compute_metrics(timestamps: np.ndarray, values: np.ndarray, metrics: Iterable[str] = ('basic',),
+                    step: Optional[float] = None, base_temperature: float = 18.0,
+                    rolling_window: float = 86400) -> Dict[str, Any]:
+    """
+    Calcule les métriques demandées sur une série.
+
+    Args:
+        timestamps: Timestamps triés (int64)
+        values: Valeurs (float64), sans NaN
+        metrics: Métriques parmi METRICS
+        step: Pas nominal en secondes (défaut: pas médian de la série)
+        base_temperature: Température de base des degrés-jours de chauffage (°C)
+        rolling_window: Fenêtre de la moyenne glissante en secondes
+    """
+    metrics = set(metrics)
+    unknown = metrics - set(METRICS)
+    if unknown:
+        raise ValueError(f"Métriques inconnues: {', '.join(sorted(unknown))} (valeurs possibles: {', '.join(METRICS)})")
+    # Calculées par compute_thermostat_metrics, sur plusieurs colonnes
+    metrics -= set(COLUMN_METRICS)
+    # Moyenne, min et max sont toujours fournis (affichés par `stats` quelle que soit la sélection)
+    metrics.add('basic')
+
+    count = int(len(values))
+    result: Dict[str, Any] = {'count': count}
+    if not count:
+        if 'basic' in metrics:
+            result.update({'average': None, 'min': None, 'max': None})
+        return result
+
+    if 'basic' in metrics:
+        result['average'] = float(values.mean())
+        result['min'] = float(values.min())
+        result['max'] = float(values.max())
+
+    if 'std' in metrics:
+        result['std'] = float(values.std())
+
+    if 'percentiles' in metrics:
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            result[f'p{p}'] = float(value)
+
+    weights = None
+    if metrics & {'time_weighted', 'degree_days'}:
+        weights = sample_weights(timestamps, step)
+
+    if 'time_weighted' in metrics:
+        result['time_weighted_average'] = float(np.average(values, weights=weights)) if weights.sum() else None
+
+    if 'degree_days' in metrics:
+        # Intégrale de (base - T)+ sur le temps, exprimée en degrés-jours
+        deficit = np.clip(base_temperature - values, 0, None)
+        result['heating_degree_days'] = float((deficit * weights).sum() / 86400)
+        result['degree_days_base'] = base_temperature
+
+    if 'rolling' in metrics:
+        rolled = rolling_mean(timestamps, values, rolling_window)
+        result['rolling_mean'] = {
+            'window_hours': rolling_window / 3600,
+            'last': float(rolled[-1]),
+            'min': float(rolled.min()),
+            'max': float(rolled.max()),
+        }
+
+    if 'hourly_profile' in metrics:
+        hours = ((timestamps + local_offsets(timestamps)) // 3600) % 24
+        sums = np.bincount(hours, weights=values, minlength=24)
+        counts = np.bincount(hours, minlength=24)
+        result['hourly_profile'] = {
+            f'{hour:02d}h': (float(sums[hour] / counts[hour]) if counts[hour] else None)
+            for hour in range(24)
+        }
+
+    return result
+
+
+def measure_types(metrics: Iterable[str], scale: str) -> List[str]:
+    """Types getmeasure à demander (en un seul appel) pour calculer les métriques."""
+    metrics = set(metrics)
+    types = ['Temperature']
+    if 'setpoint' in metrics:
+        types.append('sp_temperature')
+    if 'boiler' in metrics:
+        types.extend(boiler_types(scale))
+    return types
+
+
+def boiler_metrics(timestamps: np.ndarray, on: np.ndarray, off: Optional[np.ndarray],
+                   step: float) -> Dict[str, Any]:
+    """
+    Fonctionnement de la chaudière à partir des durées de chauffe par point.
+
+    Args:
+        timestamps: Timestamps des points (int64)
+        on: Secondes de chauffe de chaque point
+        off: Secondes d'arrêt de chaque point (None : le point dure `step`)
+        step: Pas nominal en secondes
+    """
+    if not len(on):
+        return {'boiler_runtime_hours': None, 'boiler_duty_cycle': None, 'boiler_runtime_per_day': {}}
+    observed = float((on + off).sum()) if off is not None else float(len(on) * step)
+    runtime = float(on.sum())
+
+    # Jour local de chaque point, puis somme des durées par jour sans boucle Python par point
+    days = (timestamps + local_offsets(timestamps)) // 86400
+    first_day = int(days.min())
+    per_day = np.bincount(days - first_day, weights=on)
+    runtime_per_day = {
+        time.strftime('%Y-%m-%d', time.gmtime((first_day + index) * 86400)): round(float(seconds) / 3600, 2)
+        for index, seconds in enumerate(per_day)
+    }
+    return {
+        'boiler_runtime_hours': runtime / 3600,
+        'boiler_duty_cycle': runtime / observed if observed else None,
+        'boiler_runtime_per_day': runtime_per_day,
+        'boiler_average_hours_per_day': runtime / 3600 / len(runtime_per_day),
+    }
+
+
+def setpoint_metrics(timestamps: np.ndarray, temperatures: np.ndarray, setpoint_timestamps: np.ndarray,
+                     setpoints: np.ndarray, tolerance: float = SETPOINT_TOLERANCE) -> Dict[str, Any]:
+    """
+    Écart entre la température mesurée et la consigne, sur les points où les deux sont connues.
+
+    Un écart négatif signifie que la pièce est plus froide que la consigne.
+    """
+    _, temperature_index, setpoint_index = np.intersect1d(
+        timestamps, setpoint_timestamps, assume_unique=True, return_indices=True
+    )
+    if not len(temperature_index):
+        return {'setpoint_error': None}
+    errors = temperatures[temperature_index] - setpoints[setpoint_index]
+    return {
+        'setpoint_error': {
+            'mean': float(errors.mean()),
+            'mean_abs': float(np.abs(errors).mean()),
+            'rmse': float(np.sqrt((errors ** 2).mean())),
+            'below_share': float((errors < -tolerance).mean()),
+            'tolerance': tolerance,
+            'count': int(len(errors)),
+        }
+    }
+
+
+def compute_thermostat_metrics(columns: Dict[str, TimeSeries], metrics: Iterable[str] = ('basic',),
+                               step: Optional[float] = None, **options: Any) -> Dict[str, Any]:
+    """
+    Calcule les métriques demandées à partir des colonnes d'un appel getmeasure à plusieurs types.
+
+    Args:
+        columns: Une TimeSeries par type ('Temperature', 'sp_temperature', durées de chauffe)
+        metrics: Métriques parmi METRICS (boiler et setpoint utilisent les autres colonnes)
+        step: Pas nominal en secondes
+    """
+    metrics = set(metrics)
+    timestamps, values = columns['Temperature'].to_arrays()
+    result = compute_metrics(timestamps, values, metrics, step=step, **options)
+
+    if 'setpoint' in metrics:
+        if 'sp_temperature' not in columns:
+            raise ValueError("La métrique setpoint demande le type sp_temperature")
+        result.update(setpoint_metrics(timestamps, values, *columns['sp_temperature'].to_arrays()))
+
+    if 'boiler' in metrics:
+        on_type = next((t for t in ('sum_boiler_on', 'boileron') if t in columns), None)
+        if on_type is None:
+            raise ValueError("La métrique boiler demande le type sum_boiler_on (ou boileron)")
+        on_timestamps, on = columns[on_type].to_arrays()
+        off_type = 'sum_boiler_off' if on_type == 'sum_boiler_on' else 'boileroff'
+        off = None
+        if off_type in columns:
+            off_timestamps, off_values = columns[off_type].to_arrays()
+            if np.array_equal(on_timestamps, off_timestamps):
+                off = off_values
+        if step is None:
+            step = float(np.median(np.diff(on_timestamps))) if len(on_timestamps) > 1 else 3600.0
+        result.update(boiler_metrics(on_timestamps, on, off, step))
+
+    return result
+
+
+def compute_statistics(history: Any, metrics: Iterable[str] = ('basic',),
+                       step: Optional[float] = None, **options: Any) -> Dict[str, Any]:
+    """Calcule les métriques demandées sur une TimeSeries (ou une réponse getmeasure)."""
+    if isinstance(history, TimeSeries):
+        timestamps, values = history.to_arrays()
+    else:
+        timestamps, values = measure_arrays(history.get('body'))
+    return compute_metrics(timestamps, values, metrics, step=step, **options)
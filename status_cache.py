@@ -0,0 +1,213 @@
+"""Cache du statut des maisons (/api/homestatus), mis à jour par les écritures de consigne."""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from token_store import atomic_write_json, file_lock
+
+# Entrée du cache d'une maison
+Entry = Dict[str, Any]
+
+# Modes équivalents à « suivre le planning » (setthermpoint, setstate, homestatus)
+SCHEDULE_MODES = ('schedule', 'program', 'home')
+
+
+def same_setpoint(room_state: Dict[str, Any], mode: str, temperature: Optional[float] = None) -> bool:
+    """Indique si une pièce est déjà dans le mode (et à la température) demandé."""
+    current_mode = room_state.get('therm_setpoint_mode')
+    if mode in SCHEDULE_MODES:
+        return current_mode in SCHEDULE_MODES
+    if current_mode != mode:
+        return False
+    if mode == 'manual':
+        return temperature is not None and room_state.get('therm_setpoint_temperature') == temperature
+    return True
+
+
+class StatusCache:
+    """
+    Statut des maisons en mémoire et sur disque, avec une durée de réconciliation (TTL).
+
+    Une consigne envoyée avec succès est reportée dans le statut en cache
+    (write-through) : le `status` suivant n'a pas besoin du réseau, et une
+    consigne identique à l'état connu peut être ignorée. Passé le TTL, le
+    statut est relu depuis l'API pour prendre en compte les changements faits
+    ailleurs (application, planning).
+
+    Une entrée partielle (consigne écrite sans statut connu, ou mode dont la
+    température résultante est inconnue) sert à détecter les écritures
+    redondantes mais pas à afficher le statut.
+
+    La date de lecture du statut (`updated_at`) et la date d'écriture de chaque
+    consigne (`written`, par pièce) sont distinctes : une consigne n'allonge
+    pas la validité des températures mesurées ni de l'état des autres pièces.
+
+    Le fichier est partagé entre processus (CLI, démon) : chaque écriture relit
+    le fichier sous verrou et n'y modifie que la maison concernée, et une
+    lecture recharge le fichier s'il a changé.
+    """
+
+    def __init__(self, path: Path, ttl: float, client_id: Optional[str] = None):
+        """
+        Args:
+            path: Fichier du cache disque
+            ttl: Durée de réconciliation en secondes (0 = cache désactivé)
+            client_id: Client ID de l'application (un cache d'une autre application est ignoré)
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.client_id = client_id
+        self._homes: Optional[Dict[str, Entry]] = None
+        self._mtime: Optional[int] = None
+        # Les statuts de plusieurs maisons peuvent être récupérés en parallèle
+        self._lock = threading.RLock()
+
+    @property
+    def lock_path(self) -> Path:
+        """Fichier de verrou des écritures du cache."""
+        return self.path.with_suffix('.lock')
+
+    def _read(self) -> Dict[str, Entry]:
+        """Lit les entrées sur disque (dictionnaire vide si le fichier est absent ou invalide)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if self.client_id and data.get('client_id') not in (None, self.client_id):
+                raise ValueError("cache d'une autre application")
+            return dict(data.get('homes', {}))
+        except (OSError, ValueError, AttributeError, TypeError):
+            return {}
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> Dict[str, Entry]:
+        """Retourne les entrées, rechargées si un autre processus a réécrit le fichier."""
+        mtime = self._file_mtime()
+        if self._homes is None or mtime != self._mtime:
+            self._homes = self._read()
+            self._mtime = mtime
+        return self._homes
+
+    def _expired(self, entry: Entry, now: float) -> bool:
+        """Entrée dont le statut et toutes les consignes sont plus vieux que le TTL."""
+        latest = max([entry.get('updated_at', 0)] + list(entry.get('written', {}).values()))
+        return now - latest >= self.ttl
+
+    def _update(self, home_id: Optional[str], update: Callable[[Optional[Entry]], Optional[Entry]]) -> None:
+        """
+        Modifie l'entrée d'une maison (toutes si home_id est None) et l'écrit sur disque.
+
+        Le fichier est relu sous verrou juste avant l'écriture atomique : les
+        maisons et consignes écrites entre-temps par d'autres processus sont
+        conservées (best effort si le disque est indisponible).
+        """
+        with self._lock:
+            try:
+                with file_lock(self.lock_path):
+                    homes = self._read()
+                    self._apply(homes, home_id, update)
+                    atomic_write_json(self.path, {'client_id': self.client_id, 'homes': homes})
+                    self._mtime = self._file_mtime()
+            except OSError:
+                homes = dict(self._load())
+                self._apply(homes, home_id, update)
+            self._homes = homes
+
+    def _apply(self, homes: Dict[str, Entry], home_id: Optional[str],
+               update: Callable[[Optional[Entry]], Optional[Entry]]) -> None:
+        """Applique une modification aux entrées et retire les entrées expirées."""
+        for key in (list(homes) if home_id is None else [home_id]):
+            entry = update(homes.get(key))
+            if entry is None:
+                homes.pop(key, None)
+            else:
+                homes[key] = entry
+        now = time.time()
+        for key in [key for key, entry in homes.items() if self._expired(entry, now)]:
+            del homes[key]
+
+    def _fresh(self, timestamp: Optional[float], max_age: Optional[float]) -> bool:
+        """Indique si une date (lecture du statut ou écriture d'une consigne) est dans le TTL."""
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        return timestamp is not None and time.time() - timestamp < ttl
+
+    def get(self, home_id: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Retourne la réponse /api/homestatus en cache si elle est complète et lue récemment."""
+        if self.ttl <= 0:
+            return None
+        entry = self._load().get(home_id)
+        if not entry or entry.get('partial') or not self._fresh(entry.get('updated_at'), max_age):
+            return None
+        return entry['response']
+
+    def room_state(self, home_id: str, room_id: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retourne l'état connu d'une pièce (entrée partielle comprise), ou None.
+
+        L'état est valable si le statut a été lu récemment ou si une consigne a
+        été écrite récemment pour cette pièce.
+        """
+        if self.ttl <= 0:
+            return None
+        entry = self._load().get(home_id)
+        if not entry or not (self._fresh(entry.get('updated_at'), max_age)
+                             or self._fresh(entry.get('written', {}).get(room_id), max_age)):
+            return None
+        for room in entry['response'].get('body', {}).get('home', {}).get('rooms', []):
+            if room.get('id') == room_id:
+                return room
+        return None
+
+    def put(self, home_id: str, response: Dict[str, Any]) -> None:
+        """Enregistre une réponse /api/homestatus fraîche."""
+        if self.ttl <= 0:
+            return
+        entry = {'updated_at': time.time(), 'partial': False, 'response': response}
+        self._update(home_id, lambda _: entry)
+
+    def apply_setpoints(self, home_id: str, rooms: List[Dict[str, Any]]) -> None:
+        """
+        Reporte des consignes envoyées avec succès dans le statut en cache.
+
+        Args:
+            home_id: ID de la maison
+            rooms: Consignes ({'id', 'therm_setpoint_mode', 'therm_setpoint_temperature'})
+        """
+        if self.ttl <= 0:
+            return
+
+        def update(entry: Optional[Entry]) -> Entry:
+            if entry is None:
+                entry = {'partial': True, 'response': {'body': {'home': {'id': home_id, 'rooms': []}}}}
+            written = entry.setdefault('written', {})
+            now = time.time()
+            cached_rooms = entry['response'].setdefault('body', {}).setdefault('home', {}).setdefault('rooms', [])
+            by_id = {room.get('id'): room for room in cached_rooms}
+
+            for setpoint in rooms:
+                room = by_id.get(setpoint['id'])
+                if room is None:
+                    room = {'id': setpoint['id']}
+                    cached_rooms.append(room)
+                    by_id[room['id']] = room
+                room['therm_setpoint_mode'] = setpoint['therm_setpoint_mode']
+                if setpoint.get('therm_setpoint_temperature') is not None:
+                    room['therm_setpoint_temperature'] = setpoint['therm_setpoint_temperature']
+                else:
+                    # Température résultante inconnue (planning, hors gel...) : à relire depuis l'API
+                    room.pop('therm_setpoint_temperature', None)
+                    entry['partial'] = True
+                written[setpoint['id']] = now
+            return entry
+
+        self._update(home_id, update)
+
+    def invalidate(self, home_id: Optional[str] = None) -> None:
+        """Oublie le statut d'une maison (ou de toutes)."""
+        self._update(home_id, lambda _: None)
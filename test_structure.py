@@ -2,6 +2,7 @@
 """Script de test pour valider la structure de l'application."""
 import sys
 import importlib.util
+from contextlib import contextmanager
 
 def test_imports():
     """Teste que tous les modules peuvent être importés."""
@@ -54,7 +55,11 @@ def test_client_structure():
             'set_temperature',
             'set_frost_guard',
             'get_thermostat_history',
-            'get_statistics'
+            'get_statistics',
+            'close',
+            'get_all_status',
+            'set_state',
+            'set_room_setpoints',
         ]
         
         for method in required_methods:
@@ -74,13 +79,14 @@ def test_cli_commands():
     print("\nTest des commandes CLI...")
     try:
         from netatmo_cli import (
-            cmd_status, cmd_set, cmd_frost_guard, 
-            cmd_history, cmd_stats, format_output
+            cmd_status, cmd_set, cmd_set_many, cmd_frost_guard, 
+            cmd_history, cmd_stats, format_output, parse_room_setpoints
         )
         
         commands = [
             ('cmd_status', cmd_status),
             ('cmd_set', cmd_set),
+            ('cmd_set_many', cmd_set_many),
             ('cmd_frost_guard', cmd_frost_guard),
             ('cmd_history', cmd_history),
             ('cmd_stats', cmd_stats),
@@ -104,6 +110,11 @@ def test_cli_commands():
             print(f"  ✗ format_output ne fonctionne pas")
             return False
         
+        if parse_room_setpoints(['Salle de bain=19', 'Chambre=off']) != {'Salle de bain': '19', 'Chambre': 'off'}:
+            print("  ✗ parse_room_setpoints ne fonctionne pas")
+            return False
+        print("  ✓ parse_room_setpoints fonctionne")
+        
         return True
     except Exception as e:
         print(f"  ✗ Erreur: {e}")
@@ -111,6 +122,1229 @@ def test_cli_commands():
         traceback.print_exc()
         return False
 
+def test_async_client_structure():
+    """Teste que le client asyncio expose les mêmes méthodes que le client synchrone."""
+    print("\nTest de la structure du client asyncio...")
+    try:
+        import inspect
+        from async_client import AsyncNetatmoClient
+        
+        required_methods = [
+            'get_homes_data',
+            'get_home_status',
+            'get_homes_status',
+            'get_thermostat_status',
+            'set_thermpoint',
+            'set_temperature',
+            'set_frost_guard',
+            'get_measure',
+            'get_thermostat_history',
+            'get_statistics',
+        ]
+        
+        for method in required_methods:
+            if inspect.iscoroutinefunction(getattr(AsyncNetatmoClient, method, None)):
+                print(f"  ✓ Coroutine {method} présente")
+            else:
+                print(f"  ✗ Coroutine {method} manquante")
+                return False
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_token_store():
+    """Teste le cache persistant des tokens."""
+    print("\nTest du cache des tokens...")
+    try:
+        import tempfile
+        from pathlib import Path
+        from token_store import TokenStore
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TokenStore(Path(tmp) / 'token.json', client_id='app')
+            if store.load() is not None:
+                print("  ✗ Un cache absent devrait retourner None")
+                return False
+            
+            with store.lock():
+                store.save('access', 'refresh', 1234.0, ['read_thermostat'])
+            data = store.load()
+            if not data or data['access_token'] != 'access' or data['scope'] != ['read_thermostat']:
+                print(f"  ✗ Relecture du cache incorrecte: {data}")
+                return False
+            print("  ✓ Écriture/relecture du cache OK")
+            
+            if TokenStore(store.path, client_id='autre').load() is not None:
+                print("  ✗ Le cache d'une autre application ne doit pas être utilisé")
+                return False
+            print("  ✓ Cache isolé par client ID")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_topology():
+    """Teste les index de la topologie des maisons."""
+    print("\nTest de la topologie...")
+    try:
+        from topology import HomeTopology
+        
+        homes_data = {'body': {'homes': [{
+            'id': 'home1',
+            'rooms': [
+                {'id': 'r1', 'name': 'Salon', 'module_ids': ['therm1']},
+                {'id': 'r2', 'name': 'Chambre', 'module_ids': ['valve1']},
+            ],
+            'modules': [
+                {'id': 'plug1', 'type': 'NAPlug', 'name': 'Relais'},
+                {'id': 'therm1', 'type': 'NATherm1', 'name': 'Thermostat', 'bridge': 'plug1', 'room_id': 'r1'},
+                {'id': 'valve1', 'type': 'NRV', 'name': 'Vanne', 'bridge': 'plug1'},
+            ],
+        }]}}
+        topology = HomeTopology(homes_data)
+        
+        location = topology.find_thermostat()
+        expected = {'home_id': 'home1', 'room_id': 'r1', 'module_id': 'therm1', 'bridge_id': 'plug1'}
+        if any(location.get(key) != value for key, value in expected.items()):
+            print(f"  ✗ Emplacement du thermostat incorrect: {location}")
+            return False
+        print("  ✓ Thermostat résolu (maison, pièce, bridge)")
+        
+        if topology.module_room['valve1']['id'] != 'r2' or len(topology.room_modules['r2']) != 1:
+            print("  ✗ Lien pièce/module via module_ids non indexé")
+            return False
+        print("  ✓ Index pièce <-> modules OK")
+        
+        home_status = {'body': {'home': {
+            'rooms': [{'id': 'r1', 'therm_measured_temperature': 19.5}, {'id': 'r2'}],
+            'modules': [{'id': 'therm1', 'boiler_status': True}, {'id': 'valve1'}],
+        }}}
+        rows = topology.status_rows('home1', home_status)
+        if [row['module_id'] for row in rows] != ['therm1', 'valve1'] or not all(row['boiler_status'] for row in rows):
+            print(f"  ✗ Lignes de statut incorrectes: {rows}")
+            return False
+        print("  ✓ Statut à plat de toutes les pièces OK")
+        
+        if topology.find_room('salon')['room_id'] != 'r1' or topology.find_room('r2')['room_name'] != 'Chambre':
+            print("  ✗ Résolution des pièces par nom/ID incorrecte")
+            return False
+        try:
+            topology.find_room('Cuisine')
+            print("  ✗ Une pièce inconnue aurait dû être refusée")
+            return False
+        except ValueError:
+            pass
+        print("  ✓ Pièces résolues par nom ou ID")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_measures():
+    """Teste le découpage des plages et la fusion des réponses getmeasure."""
+    print("\nTest des mesures...")
+    try:
+        from measures import split_time_range, merge_measure_responses
+        
+        windows = split_time_range(0, 3 * 1024 * 3600, '1hour')
+        if len(windows) != 4 or windows[0] != (0, 1024 * 3600 - 1) or windows[1][0] != 1024 * 3600:
+            print(f"  ✗ Découpage incorrect: {windows}")
+            return False
+        print("  ✓ Découpage en fenêtres de 1024 points")
+        
+        merged = merge_measure_responses([
+            {'body': [{'beg_time': 0, 'step_time': 10, 'value': [[1], [2], [3]]}]},
+            {'body': [{'beg_time': 20, 'step_time': 10, 'value': [[3], [4]]}]},
+        ])
+        if merged['body'] != [{'beg_time': 0, 'step_time': 10, 'value': [[1], [2], [3], [4]]}]:
+            print(f"  ✗ Fusion incorrecte: {merged}")
+            return False
+        print("  ✓ Fusion triée et dédoublonnée")
+        
+        from measures import iter_measures
+        list_body = [{'beg_time': 0, 'step_time': 10, 'value': [[1, 2], [None, None], [3]]}]
+        dict_body = {'0': {'beg_time': 0, 'step_time': 10, 'value': [[1, 2], [None, None], [3]]}}
+        expected = [(0, 1, 2), (20, 3, None)]
+        if list(iter_measures(list_body, 2)) != expected or list(iter_measures(dict_body, 2)) != expected:
+            print("  ✗ Parsing des deux structures de body incorrect")
+            return False
+        print("  ✓ Parser commun aux structures liste et dict")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_measure_store():
+    """Teste la synchronisation incrémentale du stockage local des mesures."""
+    print("\nTest du stockage local des mesures...")
+    try:
+        import tempfile
+        from pathlib import Path
+        from measure_store import MeasureStore
+        
+        requested = []
+        
+        def fetch(types, begin, end):
+            requested.append((begin, end))
+            first = begin - begin % 3600 + 3600
+            return {'body': [{'beg_time': first, 'step_time': 3600,
+                              'value': [[20.0] for _ in range(first, end + 1, 3600)]}]}
+        
+        def fetch_points(types, begin, end):
+            # Points alignés de [begin, end], bornes incluses
+            requested.append((begin, end))
+            first = -(-begin // 3600) * 3600
+            return {'body': [{'beg_time': first, 'step_time': 3600,
+                              'value': [[20.0] for _ in range(first, end + 1, 3600)]}]}
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MeasureStore(Path(tmp) / 'measures.sqlite')
+            store.sync('h', 'm', ['Temperature'], '1hour', 0, 10 * 3600, fetch)
+            store.sync('h', 'm', ['Temperature'], '1hour', 0, 12 * 3600, fetch)
+            data = store.read('h', 'm', ['Temperature'], '1hour', 0, 12 * 3600)
+            # Synchronisation disjointe : le trou entre les deux plages reste à télécharger
+            gaps = []
+            store.sync('h', 'd', ['Temperature'], '1hour', 0, 10 * 3600, fetch_points)
+            store.sync('h', 'd', ['Temperature'], '1hour', 50 * 3600, 60 * 3600, fetch_points)
+            gaps.append(store.coverage('h', 'd', 'Temperature', '1hour'))
+            del requested[2:]
+            store.sync('h', 'd', ['Temperature'], '1hour', 0, 60 * 3600, fetch_points)
+            gaps.append(list(requested[2:]))
+            gaps.append(store.coverage('h', 'd', 'Temperature', '1hour'))
+            filled = store.read_series('h', 'd', 'Temperature', '1hour', 0, 60 * 3600)
+            store.close()
+        
+        if requested[:2] != [(0, 10 * 3600), (9 * 3600, 12 * 3600)]:
+            print(f"  ✗ Plages téléchargées incorrectes: {requested}")
+            return False
+        print("  ✓ Seule la plage manquante est téléchargée")
+        
+        if (gaps[0] != [(0, 10 * 3600), (50 * 3600, 60 * 3600)]
+                or gaps[1] != [(9 * 3600, 50 * 3600 - 1), (59 * 3600, 60 * 3600)]
+                or gaps[2] != [(0, 60 * 3600)] or len(filled) != 61):
+            print(f"  ✗ Trou entre deux synchronisations mal géré: {gaps}, {len(filled)} points")
+            return False
+        print("  ✓ Le trou entre deux synchronisations disjointes est téléchargé")
+        
+        if data['body'] != [{'beg_time': 3600, 'step_time': 3600, 'value': [[20.0]] * 12}]:
+            print(f"  ✗ Relecture incorrecte: {data}")
+            return False
+        print("  ✓ Relecture au format getmeasure")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_stats_engine():
+    """Teste le moteur de statistiques vectorisé."""
+    print("\nTest du moteur de statistiques...")
+    try:
+        import os
+        import time
+        from stats_engine import compute_statistics
+        
+        # 16°C pendant 12h puis 20°C pendant 12h, avec un trou de 6h au milieu
+        values = [[16.0]] * 12 + [[None]] * 6 + [[20.0]] * 12
+        history = {'body': [{'beg_time': 0, 'step_time': 3600, 'value': values}]}
+        stats = compute_statistics(history, ['basic', 'percentiles', 'time_weighted', 'degree_days'], step=3600)
+        
+        if stats['count'] != 24 or stats['average'] != 18.0 or stats['p50'] != 18.0:
+            print(f"  ✗ Statistiques de base incorrectes: {stats}")
+            return False
+        print("  ✓ Moyenne, min, max, percentiles OK")
+        
+        # 12h à 2°C sous la base de 18°C = 1 degré-jour
+        if abs(stats['heating_degree_days'] - 1.0) > 1e-9 or stats['time_weighted_average'] != 18.0:
+            print(f"  ✗ Degrés-jours ou moyenne pondérée incorrects: {stats}")
+            return False
+        print("  ✓ Degrés-jours et moyenne pondérée respectent les trous")
+        
+        if hasattr(time, 'tzset'):
+            import numpy as np
+            from stats_engine import compute_metrics
+            
+            # Passage à l'heure d'été (Paris, 29 mars 2026) : chaque point reste dans son heure locale
+            saved = os.environ.get('TZ')
+            os.environ['TZ'] = 'Europe/Paris'
+            time.tzset()
+            try:
+                timestamps = np.arange(1774656000, 1774656000 + 3 * 86400, 3600, dtype=np.int64)
+                hours = np.array([time.localtime(int(t)).tm_hour for t in timestamps], dtype=np.float64)
+                profile = compute_metrics(timestamps, hours, ['hourly_profile'])['hourly_profile']
+            finally:
+                if saved is None:
+                    os.environ.pop('TZ', None)
+                else:
+                    os.environ['TZ'] = saved
+                time.tzset()
+            if any(value is not None and value != int(hour[:2]) for hour, value in profile.items()):
+                print(f"  ✗ Profil horaire décalé par le changement d'heure: {profile}")
+                return False
+            print("  ✓ Profil horaire correct à travers un changement d'heure")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_timeseries():
+    """Teste la série temporelle compacte."""
+    print("\nTest de TimeSeries...")
+    try:
+        from timeseries import TimeSeries
+        
+        series = TimeSeries.from_body([{'beg_time': 0, 'step_time': 10, 'value': [[1.0], [None], [3.0], [4.0]]}])
+        if len(series.runs) != 1 or list(series) != [(0, 1.0), (20, 3.0), (30, 4.0)]:
+            print(f"  ✗ Construction depuis getmeasure incorrecte: {list(series)}")
+            return False
+        print("  ✓ Encodage beg_time/step_time conservé")
+        
+        if list(series[5:25]) != [(20, 3.0)]:
+            print(f"  ✗ Découpage incorrect: {list(series[5:25])}")
+            return False
+        print("  ✓ Découpage par timestamps")
+        
+        merged = series.merge(TimeSeries.from_points([(40, 5.0), (50, 6.0)]))
+        if len(merged.runs) != 1 or merged.end != 50:
+            print(f"  ✗ Fusion de séries contiguës incorrecte: {merged}")
+            return False
+        print("  ✓ Fusion de séries contiguës en un seul bloc")
+        
+        resampled = merged.resample(20)
+        if list(resampled) != [(0, 1.0), (20, 3.5), (40, 5.5)]:
+            print(f"  ✗ Rééchantillonnage incorrect: {list(resampled)}")
+            return False
+        print("  ✓ Rééchantillonnage")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_status_cache():
+    """Teste le cache de statut mis à jour par les consignes."""
+    print("\nTest du cache de statut...")
+    try:
+        import tempfile
+        import time
+        from pathlib import Path
+        from status_cache import StatusCache, same_setpoint
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'status.json'
+            cache = StatusCache(path, ttl=60)
+            cache.put('home1', {'body': {'home': {'rooms': [
+                {'id': 'r1', 'therm_setpoint_mode': 'schedule', 'therm_setpoint_temperature': 19}
+            ]}}})
+            cache.apply_setpoints('home1', [{'id': 'r1', 'therm_setpoint_mode': 'manual', 'therm_setpoint_temperature': 21}])
+            
+            status = StatusCache(path, ttl=60).get('home1')
+            room = status['body']['home']['rooms'][0] if status else {}
+            if room.get('therm_setpoint_temperature') != 21:
+                print(f"  ✗ Consigne non reportée dans le statut en cache: {status}")
+                return False
+            print("  ✓ Statut mis à jour par la consigne (write-through, partagé sur disque)")
+            
+            if not same_setpoint(room, 'manual', 21) or same_setpoint(room, 'manual', 20) or same_setpoint(room, 'hg'):
+                print("  ✗ Comparaison des consignes incorrecte")
+                return False
+            print("  ✓ Consignes redondantes détectées")
+            
+            cache.apply_setpoints('home1', [{'id': 'r1', 'therm_setpoint_mode': 'hg'}])
+            if cache.get('home1') is not None or cache.room_state('home1', 'r1')['therm_setpoint_mode'] != 'hg':
+                print("  ✗ Un mode à température inconnue doit rendre le statut partiel")
+                return False
+            print("  ✓ Statut partiel relu depuis l'API")
+            
+            if StatusCache(path, ttl=0).get('home1') is not None:
+                print("  ✗ Un TTL nul devrait désactiver le cache")
+                return False
+            
+            # Deux processus écrivent des maisons différentes : aucune n'est perdue
+            other = StatusCache(path, ttl=60)
+            other.put('home2', {'body': {'home': {'rooms': []}}})
+            cache.put('home3', {'body': {'home': {'rooms': []}}})
+            if other.get('home3') is None or StatusCache(path, ttl=60).get('home2') is None:
+                print("  ✗ Écritures concurrentes perdues")
+                return False
+            print("  ✓ Écritures de plusieurs processus fusionnées sur disque")
+            
+            # Statut lu il y a plus que le TTL : une consigne ne le rend pas valide à nouveau
+            cache.put('home4', {'body': {'home': {'rooms': [{'id': 'r1'}, {'id': 'r2'}]}}})
+            cache._update('home4', lambda entry: dict(entry, updated_at=time.time() - 120))
+            cache.apply_setpoints('home4', [{'id': 'r1', 'therm_setpoint_mode': 'manual',
+                                             'therm_setpoint_temperature': 20}])
+            if (cache.get('home4') is not None or cache.room_state('home4', 'r2') is not None
+                    or cache.room_state('home4', 'r1') is None):
+                print("  ✗ La consigne a prolongé le statut périmé")
+                return False
+            print("  ✓ Date d'écriture par pièce, distincte de la lecture du statut")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_rate_limiter():
+    """Teste le limiteur de débit partagé entre processus."""
+    print("\nTest du limiteur de débit...")
+    try:
+        import tempfile
+        from pathlib import Path
+        from rate_limiter import RateLimiter
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'ratelimit.json'
+            limiter = RateLimiter(path, [(2, 10)], 'client')
+            waits = [limiter.reserve(now=1000.0) for _ in range(4)]
+            if waits != [0.0, 0.0, 5.0, 10.0]:
+                print(f"  ✗ Attentes incorrectes: {waits}")
+                return False
+            print("  ✓ Requêtes en excès mises en file d'attente")
+            
+            # Un autre processus (autre instance) voit les réservations en cours
+            other = RateLimiter(path, [(2, 10)], 'client')
+            if other.reserve(now=1000.0) != 15.0:
+                print("  ✗ État non partagé entre instances")
+                return False
+            print("  ✓ État partagé via le fichier")
+            
+            if RateLimiter(path, [(0, 10)]).reserve() != 0.0:
+                print("  ✗ Un seau de capacité 0 devrait être désactivé")
+                return False
+            print("  ✓ Limite désactivable")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_resilience():
+    """Teste la classification des erreurs, le backoff et le disjoncteur."""
+    print("\nTest de la couche de résilience...")
+    try:
+        from resilience import (
+            CircuitBreaker, CircuitOpenError, NetatmoAPIError, RateLimitError, RetryPolicy,
+            TokenExpiredError, TransientAPIError, classify_error
+        )
+        
+        cases = [
+            (classify_error(503, 'x'), TransientAPIError),
+            (classify_error(429, 'x', headers={'Retry-After': '7'}), RateLimitError),
+            (classify_error(403, 'x', {'error': {'code': 26, 'message': 'User usage reached'}}), RateLimitError),
+            (classify_error(403, 'x', {'error': {'code': 3, 'message': 'Access token expired'}}), TokenExpiredError),
+            (classify_error(401, 'x', {'error': 'invalid_token'}), TokenExpiredError),
+            (classify_error(400, 'x'), NetatmoAPIError),
+        ]
+        for error, expected in cases:
+            if type(error) is not expected or not isinstance(error, ValueError):
+                print(f"  ✗ Classification incorrecte: {type(error).__name__} au lieu de {expected.__name__}")
+                return False
+        print("  ✓ Erreurs classées (temporaire, quota, token, définitive)")
+        
+        policy = RetryPolicy(max_retries=2, base_delay=1, max_delay=10)
+        if policy.delay(0, cases[1][0]) != 7 or policy.delay(2) is not None or not 0 <= policy.delay(1) <= 2:
+            print("  ✗ Délais de nouvelle tentative incorrects")
+            return False
+        if policy.delay(0, classify_error(429, 'x', headers={'Retry-After': '3600'})) is not None:
+            print("  ✗ Un Retry-After trop long devrait interrompre les tentatives")
+            return False
+        print("  ✓ Backoff avec jitter et Retry-After")
+        
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        try:
+            breaker.before_call()
+            print("  ✗ Le disjoncteur aurait dû s'ouvrir")
+            return False
+        except CircuitOpenError:
+            pass
+        breaker.opened_at -= 60
+        breaker.before_call()
+        breaker.record_success()
+        if breaker.state != CircuitBreaker.CLOSED:
+            print("  ✗ Le disjoncteur aurait dû se refermer après l'essai")
+            return False
+        print("  ✓ Disjoncteur (ouverture, essai, fermeture)")
+        
+        # Essai interrompu par une exception non classée : le disjoncteur se rouvre
+        breaker.state, breaker.opened_at = CircuitBreaker.OPEN, 0.0
+        trial = breaker.before_call()
+        breaker.end_trial()
+        if not trial or breaker.state != CircuitBreaker.OPEN:
+            print(f"  ✗ Essai sans résultat: état {breaker.state}")
+            return False
+        
+        # Essai qui reçoit un 401 : le token est rafraîchi et l'essai continue
+        from config import Config
+        from mock_server import MockAccount, MockNetatmoServer
+        from netatmo_client import NetatmoClient
+        
+        with MockNetatmoServer(MockAccount(homes=1, rooms=1), error_status=401) as server, \
+                mock_environment(server.url):
+            with NetatmoClient(Config()) as client:
+                client.get_homes_data()
+                client.circuit_breaker.state = CircuitBreaker.OPEN
+                client.circuit_breaker.opened_at = 0.0
+                server.fail_next(1)
+                client.get_home_status('home-0', refresh=True)
+                state = client.circuit_breaker.state
+        if state != CircuitBreaker.CLOSED:
+            print(f"  ✗ Essai avec token expiré: disjoncteur {state}")
+            return False
+        print("  ✓ Appel d'essai (token rafraîchi, exception) toujours conclu")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_lazy_imports():
+    """Teste que le CLI n'importe pas les dépendances réseau au démarrage."""
+    print("\nTest des imports différés...")
+    try:
+        import os
+        import subprocess
+        import sys
+        
+        code = (
+            "import sys, netatmo_cli; "
+            "print(','.join(m for m in ('requests', 'dotenv', 'netatmo_client', 'numpy') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0 or result.stdout.strip():
+            print(f"  ✗ Modules importés au démarrage: {result.stdout.strip() or result.stderr.strip()}")
+            return False
+        print("  ✓ requests, dotenv et le client ne sont pas importés par le CLI")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_daemon():
+    """Teste l'exécution des commandes par le démon et le transfert via la socket."""
+    print("\nTest du démon...")
+    try:
+        import os
+        import tempfile
+        import threading
+        from pathlib import Path
+        import daemon
+        from netatmo_cli import build_parser
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = Path(tmp) / 'daemon.sock'
+            if daemon.forward(socket_path, ['status']) is not None:
+                print("  ✗ Une commande a été transmise sans démon")
+                return False
+            print("  ✓ Exécution locale sans démon")
+            
+            class FakeClient:
+                def get_thermostat_status(self, debug=False):
+                    return {'module_name': 'Thermostat', 'current_temp': 19.5}
+            
+            account = {'client_id': 'app', 'api_url': 'https://api.netatmo.com', 'cache_dir': tmp}
+            server = daemon.DaemonServer(socket_path, FakeClient(), build_parser(), account)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                if daemon.forward(socket_path, ['status'], account=dict(account, client_id='other')) is not None:
+                    print("  ✗ Le démon a servi un autre compte")
+                    return False
+                print("  ✓ Requête d'un autre compte refusée (exécution locale)")
+                
+                response = daemon.forward(socket_path, ['status', '--json'], account=account)
+                if not response or response['exit_code'] != 0 or '19.5' not in response['stdout']:
+                    print(f"  ✗ Réponse du démon incorrecte: {response}")
+                    return False
+                print("  ✓ Commande exécutée par le démon")
+                
+                response = daemon.forward(socket_path, ['set', 'abc'], account=account)
+                if not response or response['exit_code'] != 2 or 'invalid' not in response['stderr']:
+                    print(f"  ✗ Erreur d'arguments mal transmise: {response}")
+                    return False
+                print("  ✓ Erreurs et code de sortie transmis")
+                
+                from netatmo_cli import absolute_path_args
+                argv = ['set-many', 'Salon=19', '--scene', 'scene.json', '--profile-output', '/tmp/p.pstats']
+                forwarded = absolute_path_args(argv, build_parser().parse_args(argv))
+                if forwarded != argv + ['--scene', os.path.abspath('scene.json')]:
+                    print(f"  ✗ Chemins relatifs transmis au démon: {forwarded}")
+                    return False
+                print("  ✓ Chemins des arguments rendus absolus avant le transfert")
+            finally:
+                server.shutdown()
+                server.server_close()
+            
+            # Démon interrompu après réception : la commande ne doit pas être rejouée localement
+            import socket
+            broken_path = Path(tmp) / 'broken.sock'
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(broken_path))
+            listener.listen(1)
+            
+            def accept_and_close():
+                conn, _ = listener.accept()
+                conn.makefile('rb').readline()
+                conn.close()
+            
+            thread = threading.Thread(target=accept_and_close, daemon=True)
+            thread.start()
+            response = daemon.forward(broken_path, ['set', '21'], account=account)
+            thread.join()
+            listener.close()
+            if response is None or response['exit_code'] != 1 or 'a pu être exécutée' not in response['stderr']:
+                print(f"  ✗ Réponse interrompue rejouée localement: {response}")
+                return False
+            print("  ✓ Réponse interrompue signalée comme une erreur (pas de double exécution)")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+@contextmanager
+def mock_environment(api_url):
+    """Variables d'environnement d'un client pointant vers l'API simulée (cache temporaire)."""
+    import os
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        overrides = {
+            'NETATMO_API_URL': api_url, 'NETATMO_CLIENT_ID': 'test', 'NETATMO_CLIENT_SECRET': 'test',
+            'NETATMO_REFRESH_TOKEN': 'test', 'NETATMO_CACHE_DIR': tmp,
+            'NETATMO_RATE_LIMIT_10S': '0', 'NETATMO_RATE_LIMIT_HOUR': '0',
+        }
+        saved = {key: os.environ.get(key) for key in overrides}
+        os.environ.update(overrides)
+        try:
+            yield tmp
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+def test_mock_server():
+    """Teste le client contre l'API Netatmo simulée (mock_server.py)."""
+    print("\nTest de l'API simulée...")
+    try:
+        from config import Config
+        from mock_server import MockAccount, MockNetatmoServer
+        from netatmo_client import NetatmoClient
+        
+        with MockNetatmoServer(MockAccount(homes=2, rooms=3, history_days=30)) as server:
+            with mock_environment(server.url):
+                client = NetatmoClient(Config())
+                rows = client.get_all_status()
+                if len(rows) != 6 or any(row['current_temp'] is None for row in rows):
+                    print(f"  ✗ Statut du compte incorrect: {rows}")
+                    return False
+                print("  ✓ Statut des 2 maisons simulées")
+                
+                request = client._request
+                def failing_request(*args, **kwargs):
+                    raise ValueError("homesdata indisponible")
+                client._request = failing_request
+                try:
+                    client.get_homes_data(refresh=True)
+                except ValueError:
+                    pass
+                client._request = request
+                if client.topology_cache.get() is not None:
+                    print("  ✗ Topologie en cache conservée après un rafraîchissement forcé")
+                    return False
+                print("  ✓ Rafraîchissement forcé : l'ancienne topologie est oubliée")
+                
+                client.set_temperature(21.0)
+                if client.set_temperature(21.0).get('unchanged') is not True:
+                    print("  ✗ La consigne écrite n'a pas été reportée")
+                    return False
+                requests_before = server.stats()['requests']
+                client.status_cache.invalidate()
+                status = client.get_thermostat_status()
+                if status.get('target_temp') != 21.0 or server.stats()['requests'] != requests_before + 1:
+                    print(f"  ✗ Consigne non appliquée par l'API simulée: {status}")
+                    return False
+                print("  ✓ Consigne appliquée et relue")
+                
+                import argparse
+                import io
+                from contextlib import redirect_stdout
+                from netatmo_cli import cmd_set_many
+                args = argparse.Namespace(setpoints=[f"{rows[1]['room_id']}=schedule"], scene=None,
+                                          force=True, json=False)
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    cmd_set_many(client, args)
+                if 'schedule' not in output.getvalue() or ' home ' in output.getvalue():
+                    print(f"  ✗ Mode affiché dans le vocabulaire de l'API: {output.getvalue()}")
+                    return False
+                print("  ✓ Mode de consigne affiché dans le vocabulaire du CLI")
+                client.close()
+            
+            stats = server.stats()
+            if stats['errors'] or '/oauth2/token' not in stats['by_endpoint']:
+                print(f"  ✗ Compteurs du serveur incorrects: {stats}")
+                return False
+            print(f"  ✓ {stats['requests']} requêtes comptées par endpoint")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_instrumentation():
+    """Teste les observateurs des appels HTTP et le rapport --timings."""
+    print("\nTest de l'instrumentation...")
+    try:
+        import io
+        from config import Config
+        from instrumentation import RequestObserver, TimingsReport, timings_report
+        from mock_server import MockAccount, MockNetatmoServer
+        from netatmo_client import NetatmoClient
+        
+        class Recorder(RequestObserver):
+            def __init__(self):
+                self.events = []
+            
+            def on_request(self, event):
+                self.events.append(event)
+        
+        with MockNetatmoServer(MockAccount(homes=1, rooms=2, history_days=10)) as server, \
+                mock_environment(server.url):
+            client = NetatmoClient(Config())
+            recorder = Recorder()
+            client.add_observer(recorder)
+            client.get_thermostat_status()
+            endpoints = [event.endpoint for event in recorder.events]
+            if endpoints != ['/oauth2/token', '/api/homesdata', '/api/homestatus']:
+                print(f"  ✗ Appels observés incorrects: {endpoints}")
+                return False
+            first = recorder.events[0]
+            if not first.new_connection or first.status != 200 or first.size <= 0 or first.total <= 0:
+                print(f"  ✗ Mesures incorrectes: {first.as_dict()}")
+                return False
+            if any(event.new_connection for event in recorder.events[1:]):
+                print("  ✗ La connexion keep-alive n'a pas été réutilisée")
+                return False
+            print("  ✓ Endpoint, statut, taille et phases de connexion observés")
+            client.remove_observer(recorder)
+            
+            # Une erreur injectée puis retentée apparaît comme deux tentatives
+            server.fail_next(1)
+            client.retry_policy.base_delay = 0.01
+            stream = io.StringIO()
+            with timings_report(client, stream=stream) as report:
+                client.get_home_status('home-0', refresh=True)
+            client.close()
+        
+        if not isinstance(report, TimingsReport) or report.summary()['api_calls'] != 2:
+            print(f"  ✗ Rapport incorrect: {report.summary() if report else None}")
+            return False
+        if report.events[0].status != 503 or report.events[1].attempt != 1:
+            print(f"  ✗ Nouvelle tentative non rapportée: {[e.as_dict() for e in report.events]}")
+            return False
+        if '/api/homestatus' not in stream.getvalue():
+            print("  ✗ Rapport --timings non affiché")
+            return False
+        print("  ✓ Nouvelle tentative et rapport --timings")
+        
+        # Première adresse injoignable : la suivante est essayée, sans nouvelle résolution
+        import socket
+        from unittest.mock import patch
+        from timed_adapter import TimedHTTPConnection
+        with socket.socket() as closed, socket.socket() as listener:
+            closed.bind(('127.0.0.1', 0))
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)
+            addresses = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', closed.getsockname()),
+                         (socket.AF_INET, socket.SOCK_STREAM, 6, '', listener.getsockname())]
+            with patch('socket.getaddrinfo', return_value=addresses) as resolver:
+                connection = TimedHTTPConnection('netatmo.test', 80, timeout=1)
+                sock = connection._new_conn()
+            connected = sock.getpeername() == listener.getsockname()
+            sock.close()
+        if not connected or resolver.call_count != 1:
+            print(f"  ✗ Adresses résolues mal parcourues ({resolver.call_count} résolutions)")
+            return False
+        print("  ✓ Adresses résolues essayées dans l'ordre, une seule résolution")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_profiling():
+    """Teste le mode --profile (cProfile fusionné entre threads et tracemalloc)."""
+    print("\nTest du profilage...")
+    try:
+        import io
+        import os
+        import pstats
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        from profiling import profile_command
+        
+        def decode_window(size):
+            return [str(i) for i in range(size)]
+        
+        stream = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'profil.pstats')
+            with profile_command(output=output, limit=10, stream=stream) as profiler:
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    windows = list(executor.map(decode_window, [20000, 20000]))
+            
+            report = stream.getvalue()
+            if 'decode_window' not in [key[2] for key in profiler.stats().stats]:
+                print("  ✗ Fonctions des threads absentes du profil")
+                return False
+            print("  ✓ Fonctions exécutées dans les threads profilées")
+            
+            if profiler.peak_memory <= 0 or 'pic' not in report:
+                print("  ✗ Pic mémoire non mesuré")
+                return False
+            print(f"  ✓ Pic mémoire mesuré ({profiler.peak_memory // 1024} Ko pour {len(windows)} fenêtres)")
+            
+            functions = [key[2] for key in pstats.Stats(output).stats]
+            if 'decode_window' not in functions:
+                print("  ✗ Fichier pstats incomplet")
+                return False
+            print("  ✓ Fichier pstats enregistré")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_status_watch():
+    """Teste la surveillance du statut (changements seuls, intervalle adaptatif)."""
+    print("\nTest de la surveillance du statut...")
+    try:
+        from watch import AdaptiveInterval, StatusWatcher, format_event
+        
+        def row(temp, power, boiler):
+            return {'home_id': 'h1', 'home_name': 'Maison', 'room_id': 'r1', 'room_name': 'Salon',
+                    'module_id': 'm1', 'module_name': 'Thermostat', 'current_temp': temp, 'target_temp': 19.0,
+                    'setpoint_mode': 'schedule', 'heating_power_request': power, 'boiler_status': boiler,
+                    'reachable': True}
+        
+        class FakeClient:
+            def __init__(self, polls):
+                self.polls = polls
+                self.calls = 0
+            
+            def get_all_status(self, max_workers=None, refresh=False):
+                self.calls += 1
+                return self.polls[self.calls - 1]
+        
+        client = FakeClient([
+            [row(18.0, 0, False)],
+            [row(18.0, 0, False)],
+            [row(18.0, 0, False)],
+            [row(18.0, 100, True)],
+            [row(18.4, 100, True)],
+            [{'home_id': 'h1', 'home_name': 'Maison', 'error': 'HTTP 503'}],
+        ])
+        emitted = []
+        delays = []
+        watcher = StatusWatcher(client, AdaptiveInterval(10, 60))
+        polls = watcher.run(emitted.append, count=6, sleep=delays.append)
+        
+        if polls != 6 or len(emitted[0]) != 1 or emitted[0][0]['previous']:
+            print(f"  ✗ État initial incorrect: {emitted[:1]}")
+            return False
+        if emitted[1] or emitted[2]:
+            print(f"  ✗ Une maison stable a émis des changements: {emitted[1:3]}")
+            return False
+        changes = emitted[3][0]['changes']
+        if changes != {'heating_power_request': 100, 'boiler_status': True}:
+            print(f"  ✗ Changements incorrects: {changes}")
+            return False
+        if 'boiler_status False → True' not in format_event(emitted[3][0], 0):
+            print(f"  ✗ Format texte incorrect: {format_event(emitted[3][0], 0)}")
+            return False
+        print("  ✓ Seuls les champs modifiés sont émis")
+        
+        # Stable : 10 → 20 → 40 ; activité : retour à 10 ; température seule : 20
+        if delays != [10, 20, 40, 10, 20]:
+            print(f"  ✗ Intervalles incorrects: {delays}")
+            return False
+        print("  ✓ Intervalle adaptatif (accéléré par le chauffage, ralenti si stable)")
+        
+        # Le code de sortie de la surveillance remonte par cmd_status jusqu'à main
+        import argparse
+        import io
+        from contextlib import redirect_stderr, redirect_stdout
+        from netatmo_cli import cmd_status
+        args = argparse.Namespace(watch=True, all=False, json=True, debug=False, count=2,
+                                  min_interval=0.01, max_interval=0.01, workers=None)
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            ok = cmd_status(FakeClient([[row(18.0, 0, False)], [row(18.0, 0, False)]]), args)
+            failed = cmd_status(FakeClient([[row(18.0, 0, False)],
+                                            [{'home_id': 'h1', 'error': 'HTTP 503'}]]), args)
+        if ok != 0 or failed != 1:
+            print(f"  ✗ Codes de sortie incorrects: {ok}, {failed}")
+            return False
+        print("  ✓ Code de sortie de la surveillance propagé (1 si une interrogation échoue)")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_singleflight():
+    """Teste la mutualisation des lectures identiques simultanées (threads et asyncio)."""
+    print("\nTest de la mutualisation des requêtes...")
+    try:
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        from config import Config
+        from mock_server import MockAccount, MockNetatmoServer
+        from netatmo_client import NetatmoClient
+        from singleflight import AsyncSingleFlight
+        
+        with MockNetatmoServer(MockAccount(homes=1, rooms=2), latency=0.2) as server, \
+                mock_environment(server.url):
+            client = NetatmoClient(Config())
+            client._get_access_token()
+            server.reset_stats()
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                responses = list(executor.map(lambda _: client.get_homes_data(), range(8)))
+            client.close()
+            calls = server.stats()['by_endpoint'].get('/api/homesdata')
+            if calls != 1 or any(response is not responses[0] for response in responses):
+                print(f"  ✗ {calls} appels /api/homesdata pour 8 lectures simultanées")
+                return False
+            print(f"  ✓ 8 lectures simultanées, 1 appel API ({client.singleflight.coalesced} mutualisées)")
+        
+        async def scenario():
+            flights = AsyncSingleFlight()
+            calls = []
+            
+            async def fetch(name):
+                calls.append(name)
+                await asyncio.sleep(0.05)
+                if name == 'erreur':
+                    raise ValueError("boom")
+                return {'name': name}
+            
+            results = await asyncio.gather(*(flights.do('a', lambda: fetch('a')) for _ in range(5)),
+                                           flights.do('b', lambda: fetch('b')))
+            errors = await asyncio.gather(*(flights.do('e', lambda: fetch('erreur')) for _ in range(3)),
+                                          return_exceptions=True)
+            return calls, results, errors
+        
+        calls, results, errors = asyncio.run(scenario())
+        if calls != ['a', 'b', 'erreur'] or results[4] is not results[0] or results[5] != {'name': 'b'}:
+            print(f"  ✗ Mutualisation asyncio incorrecte: {calls}")
+            return False
+        if not all(isinstance(error, ValueError) for error in errors):
+            print(f"  ✗ Erreur non transmise à tous les appelants: {errors}")
+            return False
+        print("  ✓ Coroutines mutualisées par clé, erreur transmise à tous les appelants")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_response_cache():
+    """Teste le cache disque des réponses (TTL par endpoint, LRU, invalidation, --max-age)."""
+    print("\nTest du cache des réponses...")
+    try:
+        import tempfile
+        import time
+        from pathlib import Path
+        from config import Config
+        from mock_server import MockAccount, MockNetatmoServer
+        from netatmo_client import NetatmoClient
+        from response_cache import ResponseCache
+        
+        now = time.time()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'responses.sqlite'
+            cache = ResponseCache(path, 10_000, {'/api/homestatus': 60})
+            closed = {'scale': '1hour', 'date_begin': 0, 'date_end': int(now) - 86400}
+            if (cache.ttl('/api/getmeasure', closed, now) is not None
+                    or cache.ttl('/api/getmeasure', {'scale': '1hour', 'date_end': int(now)}, now) != 300
+                    or cache.ttl('/api/homesdata') != 0):
+                print("  ✗ Politique de validité par endpoint incorrecte")
+                return False
+            print("  ✓ Fenêtre close permanente, fenêtre ouverte 5 min, endpoint sans TTL non mis en cache")
+            
+            cache.put('/api/homestatus', {'home_id': 'h1'}, {'body': {'n': 1}})
+            cache.put('/api/homestatus', {'home_id': 'h2'}, {'body': {'n': 2}})
+            cache.put('/api/getmeasure', closed, {'body': {'x': 'y'}})
+            cache.close()
+            cache = ResponseCache(path, 10_000, {'/api/homestatus': 60})
+            if (cache.get('/api/homestatus', {'home_id': 'h1'}) != {'body': {'n': 1}}
+                    or cache.get('/api/getmeasure', dict(closed)) is None):
+                print("  ✗ Réponses non relues après réouverture")
+                return False
+            if cache.get('/api/homestatus', {'home_id': 'h1'}, max_age=0) is not None:
+                print("  ✗ max_age=0 a servi une réponse en cache")
+                return False
+            print("  ✓ Persistance sur disque et --max-age")
+            
+            # Taille limitée : l'entrée la moins récemment utilisée est supprimée
+            small = ResponseCache(Path(tmp) / 'small.sqlite', 250, {'/api/homestatus': 60})
+            payload = {'body': 'x' * 80}
+            for home in ('a', 'b'):
+                small.put('/api/homestatus', {'home_id': home}, payload)
+            small.get('/api/homestatus', {'home_id': 'a'})
+            small.put('/api/homestatus', {'home_id': 'c'}, payload)
+            kept = [home for home in ('a', 'b', 'c') if small.get('/api/homestatus', {'home_id': home})]
+            small.close()
+            cache.close()
+            if kept != ['a', 'c']:
+                print(f"  ✗ Éviction LRU incorrecte, entrées conservées: {kept}")
+                return False
+            print("  ✓ Éviction LRU au-delà de la taille maximale")
+        
+        with MockNetatmoServer(MockAccount(homes=1, rooms=2)) as server, mock_environment(server.url):
+            with NetatmoClient(Config()) as client:
+                client.get_homes_data()
+                client.get_home_status('home-0')
+                client.set_thermpoint('home-0', 'room-0-0', 'manual', 21)
+            server.reset_stats()
+            # Nouveau processus : les réponses sont relues sur disque
+            with NetatmoClient(Config()) as client:
+                client.status_cache.invalidate()
+                client.get_topology()
+                status = client.get_home_status('home-0')
+                cached_calls = server.stats()['by_endpoint']
+                with client.cache_policy(no_cache=True):
+                    client.get_topology()
+                cache_entries = client.response_cache.stats()['entries']
+            rooms = {room['id']: room for room in status['body']['home']['rooms']}
+            if '/api/homesdata' in cached_calls or cached_calls.get('/api/homestatus') != 1:
+                print(f"  ✗ Appels inattendus avec le cache: {cached_calls}")
+                return False
+            if rooms['room-0-0']['therm_setpoint_temperature'] != 21:
+                print("  ✗ Statut périmé servi après une consigne")
+                return False
+            if server.stats()['by_endpoint'].get('/api/homesdata') != 1:
+                print("  ✗ --no-cache n'a pas interrogé l'API")
+                return False
+            if cache_entries:
+                print(f"  ✗ Topologie ou statut en double dans le cache des réponses: {cache_entries}")
+                return False
+            print("  ✓ Topologie relue sur disque, statut à jour après la consigne, --no-cache")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_thermostat_measures():
+    """Teste les mesures à plusieurs types (colonnes) et les métriques chaudière / consigne."""
+    print("\nTest des mesures multi-types...")
+    try:
+        import numpy as np
+        from config import Config
+        import io
+        from contextlib import redirect_stdout
+        from measures import parse_types
+        from mock_server import MockAccount, MockNetatmoServer
+        from netatmo_cli import build_parser, cmd_stats
+        from netatmo_client import NetatmoClient
+        from stats_engine import boiler_metrics, setpoint_metrics
+        from timeseries import TimeSeries, align_columns
+        
+        types = ['Temperature', 'sp_temperature', 'sum_boiler_on']
+        body = [{'beg_time': 0, 'step_time': 3600, 'value': [[19.0, 20.0, 1800], [None, 20.0, 3600], [21.0, 20.0, 0]]}]
+        columns = TimeSeries.columns_from_body(body, types)
+        dict_columns = TimeSeries.columns_from_body({'0': [19.0, 20.0, 1800], '3600': [None, 20.0, 3600]}, types)
+        if (list(columns['Temperature']) != [(0, 19.0), (7200, 21.0)]
+                or list(columns['sum_boiler_on']) != [(0, 1800.0), (3600, 3600.0), (7200, 0.0)]
+                or list(dict_columns['sp_temperature']) != [(0, 20.0), (3600, 20.0)]):
+            print("  ✗ Colonnes mal extraites")
+            return False
+        rows = align_columns(columns)
+        if rows[1] != (3600, [None, 20.0, 3600.0]):
+            print(f"  ✗ Alignement incorrect: {rows}")
+            return False
+        if parse_types('temperature,boiler', 'max') != ['Temperature', 'boileron', 'boileroff']:
+            print("  ✗ Types mal interprétés")
+            return False
+        print("  ✓ Une colonne par type (body en liste ou en dict), lignes alignées")
+        
+        timestamps = np.array([0, 3600, 86400], dtype=np.int64)
+        boiler = boiler_metrics(timestamps, np.array([1800.0, 3600.0, 900.0]), np.array([1800.0, 0.0, 2700.0]), 3600)
+        if abs(boiler['boiler_duty_cycle'] - 6300 / 10800) > 1e-9 or abs(boiler['boiler_runtime_hours'] - 1.75) > 1e-9:
+            print(f"  ✗ Durée de chauffe incorrecte: {boiler}")
+            return False
+        if sum(boiler['boiler_runtime_per_day'].values()) != 1.75:
+            print(f"  ✗ Durée par jour incorrecte: {boiler['boiler_runtime_per_day']}")
+            return False
+        error = setpoint_metrics(*columns['Temperature'].to_arrays(), *columns['sp_temperature'].to_arrays())
+        error = error['setpoint_error']
+        if error['count'] != 2 or error['mean'] != 0 or error['mean_abs'] != 1 or error['below_share'] != 0.5:
+            print(f"  ✗ Écart à la consigne incorrect: {error}")
+            return False
+        print("  ✓ Taux de fonctionnement, durée par jour et écart à la consigne")
+        
+        with MockNetatmoServer(MockAccount(homes=1, rooms=1, history_days=10)) as server, \
+                mock_environment(server.url):
+            with NetatmoClient(Config()) as client:
+                client.get_thermostat_location()
+                server.reset_stats()
+                stats = client.get_statistics(3, metrics=['basic', 'boiler', 'setpoint'])
+                calls = server.stats()['by_endpoint'].get('/api/getmeasure')
+                # Sans 'basic' dans --metrics, moyenne, min et max restent affichés
+                args = build_parser().parse_args(['stats', '--days', '3', '--metrics', 'percentiles', '--json'])
+                with redirect_stdout(io.StringIO()):
+                    output = cmd_stats(client, args)
+        if calls != 1 or not stats['count'] or not 0 < stats['boiler_duty_cycle'] < 1 or stats['setpoint_error'] is None:
+            print(f"  ✗ Statistiques multi-types incorrectes ({calls} appels): {stats}")
+            return False
+        print("  ✓ Température, consigne et chaudière en un seul appel getmeasure")
+        
+        if not output['average_temperature'].endswith('°C') or not output['p50_temperature'].endswith('°C'):
+            print(f"  ✗ stats --metrics percentiles sans moyenne: {output}")
+            return False
+        print("  ✓ stats --metrics percentiles affiche aussi moyenne, min et max")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+
+def test_room_history():
+    """Teste l'historique par pièce (getroommeasure en parallèle, grille commune)."""
+    print("\nTest de l'historique par pièce...")
+    try:
+        from config import Config
+        from mock_server import MockAccount, MockNetatmoServer
+        from netatmo_client import NetatmoClient
+        from timeseries import TimeSeries, align_columns
+        
+        # Séries décalées : le rééchantillonnage les ramène sur la même grille
+        shifted = {'a': TimeSeries.from_points([(0, 18.0), (3600, 19.0)]),
+                   'b': TimeSeries.from_points([(600, 20.0), (4200, 21.0)])}
+        if align_columns(shifted, 3600) != [(0, [18.0, 20.0]), (3600, [19.0, 21.0])]:
+            print(f"  ✗ Grille commune incorrecte: {align_columns(shifted, 3600)}")
+            return False
+        print("  ✓ Séries alignées sur la grille de l'échelle")
+        
+        with MockNetatmoServer(MockAccount(homes=2, rooms=4, history_days=10)) as server, \
+                mock_environment(server.url):
+            with NetatmoClient(Config()) as client:
+                rooms = client.resolve_rooms(['all'], 'Maison 2')
+                server.reset_stats()
+                series, errors = client.get_rooms_history(rooms, 2, max_workers=4)
+                calls = server.stats()['by_endpoint'].get('/api/getroommeasure')
+                selected = client.resolve_rooms(['room-0-1', 'Salon (Maison 1)'])
+                server.reset_stats()
+                _, direct_errors = client.get_rooms_history(selected, 1, use_store=False)
+                direct_calls = server.stats()['by_endpoint'].get('/api/getroommeasure')
+        
+        if [room['room_id'] for room in rooms] != [f'room-1-{r}' for r in range(4)]:
+            print(f"  ✗ Pièces mal résolues: {rooms}")
+            return False
+        if [room['room_id'] for room in selected] != ['room-0-1', 'room-0-0']:
+            print(f"  ✗ Sélection de pièces incorrecte: {selected}")
+            return False
+        if errors or direct_errors or calls != 4 or direct_calls != 2:
+            print(f"  ✗ Appels getroommeasure incorrects ({calls}, {direct_calls}): {errors or direct_errors}")
+            return False
+        rows = align_columns(series, 3600)
+        if len(series) != 4 or not rows or any(None in values for _, values in rows[:-1]):
+            print(f"  ✗ Tableau par pièce incomplet: {len(rows)} lignes")
+            return False
+        print(f"  ✓ {len(series)} pièces en {calls} appels parallèles, {len(rows)} lignes alignées")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
+def test_fleet():
+    """Teste le mode flotte (fichier de comptes, environnement par compte, pool de processus)."""
+    print("\nTest du mode flotte...")
+    try:
+        import json
+        import tempfile
+        from pathlib import Path
+        from fleet import account_environment, load_accounts, run_fleet
+        from mock_server import MockAccount, MockNetatmoServer
+        
+        with tempfile.TemporaryDirectory() as tmp, MockNetatmoServer(MockAccount(homes=1, rooms=2)) as server:
+            path = Path(tmp) / 'fleet.json'
+            path.write_text(json.dumps({
+                'env': {'NETATMO_API_URL': server.url, 'NETATMO_RATE_LIMIT_10S': '0', 'NETATMO_MAX_RETRIES': '0'},
+                'accounts': [
+                    {'name': 'a', 'client_id': 'x', 'client_secret': 'y', 'refresh_token': 'r'},
+                    {'name': 'b', 'client_id': 'x', 'client_secret': 'y', 'username': 'u', 'password': 'p'},
+                    {'name': 'hs', 'client_id': 'x', 'client_secret': 'y', 'refresh_token': 'r',
+                     'api_url': 'http://127.0.0.1:1'},
+                ],
+            }))
+            accounts = load_accounts(str(path))
+            env = account_environment(accounts[0], {'NETATMO_REFRESH_TOKEN': 'parent', 'NETATMO_POOL_SIZE': '4'},
+                                      Path(tmp) / 'fleet')
+            if (env['NETATMO_REFRESH_TOKEN'] != 'r' or env['NETATMO_POOL_SIZE'] != '4'
+                    or env['NETATMO_CACHE_DIR'] != str(Path(tmp) / 'fleet' / 'a') or 'NETATMO_USERNAME' in env):
+                print(f"  ✗ Environnement du compte incorrect: {env}")
+                return False
+            path.write_text(json.dumps([{'name': 'a', 'client_id': 'x', 'client_secret': 'y'}]))
+            try:
+                load_accounts(str(path))
+                print("  ✗ Compte sans identifiants accepté")
+                return False
+            except ValueError:
+                pass
+            print("  ✓ Fichier de comptes validé, identifiants et cache propres à chaque compte")
+            
+            rows = list(run_fleet(accounts, 'status', cache_root=Path(tmp) / 'fleet', max_workers=3))
+            by_account = {}
+            for row in rows:
+                by_account.setdefault(row['account'], []).append(row)
+            if len(by_account.get('a', [])) != 2 or len(by_account.get('b', [])) != 2:
+                print(f"  ✗ Statuts manquants: {rows}")
+                return False
+            if 'error' not in by_account['hs'][0] or not (Path(tmp) / 'fleet' / 'b' / 'token.json').exists():
+                print(f"  ✗ Erreur ou cache du compte incorrects: {by_account['hs']}")
+                return False
+            print("  ✓ Statut des comptes en parallèle, compte en échec isolé")
+        
+        import io
+        from contextlib import redirect_stderr
+        from netatmo_cli import build_parser
+        parser = build_parser()
+        args = parser.parse_args(['fleet', 'comptes.json', 'stats', '--no-cache', '--max-age', '60'])
+        if not args.no_cache or args.max_age != 60:
+            print("  ✗ Options de cache de fleet ignorées")
+            return False
+        for option in ('--json', '--timings', '--profile', '--no-daemon'):
+            try:
+                with redirect_stderr(io.StringIO()):
+                    parser.parse_args(['fleet', 'comptes.json', 'status', option])
+                print(f"  ✗ Option sans effet acceptée par fleet: {option}")
+                return False
+            except SystemExit:
+                pass
+        print("  ✓ fleet n'accepte que les options qu'il applique")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Erreur: {e}")
+        return False
+
 def main():
     """Exécute tous les tests."""
     print("=" * 50)
@@ -122,6 +1356,27 @@ def main():
         test_config,
         test_client_structure,
         test_cli_commands,
+        test_async_client_structure,
+        test_token_store,
+        test_topology,
+        test_measures,
+        test_measure_store,
+        test_stats_engine,
+        test_timeseries,
+        test_daemon,
+        test_rate_limiter,
+        test_resilience,
+        test_status_cache,
+        test_lazy_imports,
+        test_mock_server,
+        test_instrumentation,
+        test_profiling,
+        test_status_watch,
+        test_singleflight,
+        test_response_cache,
+        test_fleet,
+        test_thermostat_measures,
+        test_room_history,
     ]
     
     results = []
@@ -0,0 +1,98 @@
+"""Adaptateur requests qui mesure les phases d'ouverture des connexions (DNS, TCP, TLS)."""
+import socket
+import time
+from typing import Any, List, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import _set_socket_options, allowed_gai_family
+
+from instrumentation import record_connection_timings
+
+
+class _TimedConnectionMixin:
+    """Chronomètre la résolution DNS, la connexion TCP et la négociation TLS."""
+
+    _dns_host: str
+    host: str
+    port: int
+    timeout: Any
+    source_address: Any
+    socket_options: Any
+
+    def _new_conn(self) -> socket.socket:
+        # Équivalent de urllib3.util.connection.create_connection, avec la
+        # résolution chronométrée à part : une seule tentative par adresse
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host.strip('[]'), self.port, allowed_gai_family(),
+                                           socket.SOCK_STREAM)
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to resolve '{self.host}' ({e})") from e
+        resolved = time.perf_counter()
+        try:
+            sock = self._connect_any(addresses)
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+        self._timed_phases = (resolved - start, time.perf_counter() - resolved)
+        return sock
+
+    def _connect_any(self, addresses: List[Tuple[Any, ...]]) -> socket.socket:
+        """Se connecte à la première adresse joignable (dans l'ordre de getaddrinfo)."""
+        error = None
+        for family, socktype, proto, _, address in addresses:
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                _set_socket_options(sock, self.socket_options)
+                if self.timeout is None or isinstance(self.timeout, (int, float)):
+                    sock.settimeout(self.timeout)
+                if self.source_address:
+                    sock.bind(self.source_address)
+                sock.connect(address)
+                return sock
+            except OSError as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+        raise error or OSError("getaddrinfo returns an empty list")
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        self._timed_phases = (0.0, 0.0)
+        super().connect()  # type: ignore[misc]
+        dns, tcp = self._timed_phases
+        record_connection_timings(dns, tcp, max(0.0, time.perf_counter() - start - dns - tcp))
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter dont les connexions enregistrent leurs phases d'ouverture (instrumentation)."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
@@ -0,0 +1,292 @@
+"""Série temporelle compacte qui conserve l'encodage (beg_time, step_time, valeurs) de getmeasure."""
+import math
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from measures import iter_measures
+
+NAN = float('nan')
+
+# Une série de pas constant : (beg_time, step_time, valeurs)
+Run = Tuple[int, int, array]
+
+
+class TimeSeries:
+    """
+    Série de mesures stockée par blocs de pas constant.
+
+    Chaque bloc garde le timestamp de début, le pas et un array('d') de
+    valeurs (NaN pour une mesure absente) : 8 octets par point, aucun
+    timestamp ni objet Python par point. L'itération, le découpage, la
+    fusion et le rééchantillonnage calculent les timestamps à la volée.
+    """
+
+    __slots__ = ('runs',)
+
+    def __init__(self, runs: Optional[List[Run]] = None):
+        """
+        Args:
+            runs: Blocs (beg_time, step_time, array('d')) triés et disjoints
+        """
+        self.runs: List[Run] = runs or []
+
+    @classmethod
+    def from_body(cls, body: Any, column: int = 0, types_count: int = 1) -> 'TimeSeries':
+        """
+        Construit une série depuis le body d'une réponse getmeasure.
+
+        Les blocs d'un body en liste sont repris tels quels ; un body en dict
+        est ré-encodé en blocs de pas constant.
+
+        Args:
+            body: Champ 'body' d'une réponse getmeasure
+            column: Index du type de mesure à extraire
+            types_count: Nombre de types de mesures de la réponse
+        """
+        if not isinstance(body, list):
+            return cls.from_points(
+                (point[0], point[1 + column]) for point in iter_measures(body, types_count, skip_empty=False)
+            )
+
+        runs = []
+        for entry in body:
+            if not isinstance(entry, dict) or not entry.get('value'):
+                continue
+            values = array('d', (
+                row[column] if isinstance(row, list) and len(row) > column and row[column] is not None else NAN
+                for row in entry['value']
+            ))
+            runs.append((entry.get('beg_time', 0), entry.get('step_time', 0), values))
+        runs.sort(key=lambda run: run[0])
+        return cls(runs)
+
+    @classmethod
+    def columns_from_body(cls, body: Any, types: List[str]) -> Dict[str, 'TimeSeries']:
+        """
+        Construit une série par type depuis le body d'une réponse getmeasure à plusieurs types.
+
+        Les colonnes partagent les blocs (beg_time, step_time) de la réponse : chaque
+        ligne de valeurs est lue une seule fois et répartie entre les colonnes.
+
+        Args:
+            body: Champ 'body' d'une réponse getmeasure
+            types: Types demandés, dans l'ordre de la requête
+        """
+        if len(types) == 1:
+            return {types[0]: cls.from_body(body)}
+        if not isinstance(body, list):
+            points = list(iter_measures(body, len(types), skip_empty=False))
+            return {
+                measure_type: cls.from_points((point[0], point[1 + column]) for point in points)
+                for column, measure_type in enumerate(types)
+            }
+
+        runs: List[List[Run]] = [[] for _ in types]
+        for entry in sorted((entry for entry in body if isinstance(entry, dict) and entry.get('value')),
+                            key=lambda entry: entry.get('beg_time', 0)):
+            columns = [array('d') for _ in types]
+            for row in entry['value']:
+                row = row if isinstance(row, list) else ()
+                for column, values in enumerate(columns):
+                    value = row[column] if len(row) > column else None
+                    values.append(NAN if value is None else value)
+            for column, values in enumerate(columns):
+                runs[column].append((entry.get('beg_time', 0), entry.get('step_time', 0), values))
+        return {measure_type: cls(runs[column]) for column, measure_type in enumerate(types)}
+
+    @classmethod
+    def from_points(cls, points: Iterable[Tuple[int, Optional[float]]]) -> 'TimeSeries':
+        """Construit une série depuis des points (timestamp, valeur) triés."""
+        runs: List[Run] = []
+        previous = None
+        for timestamp, value in points:
+            value = NAN if value is None else value
+            if runs:
+                beg_time, step_time, values = runs[-1]
+                if len(values) == 1 and timestamp > previous:
+                    runs[-1] = (beg_time, timestamp - previous, values)
+                    values.append(value)
+                    previous = timestamp
+                    continue
+                if timestamp - previous == step_time:
+                    values.append(value)
+                    previous = timestamp
+                    continue
+            runs.append((timestamp, 0, array('d', (value,))))
+            previous = timestamp
+        return cls(runs)
+
+    def __len__(self) -> int:
+        """Nombre de points stockés (mesures absentes comprises)."""
+        return sum(len(values) for _, _, values in self.runs)
+
+    def __iter__(self) -> Iterator[Tuple[int, float]]:
+        """Itère sur les points (timestamp, valeur) présents, dans l'ordre chronologique."""
+        for beg_time, step_time, values in self.runs:
+            for index, value in enumerate(values):
+                if value == value:  # NaN : mesure absente
+                    yield beg_time + index * step_time, value
+
+    def __bool__(self) -> bool:
+        return any(len(values) for _, _, values in self.runs)
+
+    def __repr__(self) -> str:
+        return f"TimeSeries(runs={len(self.runs)}, points={len(self)}, start={self.start}, end={self.end})"
+
+    @property
+    def start(self) -> Optional[int]:
+        """Timestamp du premier point."""
+        return self.runs[0][0] if self.runs else None
+
+    @property
+    def end(self) -> Optional[int]:
+        """Timestamp du dernier point."""
+        if not self.runs:
+            return None
+        beg_time, step_time, values = self.runs[-1]
+        return beg_time + (len(values) - 1) * step_time
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire occupée par les valeurs."""
+        return sum(values.itemsize * len(values) for _, _, values in self.runs)
+
+    def count(self) -> int:
+        """Nombre de mesures présentes (hors NaN)."""
+        return sum(1 for _, _, values in self.runs for value in values if value == value)
+
+    def slice(self, start: Optional[int] = None, end: Optional[int] = None) -> 'TimeSeries':
+        """Retourne les points de [start, end] (bornes incluses), sans copier point par point."""
+        runs = []
+        for beg_time, step_time, values in self.runs:
+            if step_time:
+                first = 0 if start is None else max(0, math.ceil((start - beg_time) / step_time))
+                last = len(values) - 1 if end is None else min(len(values) - 1, (end - beg_time) // step_time)
+            else:
+                inside = (start is None or beg_time >= start) and (end is None or beg_time <= end)
+                first, last = (0, 0) if inside else (1, 0)
+            if first <= last:
+                runs.append((beg_time + first * step_time, step_time, values[first:last + 1]))
+        return TimeSeries(runs)
+
+    def __getitem__(self, key: slice) -> 'TimeSeries':
+        """series[start:end] : découpage par timestamps (bornes incluses)."""
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("TimeSeries se découpe par timestamps : series[start:end]")
+        return self.slice(key.start, key.stop)
+
+    def merge(self, other: 'TimeSeries') -> 'TimeSeries':
+        """
+        Fusionne deux séries ; en cas de timestamp commun, la valeur de `other` l'emporte.
+
+        Deux séries disjointes sont simplement concaténées bloc par bloc.
+        """
+        if not self.runs:
+            return TimeSeries(list(other.runs))
+        if not other.runs:
+            return TimeSeries(list(self.runs))
+
+        first, second = (self, other) if self.start <= other.start else (other, self)
+        if first.end < second.start:
+            runs = list(first.runs)
+            beg_time, step_time, values = runs[-1]
+            next_beg, next_step, next_values = second.runs[0]
+            # Recoller les blocs contigus de même pas
+            if step_time and step_time == next_step and first.end + step_time == next_beg:
+                runs[-1] = (beg_time, step_time, values + next_values)
+                runs.extend(second.runs[1:])
+            else:
+                runs.extend(second.runs)
+            return TimeSeries(runs)
+
+        points = {}
+        for series in (self, other):
+            for beg_time, step_time, values in series.runs:
+                for index, value in enumerate(values):
+                    points[beg_time + index * step_time] = value
+        return TimeSeries.from_points(sorted(points.items()))
+
+    def resample(self, step: int, how: str = 'mean') -> 'TimeSeries':
+        """
+        Rééchantillonne sur une grille régulière de pas `step` (alignée sur l'epoch).
+
+        Args:
+            step: Pas de la grille en secondes
+            how: Agrégation des points d'un intervalle ('mean', 'min', 'max', 'last')
+        """
+        if how not in ('mean', 'min', 'max', 'last'):
+            raise ValueError(f"Agrégation inconnue: {how}")
+        if not self.runs:
+            return TimeSeries()
+
+        first_bucket = self.start - self.start % step
+        size = (self.end - first_bucket) // step + 1
+        sums = array('d', [0.0]) * size
+        counts = array('l', [0]) * size
+        for timestamp, value in self:
+            bucket = (timestamp - first_bucket) // step
+            if how == 'mean':
+                sums[bucket] += value
+            elif counts[bucket] == 0 or how == 'last':
+                sums[bucket] = value
+            elif how == 'min':
+                sums[bucket] = min(sums[bucket], value)
+            else:
+                sums[bucket] = max(sums[bucket], value)
+            counts[bucket] += 1
+
+        values = array('d', (
+            (total / count if how == 'mean' else total) if count else NAN
+            for total, count in zip(sums, counts)
+        ))
+        return TimeSeries([(first_bucket, step, values)])
+
+    def to_arrays(self) -> Tuple[Any, Any]:
+        """Retourne (timestamps, valeurs) en tableaux NumPy, mesures absentes retirées."""
+        import numpy as np
+
+        if not self.runs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        timestamps = np.concatenate([
+            beg_time + np.arange(len(values), dtype=np.int64) * step_time
+            for beg_time, step_time, values in self.runs
+        ])
+        values = np.concatenate([np.frombuffer(values, dtype=np.float64) for _, _, values in self.runs])
+        valid = ~np.isnan(values)
+        return timestamps[valid], values[valid]
+
+    def to_body(self) -> List[Dict[str, Any]]:
+        """Retourne les blocs au format du body d'une réponse getmeasure."""
+        return [
+            {
+                'beg_time': beg_time,
+                'step_time': step_time,
+                'value': [[value if value == value else None] for value in values],
+            }
+            for beg_time, step_time, values in self.runs
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retourne la série au format d'une réponse getmeasure (sortie JSON)."""
+        return {'status': 'ok', 'body': self.to_body()}
+
+
+def align_columns(columns: Dict[str, TimeSeries],
+                  step: Optional[int] = None) -> List[Tuple[int, List[Optional[float]]]]:
+    """
+    Aligne plusieurs séries sur leurs timestamps : une ligne (timestamp, [valeur par série]).
+
+    Une série sans point à un timestamp donne None dans la ligne.
+
+    Args:
+        columns: Séries à aligner
+        step: Rééchantillonner d'abord chaque série sur la grille commune de pas `step`
+            (séries de sources différentes dont les timestamps ne coïncident pas)
+    """
+    rows: Dict[int, List[Optional[float]]] = {}
+    for index, series in enumerate(columns.values()):
+        if step:
+            series = series.resample(step)
+        for timestamp, value in series:
+            rows.setdefault(timestamp, [None] * len(columns))[index] = value
+    return sorted(rows.items())
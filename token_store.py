@@ -0,0 +1,117 @@
+"""Cache persistant des tokens OAuth Netatmo partagé entre les invocations du CLI."""
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou consultatif, écriture atomique seulement
+    fcntl = None
+
+
+def atomic_write_json(path: Path, data: Any, mode: int = 0o600, durable: bool = True) -> None:
+    """
+    Écrit un fichier JSON de manière atomique (fichier temporaire + os.replace).
+
+    Args:
+        durable: Forcer l'écriture sur disque (fsync) avant le remplacement ; inutile pour un
+            état que l'on peut perdre sans dommage en cas de crash
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + path.stem + '-', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """Verrou exclusif inter-processus (flock) sur un fichier de verrou."""
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class TokenStore:
+    """
+    Stocke access token, refresh token, expiration et scope dans un fichier JSON.
+
+    Les écritures sont atomiques (fichier temporaire + os.replace) et les
+    rafraîchissements sont sérialisés par un verrou fichier, afin que plusieurs
+    processus (tâches cron en parallèle) ne consomment pas deux fois le même
+    refresh token, ce qui provoquerait une erreur invalid_grant.
+    """
+
+    def __init__(self, path: Path, client_id: Optional[str] = None):
+        """
+        Args:
+            path: Chemin du fichier de cache des tokens
+            client_id: Client ID de l'application (un cache d'une autre application est ignoré)
+        """
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.client_id = client_id
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Lit le cache, retourne None s'il est absent, illisible ou d'une autre application."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or not data.get('refresh_token'):
+            return None
+        if self.client_id and data.get('client_id') not in (None, self.client_id):
+            return None
+        return data
+
+    def save(self, access_token: str, refresh_token: Optional[str],
+             expires_at: float, scope: Optional[Any] = None) -> None:
+        """Écrit le cache de manière atomique avec des permissions restreintes (0600)."""
+        data = {
+            'client_id': self.client_id,
+            'access_token': access_token,
+            'refresh_token': refresh_token,
+            'expires_at': expires_at,
+            'scope': scope,
+            'updated_at': time.time(),
+        }
+
+        atomic_write_json(self.path, data)
+
+    def clear(self) -> None:
+        """Supprime le cache (par exemple après un refresh token révoqué)."""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def lock(self) -> ContextManager[None]:
+        """Verrou exclusif inter-processus autour d'un rafraîchissement du token."""
+        return file_lock(self.lock_path)
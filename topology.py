@@ -0,0 +1,340 @@
+"""Topologie des maisons Netatmo (maisons, pièces, modules) indexée et mise en cache."""
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from token_store import atomic_write_json
+
+# Types de modules capables de piloter le chauffage
+THERMOSTAT_TYPES = ('NATherm1', 'NRV', 'OTM', 'OTM-C')
+
+
+class HomeTopology:
+    """
+    Vue indexée de la réponse /api/homesdata.
+
+    Construite une seule fois, elle permet de résoudre en O(1) la maison, la
+    pièce et le bridge d'un module sans nouvel appel réseau.
+    """
+
+    def __init__(self, homes_data: Dict[str, Any], fetched_at: Optional[float] = None):
+        """
+        Args:
+            homes_data: Réponse brute de /api/homesdata
+            fetched_at: Date de récupération (timestamp), maintenant par défaut
+        """
+        self.homes_data = homes_data
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+        self.homes: Dict[str, Dict[str, Any]] = {}
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        self.room_home: Dict[str, str] = {}
+        self.module_home: Dict[str, str] = {}
+        self.module_room: Dict[str, Dict[str, Any]] = {}
+        self.room_modules: Dict[str, List[Dict[str, Any]]] = {}
+        self.module_bridge: Dict[str, str] = {}
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        """Construit les index en un seul parcours de homesdata."""
+        for home in self.homes_data.get('body', {}).get('homes', []):
+            home_id = home.get('id')
+            if not home_id:
+                continue
+            self.homes[home_id] = home
+
+            for room in home.get('rooms', []):
+                room_id = room.get('id')
+                if not room_id:
+                    continue
+                self.rooms[room_id] = room
+                self.room_home[room_id] = home_id
+                self.room_modules.setdefault(room_id, [])
+
+            for module in home.get('modules', []):
+                module_id = module.get('id')
+                if not module_id:
+                    continue
+                self.modules[module_id] = module
+                self.module_home[module_id] = home_id
+                if module.get('bridge'):
+                    self.module_bridge[module_id] = module['bridge']
+                room = self.rooms.get(module.get('room_id'))
+                if room is not None:
+                    self.module_room[module_id] = room
+
+            # Le lien pièce -> modules peut aussi venir de rooms[].module_ids
+            for room in home.get('rooms', []):
+                for module_id in room.get('module_ids', []):
+                    if module_id in self.modules:
+                        self.module_room.setdefault(module_id, room)
+
+        for module_id, room in self.module_room.items():
+            self.room_modules.setdefault(room['id'], []).append(self.modules[module_id])
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Indique si la topologie a moins de `ttl` secondes."""
+        return time.time() - self.fetched_at < ttl
+
+    def heating_modules(self, home_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Liste les modules de chauffage (thermostats, vannes), dans l'ordre de homesdata."""
+        return [
+            module for module_id, module in self.modules.items()
+            if module.get('type') in THERMOSTAT_TYPES
+            and (home_id is None or self.module_home[module_id] == home_id)
+        ]
+
+    def locate(self, module_id: str) -> Dict[str, Any]:
+        """Résout maison, pièce et bridge d'un module."""
+        module = self.modules[module_id]
+        home_id = self.module_home[module_id]
+        room = self.module_room.get(module_id)
+        if room is None:
+            # Module non rattaché à une pièce : première pièce de la maison (fallback)
+            home_rooms = self.homes[home_id].get('rooms', [])
+            room = home_rooms[0] if home_rooms else {}
+        return {
+            'home_id': home_id,
+            'room_id': room.get('id'),
+            'room_name': room.get('name'),
+            'module_id': module_id,
+            'module_name': module.get('name', 'Thermostat'),
+            'module_type': module.get('type'),
+            'bridge_id': self.module_bridge.get(module_id),
+        }
+
+    def find_thermostat(self, home_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Retourne l'emplacement du premier module de chauffage, ou None."""
+        modules = self.heating_modules(home_id)
+        if not modules:
+            return None
+        return self.locate(modules[0]['id'])
+
+    def find_home(self, reference: Optional[str] = None) -> str:
+        """
+        Résout une maison par ID ou par nom (sans tenir compte de la casse).
+
+        Sans référence : la maison du thermostat, sinon la première maison.
+
+        Raises:
+            ValueError: Maison inconnue ou compte sans maison
+        """
+        if reference is None:
+            thermostat = self.find_thermostat()
+            if thermostat:
+                return thermostat['home_id']
+            if not self.homes:
+                raise ValueError("Aucune maison trouvée dans votre compte Netatmo")
+            return next(iter(self.homes))
+        if reference in self.homes:
+            return reference
+        name = reference.strip().casefold()
+        for home_id, home in self.homes.items():
+            if (home.get('name') or '').strip().casefold() == name:
+                return home_id
+        known = ', '.join(home.get('name') or home_id for home_id, home in self.homes.items())
+        raise ValueError(f"Maison inconnue: {reference} (maisons disponibles: {known})")
+
+    def home_rooms(self, home_id: str) -> List[Dict[str, Any]]:
+        """Pièces d'une maison, dans l'ordre de homesdata (mêmes champs que find_room)."""
+        home = self.homes.get(home_id, {})
+        return [
+            {'home_id': home_id, 'home_name': home.get('name'), 'room_id': room['id'], 'room_name': room.get('name')}
+            for room in home.get('rooms', []) if room.get('id')
+        ]
+
+    def find_room(self, reference: str, home_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Résout une pièce par ID ou par nom (sans tenir compte de la casse).
+
+        Raises:
+            ValueError: Pièce inconnue, ou nom porté par plusieurs pièces
+        """
+        if reference in self.rooms and (home_id is None or self.room_home[reference] == home_id):
+            matches = [reference]
+        else:
+            name = reference.strip().casefold()
+            matches = [
+                room_id for room_id, room in self.rooms.items()
+                if (room.get('name') or '').strip().casefold() == name
+                and (home_id is None or self.room_home[room_id] == home_id)
+            ]
+
+        if not matches:
+            known = ', '.join(sorted(room.get('name') or room_id for room_id, room in self.rooms.items()))
+            raise ValueError(f"Pièce inconnue: {reference} (pièces disponibles: {known})")
+        if len(matches) > 1:
+            raise ValueError(f"Nom de pièce ambigu: {reference} (présent dans plusieurs maisons, utilisez l'ID)")
+
+        room_id = matches[0]
+        home_id = self.room_home[room_id]
+        return {
+            'home_id': home_id,
+            'home_name': self.homes[home_id].get('name'),
+            'room_id': room_id,
+            'room_name': self.rooms[room_id].get('name'),
+        }
+
+    def thermostat_status(self, home_id: str, home_status: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Extrait le statut du thermostat d'une réponse /api/homestatus.
+
+        Retourne None si aucun module de chauffage de la maison n'est présent
+        dans le statut.
+        """
+        # La structure est : body.home.rooms (données de température) et body.home.modules (infos modules)
+        home_data = home_status.get('body', {}).get('home', {})
+        rooms = home_data.get('rooms', [])
+        status_rooms = {room.get('id'): room for room in rooms}
+        status_modules = {module.get('id'): module for module in home_data.get('modules', [])}
+
+        # Premier module de chauffage (ordre de homesdata) présent dans le statut
+        thermostat_module = None
+        for module in self.heating_modules(home_id):
+            thermostat_module = status_modules.get(module['id'])
+            if thermostat_module is not None:
+                break
+        if not thermostat_module:
+            return None
+
+        location = self.locate(thermostat_module['id'])
+        thermostat_room = status_rooms.get(location['room_id'])
+
+        # Si pas de room trouvée, utiliser la première room (fallback)
+        if not thermostat_room and rooms:
+            thermostat_room = rooms[0]
+        if not thermostat_room:
+            return None
+
+        return {
+            'home_id': home_id,
+            'room_id': thermostat_room.get('id'),
+            'module_id': location['module_id'],
+            'module_name': location['module_name'],
+            'bridge_id': location['bridge_id'],
+            'current_temp': thermostat_room.get('therm_measured_temperature'),
+            'target_temp': thermostat_room.get('therm_setpoint_temperature'),
+            'setpoint_mode': thermostat_room.get('therm_setpoint_mode'),
+            'boiler_status': thermostat_module.get('boiler_status', False),
+            'heating_power_request': thermostat_room.get('heating_power_request', 0),
+        }
+
+    def status_rows(self, home_id: str, home_status: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Aplatit une réponse /api/homestatus en une ligne par pièce et module de chauffage.
+
+        Une pièce sans module de chauffage produit une seule ligne sans module.
+        """
+        home_data = home_status.get('body', {}).get('home', {})
+        status_modules = {module.get('id'): module for module in home_data.get('modules', [])}
+        home_name = self.homes.get(home_id, {}).get('name')
+
+        # État de la chaudière : porté par le thermostat ou le module OpenTherm de la maison
+        boiler_status = None
+        for module in self.heating_modules(home_id):
+            state = status_modules.get(module['id'], {})
+            if 'boiler_status' in state:
+                boiler_status = state['boiler_status']
+                break
+
+        rows = []
+        for room in home_data.get('rooms', []):
+            room_id = room.get('id')
+            room_name = self.rooms.get(room_id, {}).get('name')
+            base = {
+                'home_id': home_id,
+                'home_name': home_name,
+                'room_id': room_id,
+                'room_name': room_name,
+                'current_temp': room.get('therm_measured_temperature'),
+                'target_temp': room.get('therm_setpoint_temperature'),
+                'setpoint_mode': room.get('therm_setpoint_mode'),
+                'heating_power_request': room.get('heating_power_request'),
+                'boiler_status': boiler_status,
+            }
+
+            modules = [m for m in self.room_modules.get(room_id, []) if m.get('type') in THERMOSTAT_TYPES]
+            if not modules:
+                rows.append(dict(base, module_id=None, module_name=None, module_type=None, reachable=None))
+                continue
+
+            for module in modules:
+                state = status_modules.get(module['id'], {})
+                rows.append(dict(
+                    base,
+                    module_id=module['id'],
+                    module_name=module.get('name'),
+                    module_type=module.get('type'),
+                    reachable=state.get('reachable'),
+                ))
+        return rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Sérialise la topologie pour le cache disque."""
+        return {'fetched_at': self.fetched_at, 'homes_data': self.homes_data}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HomeTopology':
+        """Reconstruit une topologie depuis le cache disque."""
+        return cls(data['homes_data'], fetched_at=data.get('fetched_at', 0))
+
+
+class TopologyCache:
+    """Cache de la topologie en mémoire et sur disque, avec une durée de validité (TTL)."""
+
+    def __init__(self, path: Path, ttl: float, client_id: Optional[str] = None):
+        """
+        Args:
+            path: Fichier du cache disque
+            ttl: Durée de validité en secondes
+            client_id: Client ID de l'application (un cache d'une autre application est ignoré)
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.client_id = client_id
+        self._topology: Optional[HomeTopology] = None
+
+    def get(self, max_age: Optional[float] = None) -> Optional[HomeTopology]:
+        """
+        Retourne la topologie si elle est encore valide (mémoire puis disque).
+
+        Args:
+            max_age: Âge maximal accepté en secondes (plus court que le TTL)
+        """
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        if self._topology is not None and self._topology.is_fresh(ttl):
+            return self._topology
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if self.client_id and data.get('client_id') not in (None, self.client_id):
+                return None
+            topology = HomeTopology.from_dict(data)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        if not topology.is_fresh(ttl):
+            return None
+        self._topology = topology
+        return topology
+
+    def put(self, topology: HomeTopology) -> None:
+        """Enregistre la topologie en mémoire et sur disque (best effort)."""
+        self._topology = topology
+        data = topology.to_dict()
+        data['client_id'] = self.client_id
+        try:
+            atomic_write_json(self.path, data)
+        except OSError:
+            pass
+
+    def invalidate(self) -> None:
+        """Oublie la topologie (mémoire et disque)."""
+        self._topology = None
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,181 @@
+"""Surveillance du statut (status --watch) : interrogation adaptative et sortie des seuls changements."""
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Champs suivis pour chaque pièce / module de chauffage
+WATCHED_FIELDS = ('current_temp', 'target_temp', 'setpoint_mode', 'heating_power_request', 'boiler_status', 'reachable')
+
+# Changements qui signalent une activité de chauffage : l'intervalle redescend au minimum
+ACTIVITY_FIELDS = ('target_temp', 'setpoint_mode', 'heating_power_request', 'boiler_status')
+
+RowKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def row_key(row: Dict[str, Any]) -> RowKey:
+    """Identifiant d'une ligne de statut : (maison, pièce, module)."""
+    return row.get('home_id'), row.get('room_id'), row.get('module_id')
+
+
+class AdaptiveInterval:
+    """
+    Intervalle d'interrogation adaptatif : minimal tant que le chauffage change
+    d'état, multiplié par `factor` à chaque interrogation sans activité jusqu'au
+    maximum (maison stable), et allongé de la même façon après une erreur.
+    """
+
+    def __init__(self, min_interval: float = 15.0, max_interval: float = 300.0, factor: float = 2.0):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Intervalles invalides: il faut 0 < minimum <= maximum")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.current = min_interval
+
+    def update(self, active: bool) -> float:
+        """Intervalle avant la prochaine interrogation, selon l'activité observée."""
+        if active:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.max_interval, self.current * self.factor)
+        return self.current
+
+    def backoff(self) -> float:
+        """Intervalle après une erreur (l'API n'est pas sollicitée plus souvent)."""
+        self.current = min(self.max_interval, self.current * self.factor)
+        return self.current
+
+
+class StatusWatcher:
+    """
+    Interroge /api/homestatus avec un seul client et émet les champs modifiés.
+
+    La topologie reste en cache : chaque interrogation ne coûte qu'un appel
+    /api/homestatus par maison. La première interrogation émet l'état complet.
+    """
+
+    def __init__(self, client: Any, interval: Optional[AdaptiveInterval] = None, max_workers: Optional[int] = None):
+        """
+        Args:
+            client: NetatmoClient
+            interval: Politique d'intervalle (défaut: 15 s à 300 s)
+            max_workers: Nombre d'appels simultanés (une maison par appel)
+        """
+        self.client = client
+        self.interval = interval or AdaptiveInterval()
+        self.max_workers = max_workers
+        self.state: Dict[RowKey, Dict[str, Any]] = {}
+        self.failed_polls = 0
+
+    def poll(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Interroge l'API et compare au dernier état connu.
+
+        Returns:
+            (changements, lignes en erreur) ; un changement contient les champs
+            d'identification de la ligne, 'changes' (nouvelles valeurs) et
+            'previous' (anciennes valeurs, vide à la première interrogation)
+        """
+        rows = self.client.get_all_status(max_workers=self.max_workers, refresh=True)
+        events = []
+        errors = []
+        for row in rows:
+            if 'error' in row:
+                errors.append(row)
+                continue
+            key = row_key(row)
+            previous = self.state.get(key)
+            changes = {
+                field: row.get(field) for field in WATCHED_FIELDS
+                if previous is None or previous.get(field) != row.get(field)
+            }
+            self.state[key] = row
+            if changes:
+                events.append({
+                    'home_id': row.get('home_id'),
+                    'home_name': row.get('home_name'),
+                    'room_id': row.get('room_id'),
+                    'room_name': row.get('room_name'),
+                    'module_id': row.get('module_id'),
+                    'module_name': row.get('module_name'),
+                    'changes': changes,
+                    'previous': {field: previous.get(field) for field in changes} if previous else {},
+                })
+        return events, errors
+
+    def run(self, emit: Callable[[List[Dict[str, Any]]], None], count: Optional[int] = None,
+            sleep: Callable[[float], None] = time.sleep) -> int:
+        """
+        Boucle de surveillance.
+
+        Args:
+            emit: Reçoit les changements de chaque interrogation (liste éventuellement vide)
+            count: Nombre d'interrogations (None = jusqu'à interruption)
+            sleep: Fonction d'attente (remplaçable dans les tests)
+
+        Returns:
+            Nombre d'interrogations effectuées
+        """
+        polls = 0
+        while count is None or polls < count:
+            first = not self.state
+            try:
+                events, errors = self.poll()
+            except Exception as e:
+                print(f"Erreur: {e}", file=sys.stderr)
+                self.failed_polls += 1
+                delay = self.interval.backoff()
+            else:
+                emit(events)
+                for row in errors:
+                    print(f"Erreur pour la maison {row.get('home_name') or row['home_id']}: {row['error']}",
+                          file=sys.stderr)
+                active = any(field in ACTIVITY_FIELDS for event in events for field in event['changes'])
+                if errors:
+                    self.failed_polls += 1
+                    delay = self.interval.backoff()
+                elif first:
+                    # État initial : rien à comparer, l'intervalle reste inchangé
+                    delay = self.interval.current
+                else:
+                    delay = self.interval.update(active)
+            polls += 1
+            if count is None or polls < count:
+                sleep(delay)
+        return polls
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return 'N/A' if value is None else str(value)
+
+
+def format_event(event: Dict[str, Any], timestamp: float) -> str:
+    """Ligne texte d'un changement : « AAAA-MM-JJ HH:MM:SS Maison / Pièce (module): champ ancien → nouveau »."""
+    where = ' / '.join(str(part) for part in (event.get('home_name'), event.get('room_name')) if part)
+    if event.get('module_name'):
+        where += f" ({event['module_name']})"
+    fields = []
+    for field, value in event['changes'].items():
+        if field in event['previous']:
+            fields.append(f"{field} {_format_value(event['previous'][field])} → {_format_value(value)}")
+        else:
+            fields.append(f"{field} {_format_value(value)}")
+    return f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')} {where}: {', '.join(fields)}"
+
+
+def event_printer(as_json: bool) -> Callable[[List[Dict[str, Any]]], None]:
+    """Affiche les changements en texte ou en JSONL (un objet par ligne, horodaté)."""
+    def emit(events: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        for event in events:
+            if as_json:
+                print(json.dumps(dict(time=datetime.fromtimestamp(now).isoformat(timespec='seconds'), **event),
+                                 ensure_ascii=False))
+            else:
+                print(format_event(event, now))
+        sys.stdout.flush()
+    return emit